@@ -92,7 +92,9 @@ class GroqAgent(BaseAgent):
         function_name = tool_call.function.name
         function_args = json.loads(tool_call.function.arguments)
 
-        function_args["video_path"] = video_path
+        # Library search spans every processed video, not the one in the conversation.
+        if function_name != "search_video_library":
+            function_args["video_path"] = video_path
 
         if function_name == "get_video_clip_from_image":
             function_args["user_image"] = image_base64
@@ -145,7 +147,9 @@ class GroqAgent(BaseAgent):
             )
 
         response_model = (
-            GeneralResponseModel if tool_call.function.name == "ask_question_about_video" else VideoClipResponseModel
+            GeneralResponseModel
+            if tool_call.function.name in ("ask_question_about_video", "search_video_library")
+            else VideoClipResponseModel
         )
 
 
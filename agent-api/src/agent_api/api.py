@@ -1,13 +1,13 @@
-import shutil
-from enum import Enum
+import hashlib
+import json
 from pathlib import Path
 from uuid import uuid4
 from contextlib import asynccontextmanager
 
 import click
-from fastapi import FastAPI, BackgroundTasks , File, HTTPException, Request, UploadFile
+from fastapi import FastAPI, File, HTTPException, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastmcp.client import Client
 from loguru import logger
@@ -19,30 +19,44 @@ from agent_api.models import (
     ProcessVideoRequest,
     ProcessVideoResponse,
     ResetMemoryResponse,
+    TaskProgress,
+    TaskStatus,
     UserMessageRequest,
     VideoUploadResponse,
 )
 from agent_api.agent import GroqAgent
+from agent_api.tasks import TaskProgressBroker, TaskStore
 settings = get_settings()
 
-class TaskStatus(str,Enum):
-    PENDING = "pending"
-    IN_PROGRESS = "in_progress"
-    COMPLETED = "completed"
-    FAILED = "failed"
-    NOT_FOUND = "not_found"
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     app.state.agent = GroqAgent(
         name ="agent",
         mcp_server = settings.MCP_SERVER,
-        disable_tools = ["process_video"],
+        disable_tools = [
+            "process_video",
+            "enqueue_video",
+            "get_video_processing_status",
+            "get_video_processing_statuses",
+        ],
     )
-    app.state.bg_task_states = dict()
+    # One client for every call to the MCP server; its session is reentrant, and the
+    # task broker keeps it open, so calls share one connection instead of a handshake each.
+    app.state.mcp_client = Client(settings.MCP_SERVER)
+    app.state.task_broker = TaskProgressBroker(
+        store = TaskStore(settings.TASK_STORE_PATH, settings.TASK_HISTORY_LIMIT),
+        connection = app.state.mcp_client,
+        fetch_statuses = lambda task_ids: fetch_task_statuses(app.state.mcp_client, task_ids),
+        poll_interval = settings.TASK_POLL_INTERVAL_SECONDS,
+        reconnect_delay = settings.TASK_RECONNECT_DELAY_SECONDS,
+    )
+    # Also keeps following tasks that were still running when the API last stopped.
+    app.state.task_broker.start()
     yield
+    await app.state.task_broker.close()
     app.state.agent.reset_memory()
-    pass
 
 app = FastAPI(
     title = "MultioModal MCP",
@@ -65,41 +79,102 @@ async def read():
     return {"message":"Welcome to Agent API.Visit /docs for documentation"}
 
 
+async def call_mcp_tool(mcp_client: Client, tool_name: str, tool_args: dict) -> dict:
+    """Call a tool on the MCP server and decode its JSON response"""
+    async with mcp_client:
+        mcp_response = await mcp_client.call_tool(tool_name, tool_args)
+    return json.loads(mcp_response[0].text)
+
+
+async def fetch_task_status(mcp_client: Client, task_id: str) -> dict:
+    return await call_mcp_tool(mcp_client, "get_video_processing_status", {"job_id": task_id})
+
+
+async def fetch_task_statuses(mcp_client: Client, task_ids: list[str]) -> dict[str, dict]:
+    return await call_mcp_tool(mcp_client, "get_video_processing_statuses", {"job_ids": task_ids})
+
+
 @app.post("/tast-status/{task_id}")
 async def get_task_status(task_id: str, fastapi_request: Request):
-    status = fastapi_request.app.state.bg_task_states.get(task_id,TaskStatus.NOT_FOUND)
-    return {"task_id": task_id, "status": status}
+    task = fastapi_request.app.state.task_broker.store.get(task_id)
+    if task is not None:
+        return {"task_id": task_id, "status": task.status, "stage": task.stage, "progress": task.progress}
+
+    try:
+        job = await fetch_task_status(fastapi_request.app.state.mcp_client, task_id)
+    except Exception as e:
+        logger.error(f"Error fetching status of task {task_id}: {e}")
+        raise HTTPException(status_code= 500, detail= str(e))
+    return {"task_id": task_id, "status": TaskStatus(job["status"])}
+
+@app.get("/tasks", response_model= list[TaskProgress])
+async def list_tasks(fastapi_request: Request, limit: int = 50):
+    """List the most recent ingestion tasks with their progress"""
+    return fastapi_request.app.state.task_broker.store.recent(limit)
+
+@app.get("/tasks/{task_id}", response_model= TaskProgress)
+async def get_task(task_id: str, fastapi_request: Request):
+    """Get an ingestion task with its per-stage progress"""
+    task = fastapi_request.app.state.task_broker.store.get(task_id)
+    if task is None:
+        raise HTTPException(status_code= 404, detail= "Task not found")
+    return task
+
+@app.get("/tasks/{task_id}/events")
+async def stream_task_events(task_id: str, fastapi_request: Request):
+    """
+    Stream the progress of an ingestion task as server-sent events, until it finishes
+    """
+    broker = fastapi_request.app.state.task_broker
+    if broker.store.get(task_id) is None:
+        raise HTTPException(status_code= 404, detail= "Task not found")
+
+    async def events():
+        async for task in broker.subscribe(task_id, keepalive= settings.TASK_EVENTS_KEEPALIVE_SECONDS):
+            if task is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield f"event: progress\ndata: {task.model_dump_json()}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type= "text/event-stream",
+        headers= {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @app.post("/process-video")
-async def process_video(request: ProcessVideoRequest, bg_tasks: BackgroundTasks, fastapi_request: Request):
+async def process_video(request: ProcessVideoRequest, fastapi_request: Request):
     """
-    Process a video and return the results
+    Queue a video in the MCP ingestion pool and return the task id
     """
-    task_id = str(uuid4())
-    bg_task_states = fastapi_request.app.state.bg_task_states
-
-    async def backgroung_process_video(video_path:str, task_id:str):
-        """
-        background process to process the video
-        """
-
-        bg_task_states[task_id] = TaskStatus.IN_PROGRESS
-
-        if not Path(video_path).exists():
-            bg_task_states[task_id] = TaskStatus.FAILED
-            raise HTTPException(status_code= 404, detail ="Video file not found")
-        try:
-            mcp_client = Client(settings.MCP_SERVER)
-            async with mcp_client:
-                _ = await mcp_client.call_tool("process_video", {"video_path": request.video_path})
-        except Exception as e:
-            logger.error(f"Error processing video {video_path}: {e}")
-            bg_task_states[task_id] = TaskStatus.FAILED
-            raise HTTPException(status_code= 500, detail= str(e))
-        bg_task_states[task_id] = TaskStatus.COMPLETED
-
-    bg_tasks.add_task(backgroung_process_video, request.video_path,task_id)
-    return ProcessVideoResponse(message = "Task enquered for processing ", task_id= task_id)
+    if not Path(request.video_path).exists():
+        raise HTTPException(status_code= 404, detail ="Video file not found")
+
+    try:
+        job = await call_mcp_tool(
+            fastapi_request.app.state.mcp_client,
+            "enqueue_video",
+            {"video_path": request.video_path, "content_hash": request.content_hash},
+        )
+    except Exception as e:
+        logger.error(f"Error queueing video {request.video_path}: {e}")
+        raise HTTPException(status_code= 500, detail= str(e))
+
+    # The same content already queued or running comes back as its existing job, whose
+    # recorded progress must be kept; the broker picks up every unfinished task by itself.
+    store = fastapi_request.app.state.task_broker.store
+    if store.get(job["job_id"]) is not None:
+        return ProcessVideoResponse(message = "Video is already being processed", task_id= job["job_id"])
+
+    store.save(
+        TaskProgress(
+            task_id= job["job_id"],
+            video_path= request.video_path,
+            content_hash= request.content_hash,
+            status= TaskStatus(job["status"]),
+        )
+    )
+    return ProcessVideoResponse(message = "Task enqueued for processing", task_id= job["job_id"])
 
 @app.post("/chat", response_model= AssistantMessageResponse)
 async def chat(request: UserMessageRequest, fastapi_request: Request):
@@ -130,13 +205,28 @@ async def upload_video(file: UploadFile = File(...)):
         shared_media_dir = Path("shared_media")
         shared_media_dir.mkdir(exist_ok=True)
 
-        video_path = Path(shared_media_dir/ file.filename)
+        partial_path = shared_media_dir / f".upload.{uuid4().hex}.part"
+
+        digest = hashlib.sha256()
+        with open(partial_path,"wb") as f:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                digest.update(chunk)
+                f.write(chunk)
 
-        if not video_path.exists():
-            with open(video_path,"wb") as f:
-                shutil.copyfileobj(file.file,f)
+        # Content-addressed, so the returned hash always describes the file at video_path:
+        # re-uploads of the same file share it, and different files never collide on a name.
+        content_hash = digest.hexdigest()
+        video_path = shared_media_dir / f"{content_hash[:16]}_{Path(file.filename).name}"
+        if video_path.exists():
+            partial_path.unlink()
+        else:
+            partial_path.rename(video_path)
 
-        return VideoUploadResponse(message = "Video Uploaded Successfully")
+        return VideoUploadResponse(
+            message = "Video Uploaded Successfully",
+            video_path = str(video_path),
+            content_hash = content_hash,
+        )
     except Exception as e:
         logger.error(f"Error Uploading Video: {e}")
         raise HTTPException(status_code= 500, detail= str(e))
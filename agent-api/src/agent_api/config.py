@@ -22,6 +22,13 @@ class Settings(BaseSettings):
     AGENT_MEMORY_SIZE: int = 20
     MCP_SERVER:str = "http://agent-mcp:8080/mcp"
 
+    # --- Ingestion Task Store Configuration ---
+    TASK_STORE_PATH: str = ".records/tasks.sqlite3"
+    TASK_HISTORY_LIMIT: int = 10000
+    TASK_POLL_INTERVAL_SECONDS: float = 1.0
+    TASK_RECONNECT_DELAY_SECONDS: float = 5.0
+    TASK_EVENTS_KEEPALIVE_SECONDS: float = 15.0
+
 
 lru_cache(maxsize=1)
 def get_settings()->Settings:
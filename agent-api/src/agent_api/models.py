@@ -1,12 +1,41 @@
+from datetime import datetime
+from enum import Enum
+
 from pydantic import BaseModel ,Field
 
+
 class ProcessVideoRequest(BaseModel):
     video_path: str
+    content_hash: str | None = None
 
 class ProcessVideoResponse(BaseModel):
     message: str
     task_id: str
 
+class TaskStatus(str,Enum):
+    PENDING = "pending"
+    IN_PROGRESS = "in_progress"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    NOT_FOUND = "not_found"
+
+class TaskProgress(BaseModel):
+    task_id: str
+    video_path: str
+    content_hash: str | None = None
+    status: TaskStatus = TaskStatus.PENDING
+    stage: str | None = Field(default=None, description="Ingestion stage reported last by the MCP server")
+    progress: float = Field(default=0.0, description="Overall progress in percent")
+    stage_progress: dict[str, float] = Field(default_factory=dict, description="Progress of each stage in percent")
+    error: str | None = None
+    submitted_at: datetime = Field(default_factory=datetime.now)
+    updated_at: datetime = Field(default_factory=datetime.now)
+    finished_at: datetime | None = None
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (TaskStatus.COMPLETED, TaskStatus.FAILED)
+
 class UserMessageRequest(BaseModel):
     message: str
     video_path: str | None = None
@@ -24,6 +53,7 @@ class VideoUploadResponse(BaseModel):
     message: str 
     video_path: str | None = None
     task_id: str | None = None
+    content_hash: str | None = None
 
 # LLM Structured output Models
 
@@ -0,0 +1,190 @@
+import asyncio
+import sqlite3
+import threading
+from contextlib import AbstractAsyncContextManager
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable
+
+from loguru import logger
+
+from agent_api.models import TaskProgress, TaskStatus
+
+logger = logger.bind(name="TaskStore")
+
+
+class TaskStore:
+    """Ingestion tasks persisted in SQLite, so their history survives API restarts.
+
+    Only the most recent `history_limit` tasks are kept; older finished tasks are
+    pruned as new ones are added.
+    """
+
+    def __init__(self, path: str, history_limit: int):
+        self.path = path
+        self.history_limit = history_limit
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            "task_id TEXT PRIMARY KEY, status TEXT NOT NULL, submitted_at TEXT NOT NULL, document TEXT NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS tasks_submitted_at ON tasks (submitted_at)")
+
+    def save(self, task: TaskProgress):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO tasks (task_id, status, submitted_at, document) VALUES (?, ?, ?, ?)",
+                (task.task_id, task.status.value, task.submitted_at.isoformat(), task.model_dump_json()),
+            )
+            self._prune()
+
+    def get(self, task_id: str) -> TaskProgress | None:
+        with self._lock:
+            row = self._db.execute("SELECT document FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+        return TaskProgress.model_validate_json(row[0]) if row else None
+
+    def recent(self, limit: int) -> list[TaskProgress]:
+        """The most recently submitted tasks, newest first."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT document FROM tasks ORDER BY submitted_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [TaskProgress.model_validate_json(row[0]) for row in rows]
+
+    def unfinished(self) -> list[TaskProgress]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT document FROM tasks WHERE status IN (?, ?)",
+                (TaskStatus.PENDING.value, TaskStatus.IN_PROGRESS.value),
+            ).fetchall()
+        return [TaskProgress.model_validate_json(row[0]) for row in rows]
+
+    def _prune(self):
+        self._db.execute(
+            "DELETE FROM tasks WHERE status IN (?, ?) AND task_id NOT IN "
+            "(SELECT task_id FROM tasks ORDER BY submitted_at DESC LIMIT ?)",
+            (TaskStatus.COMPLETED.value, TaskStatus.FAILED.value, self.history_limit),
+        )
+
+
+class TaskProgressBroker:
+    """Follow ingestion tasks on the MCP server and push their progress to subscribers.
+
+    One loop asks the MCP server for the status of every unfinished task in a single
+    call per `poll_interval`, over one long-lived MCP session, however many tasks are
+    queued and clients are watching. Changes are saved to the store and fanned out
+    to every subscriber's queue.
+    """
+
+    def __init__(
+        self,
+        store: TaskStore,
+        connection: AbstractAsyncContextManager,
+        fetch_statuses: Callable[[list[str]], Awaitable[dict[str, dict]]],
+        poll_interval: float,
+        reconnect_delay: float,
+    ):
+        self.store = store
+        self._connection = connection
+        self._fetch_statuses = fetch_statuses
+        self.poll_interval = poll_interval
+        self.reconnect_delay = reconnect_delay
+        self._runner: asyncio.Task | None = None
+        self._subscribers: dict[str, set[asyncio.Queue]] = {}
+
+    def start(self):
+        """Start following every unfinished task, including those left over from a previous run."""
+        if self._runner is None:
+            self._runner = asyncio.create_task(self._run())
+
+    async def subscribe(self, task_id: str, keepalive: float) -> AsyncIterator[TaskProgress | None]:
+        """
+        Yield the task's current state, then every update until it finishes.
+        Yields None whenever `keepalive` seconds pass without an update.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        # Subscribe before reading the store, so no update can slip in between.
+        self._subscribers.setdefault(task_id, set()).add(queue)
+        try:
+            task = self.store.get(task_id)
+            if task is None:
+                return
+            yield task
+            while not task.is_finished:
+                try:
+                    task = await asyncio.wait_for(queue.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                yield task
+        finally:
+            subscribers = self._subscribers.get(task_id, set())
+            subscribers.discard(queue)
+            if not subscribers:
+                self._subscribers.pop(task_id, None)
+
+    async def close(self):
+        if self._runner is not None:
+            self._runner.cancel()
+            await asyncio.gather(self._runner, return_exceptions=True)
+            self._runner = None
+
+    async def _run(self):
+        while True:
+            try:
+                async with self._connection:
+                    while True:
+                        await self._poll()
+                        await asyncio.sleep(self.poll_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Could not fetch task statuses from the MCP server, reconnecting: {e}")
+                await asyncio.sleep(self.reconnect_delay)
+
+    async def _poll(self):
+        tasks = self.store.unfinished()
+        if not tasks:
+            return
+        jobs = await self._fetch_statuses([task.task_id for task in tasks])
+        for task in tasks:
+            job = jobs.get(task.task_id, {"status": TaskStatus.NOT_FOUND.value})
+            updated = self._apply(task, job)
+            if updated != task:
+                self.store.save(updated)
+                self._publish(updated)
+
+    @staticmethod
+    def _apply(task: TaskProgress, job: dict) -> TaskProgress:
+        status = TaskStatus(job["status"])
+        if status == TaskStatus.NOT_FOUND:
+            # The MCP server keeps jobs in memory, so it has restarted since the task was queued.
+            return task.model_copy(
+                update={
+                    "status": TaskStatus.FAILED,
+                    "error": "The MCP server no longer knows this task; submit the video again to resume it",
+                    "updated_at": datetime.now(),
+                    "finished_at": datetime.now(),
+                }
+            )
+
+        fields = {
+            "status": status,
+            "stage": job.get("stage"),
+            "progress": job.get("progress", task.progress),
+            "stage_progress": job.get("stage_progress", task.stage_progress),
+            "error": job.get("error"),
+            "finished_at": job.get("finished_at"),
+        }
+        updated = TaskProgress.model_validate({**task.model_dump(), **fields})
+        if updated == task:
+            return task
+        return updated.model_copy(update={"updated_at": datetime.now()})
+
+    def _publish(self, task: TaskProgress):
+        for queue in self._subscribers.get(task.task_id, ()):
+            queue.put_nowait(task)
@@ -0,0 +1,105 @@
+import hashlib
+import threading
+import time
+from typing import Dict, List
+
+import numpy as np
+import PIL.Image
+import pixeltable as pxt
+from pixeltable.func import Batch
+
+from agent_mcp.config import get_settings
+
+settings = get_settings()
+
+FAKE_EMBEDDING_DIM = 512
+FAKE_VOCABULARY = [
+    "video", "frame", "scene", "person", "street", "color", "pattern", "signal",
+    "music", "voice", "camera", "light", "motion", "object", "screen", "sound",
+]  # fmt: skip
+
+_STATS_LOCK = threading.Lock()
+_STAGE_STATS: Dict[str, Dict[str, float]] = {}
+
+
+def _record_stage(stage: str, items: int, started_at: float):
+    with _STATS_LOCK:
+        stats = _STAGE_STATS.setdefault(stage, {"calls": 0, "items": 0, "busy_seconds": 0.0})
+        stats["calls"] += 1
+        stats["items"] += items
+        stats["busy_seconds"] += time.perf_counter() - started_at
+
+
+def stage_stats() -> Dict[str, Dict[str, float]]:
+    """Calls, items and busy seconds of every fake model stage so far"""
+    with _STATS_LOCK:
+        return {stage: dict(stats) for stage, stats in _STAGE_STATS.items()}
+
+
+def reset_stage_stats():
+    with _STATS_LOCK:
+        _STAGE_STATS.clear()
+
+
+def _words(seed: bytes, count: int) -> str:
+    digest = hashlib.sha256(seed).digest()
+    return " ".join(FAKE_VOCABULARY[digest[i] % len(FAKE_VOCABULARY)] for i in range(count))
+
+
+def _normalize(vectors: np.ndarray) -> List[np.ndarray]:
+    vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    return list(vectors.astype(np.float32))
+
+
+_IMAGE_PROJECTION = np.random.default_rng(0).standard_normal((16 * 16 * 3, FAKE_EMBEDDING_DIM)).astype(np.float32)
+
+
+@pxt.udf
+def fake_transcription(audio: pxt.Audio, *, latency: float) -> pxt.Json:
+    """Deterministic stand-in for a transcription API, in the same response shape"""
+    started_at = time.perf_counter()
+    with open(audio, "rb") as f:
+        text = _words(f.read(), 12)
+    time.sleep(latency)
+    _record_stage("transcription", 1, started_at)
+    return {"text": text}
+
+
+@pxt.udf(batch_size=settings.CAPTION_BATCH_SIZE)
+def fake_captions(images: Batch[PIL.Image.Image], *, latency: float) -> Batch[str]:
+    """Deterministic stand-in for the captioning client; `latency` is paid once per batch"""
+    started_at = time.perf_counter()
+    captions = [_words(image.convert("RGB").resize((8, 8)).tobytes(), 8) for image in images]
+    time.sleep(latency)
+    _record_stage("captioning", len(captions), started_at)
+    return captions
+
+
+@pxt.udf(batch_size=settings.EMBEDDING_BATCH_SIZE)
+def fake_image_embedding(
+    images: Batch[PIL.Image.Image], *, latency: float
+) -> Batch[pxt.Array[(FAKE_EMBEDDING_DIM,), pxt.Float]]:
+    """Deterministic stand-in for CLIP image embeddings; `latency` is paid per image"""
+    started_at = time.perf_counter()
+    pixels = np.stack(
+        [np.asarray(image.convert("RGB").resize((16, 16)), dtype=np.float32).ravel() / 255.0 for image in images]
+    )
+    time.sleep(latency * len(images))
+    embeddings = _normalize(pixels @ _IMAGE_PROJECTION)
+    _record_stage("image_embedding", len(embeddings), started_at)
+    return embeddings
+
+
+@pxt.udf(batch_size=settings.EMBEDDING_BATCH_SIZE)
+def fake_text_embedding(texts: Batch[str], *, latency: float) -> Batch[pxt.Array[(FAKE_EMBEDDING_DIM,), pxt.Float]]:
+    """Deterministic stand-in for text embeddings: hashed bag of words; `latency` is paid per text"""
+    started_at = time.perf_counter()
+    vectors = np.zeros((len(texts), FAKE_EMBEDDING_DIM), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for word in text.lower().split():
+            bucket = int.from_bytes(hashlib.md5(word.encode()).digest()[:4], "little")
+            vectors[row, bucket % FAKE_EMBEDDING_DIM] += 1.0
+    time.sleep(latency * len(texts))
+    embeddings = _normalize(vectors)
+    _record_stage("text_embedding", len(embeddings), started_at)
+    return embeddings
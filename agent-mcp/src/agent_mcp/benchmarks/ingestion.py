@@ -0,0 +1,223 @@
+import json
+import os
+import resource
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import click
+from loguru import logger
+
+logger = logger.bind(name="IngestionBenchmark")
+
+
+def _process_write_bytes() -> Optional[int]:
+    """Bytes this process has written to storage so far (Linux only)"""
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("write_bytes:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _directory_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def _git_commit() -> Optional[str]:
+    result = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True)
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+@click.command()
+@click.option("--duration", default=120.0, help="Length of the synthetic video in seconds")
+@click.option("--width", default=1280, help="Width of the synthetic video")
+@click.option("--height", default=720, help="Height of the synthetic video")
+@click.option("--fps", default=30, help="Frame rate of the synthetic video")
+@click.option("--audio", type=click.Choice(["speech", "sine", "silence", "none"]), default="speech", help="Audio track content")
+@click.option("--transcription-latency", default=0.5, help="Seconds the fake transcription takes per audio chunk")
+@click.option("--caption-latency", default=1.0, help="Seconds the fake captioning takes per batch of frames")
+@click.option("--embedding-latency", default=0.0, help="Seconds the fake embeddings take per item")
+@click.option(
+    "--memory-budget-mb",
+    default=0,
+    help="Run with INGESTION_MEMORY_BUDGET_MB set and fail if peak RSS exceeds it (0 disables)",
+)
+@click.option("--workdir", default=None, help="Directory for the video, registry and pixeltable data (temporary by default)")
+@click.option("--output", default=None, help="Write the JSON report to this file instead of stdout")
+def run_benchmark(
+    duration,
+    width,
+    height,
+    fps,
+    audio,
+    transcription_latency,
+    caption_latency,
+    embedding_latency,
+    memory_budget_mb,
+    workdir,
+    output,
+):
+    """
+    Ingest a synthetic video with deterministic local model stand-ins and report
+    per-stage timings, throughput and resource usage as JSON.
+
+    Ingestion settings (INGESTION_SINGLE_PASS, FRAME_SAMPLING_MODE, ...) are read from
+    the environment as usual, so configurations can be compared with the same video.
+    """
+    commit = _git_commit()
+    output_path = Path(output).resolve() if output else None
+    workdir = Path(workdir or tempfile.mkdtemp(prefix="ingestion_benchmark_")).resolve()
+    workdir.mkdir(parents=True, exist_ok=True)
+
+    # Everything the run writes stays in the work directory, and no provider credentials are needed.
+    os.environ.setdefault("PIXELTABLE_HOME", str(workdir / "pixeltable"))
+    os.environ.setdefault("GEMINI_API_KEY", "offline-benchmark")
+    os.environ.setdefault("OPIK_API_KEY", "offline-benchmark")
+    if memory_budget_mb:
+        os.environ["INGESTION_MEMORY_BUDGET_MB"] = str(memory_budget_mb)
+    os.chdir(workdir)
+
+    # Imported only now, so pixeltable and the settings pick up the environment above.
+    from agent_mcp.benchmarks.fakes import (
+        fake_captions,
+        fake_image_embedding,
+        fake_text_embedding,
+        fake_transcription,
+        reset_stage_stats,
+        stage_stats,
+    )
+    from agent_mcp.benchmarks.synthetic import generate_synthetic_video
+    from agent_mcp.config import get_settings
+    from agent_mcp.video.ingestion.tools import re_encode_video
+    from agent_mcp.video.ingestion.video_processor import IngestionModels, VideoProcessor
+
+    settings = get_settings()
+    text_embedding = fake_text_embedding.using(latency=embedding_latency)
+    processor = VideoProcessor(
+        models=IngestionModels(
+            transcription=fake_transcription.using(latency=transcription_latency),
+            captioning=fake_captions.using(latency=caption_latency),
+            image_embedding=fake_image_embedding.using(latency=embedding_latency),
+            caption_embedding=text_embedding,
+            transcript_embedding=text_embedding,
+        )
+    )
+    reset_stage_stats()
+
+    started_at = time.perf_counter()
+    video_path = generate_synthetic_video(
+        str(workdir / f"synthetic_{width}x{height}_{fps}fps_{duration:.0f}s_{audio}.mp4"),
+        duration=duration,
+        width=width,
+        height=height,
+        fps=fps,
+        audio=audio,
+    )
+    generate_seconds = time.perf_counter() - started_at
+
+    write_bytes_before = _process_write_bytes()
+
+    started_at = time.perf_counter()
+    processor.setup_table(video_name=video_path)
+    setup_seconds = time.perf_counter() - started_at
+
+    # add_video reuses the converted file, so conversion is timed on its own here.
+    started_at = time.perf_counter()
+    re_encode_video(video_path=video_path)
+    convert_seconds = time.perf_counter() - started_at
+
+    started_at = time.perf_counter()
+    processor.add_video(video_path=video_path)
+    ingest_seconds = time.perf_counter() - started_at
+
+    write_bytes_after = _process_write_bytes()
+    frames_indexed = processor.frames_view.count()
+    audio_chunks_indexed = processor.audio_chunks.count()
+    audio_seconds = duration if audio != "none" else 0.0
+
+    report = {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(),
+        "video": {
+            "path": video_path,
+            "duration_sec": duration,
+            "width": width,
+            "height": height,
+            "fps": fps,
+            "audio": audio,
+            "size_bytes": Path(video_path).stat().st_size,
+        },
+        "settings": {
+            key: getattr(settings, key)
+            for key in (
+                "INGESTION_SINGLE_PASS",
+                "INGESTION_STREAMING_MODE",
+                "STREAMING_SEGMENT_SECONDS",
+                "INGESTION_MEMORY_BUDGET_MB",
+                "INGESTION_SHARD_WORKERS",
+                "INGESTION_SHARD_SECONDS",
+                "FRAME_SAMPLING_MODE",
+                "SPLIT_FRAMES_COUNT",
+                "IMAGE_RESIZE_WIDTH",
+                "IMAGE_RESIZE_HEIGHT",
+                "AUDIO_CHUNK_LENGTH",
+                "AUDIO_VAD_ENABLED",
+                "CAPTION_BATCH_SIZE",
+                "EMBEDDING_BATCH_SIZE",
+            )
+        },
+        "latency": {
+            "transcription_sec_per_chunk": transcription_latency,
+            "caption_sec_per_batch": caption_latency,
+            "embedding_sec_per_item": embedding_latency,
+        },
+        "stages": {
+            "generate_seconds": generate_seconds,
+            "setup_seconds": setup_seconds,
+            "convert_seconds": convert_seconds,
+            "ingest_seconds": ingest_seconds,
+            "models": stage_stats(),
+        },
+        "throughput": {
+            "frames_indexed": frames_indexed,
+            "frames_per_sec": frames_indexed / ingest_seconds,
+            "audio_chunks_indexed": audio_chunks_indexed,
+            "audio_seconds_per_sec": audio_seconds / ingest_seconds,
+            "audio_seconds_skipped": processor.checkpoint.audio_seconds_skipped,
+            "realtime_factor": duration / ingest_seconds,
+        },
+        "resources": {
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            "peak_child_rss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+            "disk_written_bytes": (
+                write_bytes_after - write_bytes_before if write_bytes_before is not None else None
+            ),
+            "workdir_bytes": _directory_size(workdir),
+        },
+    }
+
+    peak_rss_mb = report["resources"]["peak_rss_mb"]
+    if memory_budget_mb:
+        report["resources"]["within_memory_budget"] = peak_rss_mb <= memory_budget_mb
+
+    report_json = json.dumps(report, indent=4)
+    if output_path:
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        output_path.write_text(report_json)
+        logger.info(f"Benchmark report written to {output_path}")
+    else:
+        click.echo(report_json)
+
+    if memory_budget_mb and peak_rss_mb > memory_budget_mb:
+        raise click.ClickException(f"Peak RSS of {peak_rss_mb:.0f} MB exceeded the {memory_budget_mb} MB budget")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,59 @@
+import subprocess
+import time
+from pathlib import Path
+from typing import List, Literal
+
+from loguru import logger
+
+logger = logger.bind(name="SyntheticVideos")
+
+AudioSource = Literal["speech", "sine", "silence", "none"]
+
+# Voiced harmonics gated into ~3 syllables per second, so voice activity detection treats it as speech.
+# (No commas: they would split the lavfi filter graph.)
+SPEECH_LIKE_EXPRESSION = "0.3*(sin(2*PI*180*t)+0.5*sin(2*PI*720*t)+0.3*sin(2*PI*1500*t))*(1+sgn(sin(2*PI*3*t)+0.2))/2"
+
+
+def generate_synthetic_video(
+    output_path: str,
+    duration: float,
+    width: int = 1280,
+    height: int = 720,
+    fps: int = 30,
+    audio: AudioSource = "speech",
+    sine_frequency: int = 440,
+) -> str:
+    """
+    Render a synthetic H.264/AAC test video with ffmpeg's `testsrc` and audio sources.
+
+    The output is the same for the same arguments, so runs on different commits
+    ingest identical input.
+    """
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    command: List[str] = [
+        "ffmpeg",
+        "-f",
+        "lavfi",
+        "-i",
+        f"testsrc=duration={duration}:size={width}x{height}:rate={fps}",
+    ]
+    if audio == "speech":
+        command += ["-f", "lavfi", "-i", f"aevalsrc={SPEECH_LIKE_EXPRESSION}:s=44100:d={duration}"]
+    elif audio == "sine":
+        command += ["-f", "lavfi", "-i", f"sine=frequency={sine_frequency}:duration={duration}:sample_rate=44100"]
+    elif audio == "silence":
+        command += ["-f", "lavfi", "-i", f"anullsrc=channel_layout=stereo:sample_rate=44100:d={duration}"]
+
+    command += ["-c:v", "libx264", "-pix_fmt", "yuv420p", "-g", str(fps * 2)]
+    if audio != "none":
+        command += ["-c:a", "aac", "-shortest"]
+    command += ["-fflags", "+bitexact", "-flags:v", "+bitexact", "-movflags", "+faststart", "-y", output_path]
+
+    logger.info(f"Generating synthetic video: {' '.join(command)}")
+    started_at = time.perf_counter()
+    try:
+        subprocess.run(command, capture_output=True, text=True, check=True)
+    except subprocess.CalledProcessError as e:
+        raise IOError(f"Failed to generate synthetic video {output_path}: {e.stderr}")
+    logger.info(f"Generated {duration:.0f}s {width}x{height} video in {time.perf_counter() - started_at:.2f}s")
+    return output_path
@@ -1,4 +1,5 @@
 from functools import lru_cache
+from typing import Literal
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -22,6 +23,50 @@ class Settings(BaseSettings):
     AUDIO_OVERLAP_SECONDS: int = 1
     AUDIO_MIN_CHUNK_DURATION_SECONDS: int = 1
 
+    # --- Voice Activity Detection Configuration ---
+    AUDIO_VAD_ENABLED: bool = True
+    AUDIO_VAD_FRAME_MS: int = 30
+    AUDIO_VAD_MIN_ENERGY_DBFS: float = -55.0
+    AUDIO_VAD_ENERGY_MARGIN_DB: float = 12.0
+    AUDIO_VAD_SPEECH_BAND_RATIO: float = 0.4
+    AUDIO_VAD_MIN_SPEECH_SECONDS: float = 0.3
+    AUDIO_VAD_MERGE_GAP_SECONDS: float = 0.8
+    AUDIO_VAD_PADDING_SECONDS: float = 0.2
+    AUDIO_VAD_MIN_PAUSE_RATIO: float = 0.1  # chunks with fewer pauses are treated as music
+
+    # --- Video Ingestion Scheduler Configuration ---
+    INGESTION_MAX_WORKERS: int = 4
+    INGESTION_QUEUE_SIZE: int = 512
+    INGESTION_JOB_HISTORY_LIMIT: int = 1000  # finished jobs kept for status queries
+    PROCESS_VIDEO_TIMEOUT_SECONDS: float = 10.0  # how long process_video waits before returning the running job
+
+    # --- Single-Pass Ingestion Configuration ---
+    INGESTION_SINGLE_PASS: bool = True
+
+    # --- Streaming Ingestion Configuration ---
+    INGESTION_STREAMING_MODE: bool = False
+    STREAMING_SEGMENT_SECONDS: float = 60.0
+    STREAMING_FRAMES_PER_SEGMENT: int = 6
+    # Resident memory of the ingestion process; 0 disables the budget. When set, single-pass
+    # ingestion commits its window early on reaching it, and fails the job if releasing
+    # everything buffered does not bring memory back under it.
+    INGESTION_MEMORY_BUDGET_MB: int = 0
+
+    # --- Sharded Ingestion Configuration ---
+    # With more than one worker, single-pass ingestion splits videos longer than a shard at
+    # keyframes and decodes, samples and chunks the shards in parallel processes.
+    INGESTION_SHARD_WORKERS: int = 0
+    INGESTION_SHARD_SECONDS: float = 600.0
+
+    # --- Frame Sampling Configuration ---
+    FRAME_SAMPLING_MODE: Literal["fixed", "scene"] = "scene"
+    SCENE_CHANGE_THRESHOLD: float = 0.3
+    SCENE_DETECTION_PROBE_FPS: float = 4.0
+    FRAME_SAMPLING_MIN_FPS: float = 0.1
+    FRAME_SAMPLING_MAX_FPS: float = 1.0
+    FRAME_SAMPLING_BUDGET_PER_MINUTE: int = 20
+    FRAME_DEDUP_HAMMING_THRESHOLD: int = 6  # negative disables near-duplicate suppression
+
     # --- Transcription Similarity Search COnfiguration ---
     TRANSCRIPT_SIMILARITAY_EMB_MODEL: str = ""
 
@@ -37,11 +82,49 @@ class Settings(BaseSettings):
     CAPTION_MODEL_PROMPT: str = "Describe what is happening in the image"
     DELTA_SECONDS_FRAME_INTERVAL: float = 5.0
 
+    # --- Caption Request Throughput Configuration ---
+    CAPTION_API_BASE_URL: str = "https://generativelanguage.googleapis.com/v1beta"
+    CAPTION_BATCH_SIZE: int = 16
+    CAPTION_MAX_IN_FLIGHT: int = 8
+    CAPTION_RATE_LIMIT_PER_SECOND: float = 5.0
+    CAPTION_RATE_LIMIT_BURST: int = 10
+    CAPTION_MAX_RETRIES: int = 5
+    CAPTION_RETRY_BASE_DELAY_SECONDS: float = 0.5
+    CAPTION_RETRY_MAX_DELAY_SECONDS: float = 30.0
+    CAPTION_IMAGES_PER_REQUEST: int = 1
+    CAPTION_REQUEST_TIMEOUT_SECONDS: float = 60.0
+
+    # --- CLIP Embedding Throughput Configuration ---
+    EMBEDDING_BATCH_SIZE: int = 64
+    EMBEDDING_TORCH_THREADS: int = 0  # 0 uses every core
+
+    # --- Query Embedding Cache Configuration ---
+    QUERY_EMBEDDING_CACHE_SIZE: int = 4096  # embeddings kept per process; 0 disables
+
+    # --- Transcription Throughput Configuration ---
+    TRANSCRIPTION_BATCH_SIZE: int = 8
+    TRANSCRIPTION_MAX_IN_FLIGHT: int = 4
+
+    # --- Model Result Cache Configuration ---
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_PATH: str = ".records/result_cache.sqlite3"
+    RESULT_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+
     # --- Video Search Engine COnfiguration ---
-    VIDEO_CLIP_SPEECH_SEARCH_TOP_K : int = 1
-    VIDEO_CLIP_CAPTION_SEARCH_TOP_K : int = 1
+    # Hits each modality contributes to a fused search, and the image search tool's top k
+    VIDEO_CLIP_SPEECH_SEARCH_TOP_K : int = 10
+    VIDEO_CLIP_CAPTION_SEARCH_TOP_K : int = 10
     VIDEO_CLIP_IMAGE_SEARCH_TOP_K : int = 1
+    SEARCH_FUSION_RRF_K: int = 60
+    SEARCH_MAX_WORKERS: int = 8
     QUESTION_ANSWER_TOP_K : int = 3
+    SEARCH_SNAPSHOTS_ENABLED: bool = True  # export finished indexes and search them with NumPy
+    SEARCH_ENGINE_CACHE_SIZE: int = 32  # opened video indexes kept per process; 0 disables
+
+    # --- Library Search Configuration ---
+    LIBRARY_SEARCH_TOP_K: int = 10
+    LIBRARY_SEARCH_CANDIDATES: int = 20  # hits per modality kept from each video and overall
+    LIBRARY_SEARCH_SHARD_SIZE: int = 64  # videos searched by one worker
 
 
 @lru_cache(maxsize=1)
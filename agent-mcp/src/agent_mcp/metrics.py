@@ -0,0 +1,142 @@
+import functools
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable, Iterator, Optional, TypeVar
+
+from loguru import logger
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+logger = logger.bind(name="Metrics")
+
+T = TypeVar("T")
+
+# Spans sub-second searches up to half-hour ingestion jobs.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+INGESTION_STAGE_SECONDS = Histogram(
+    "agent_mcp_ingestion_stage_seconds",
+    "Wall time of video ingestion stages",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+INGESTION_STAGE_FAILURES = Counter(
+    "agent_mcp_ingestion_stage_failures_total",
+    "Video ingestion stages that raised",
+    ["stage"],
+)
+INGESTION_JOBS = Counter("agent_mcp_ingestion_jobs_total", "Finished ingestion jobs", ["status"])
+INGESTION_JOBS_DEDUPLICATED = Counter(
+    "agent_mcp_ingestion_jobs_deduplicated_total",
+    "Submissions attached to a job already ingesting the same video",
+)
+INGESTION_JOBS_IN_PROGRESS = Gauge("agent_mcp_ingestion_jobs_in_progress", "Ingestion jobs being processed")
+INGESTION_BACKLOG = Gauge("agent_mcp_ingestion_backlog", "Ingestion jobs waiting for a free worker")
+
+MODEL_BATCH_SECONDS = Histogram(
+    "agent_mcp_model_batch_seconds",
+    "Wall time of batched model calls made during ingestion and search",
+    ["model"],
+    buckets=LATENCY_BUCKETS,
+)
+
+RESULT_CACHE_LOOKUPS = Counter(
+    "agent_mcp_result_cache_lookups_total",
+    "Transcription and caption result cache lookups",
+    ["kind", "result"],
+)
+
+QUERY_EMBEDDING_CACHE_LOOKUPS = Counter(
+    "agent_mcp_query_embedding_cache_lookups_total",
+    "Search query embedding cache lookups",
+    ["model", "result"],
+)
+
+SEARCH_SECONDS = Histogram(
+    "agent_mcp_search_seconds",
+    "Latency of video index searches",
+    ["modality"],
+    buckets=LATENCY_BUCKETS,
+)
+SEARCH_FAILURES = Counter("agent_mcp_search_failures_total", "Video index searches that raised", ["modality"])
+SEARCH_ENGINE_CACHE_LOOKUPS = Counter(
+    "agent_mcp_search_engine_cache_lookups_total",
+    "Lookups of opened video indexes in the search engine cache",
+    ["result"],
+)
+
+TOOL_CALL_SECONDS = Histogram(
+    "agent_mcp_tool_call_seconds",
+    "Latency of MCP tool calls",
+    ["tool"],
+    buckets=LATENCY_BUCKETS,
+)
+TOOL_CALL_FAILURES = Counter("agent_mcp_tool_call_failures_total", "MCP tool calls that raised", ["tool"])
+
+FFMPEG_SECONDS = Histogram(
+    "agent_mcp_ffmpeg_seconds",
+    "Wall time of ffmpeg and ffprobe subprocesses",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+FFMPEG_FAILURES = Counter("agent_mcp_ffmpeg_failures_total", "ffmpeg and ffprobe runs that failed", ["operation"])
+
+
+@contextmanager
+def _timed(histogram: Histogram, failures: Optional[Counter], **labels: str) -> Iterator[None]:
+    started_at = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        if failures is not None:
+            failures.labels(**labels).inc()
+        raise
+    finally:
+        histogram.labels(**labels).observe(time.perf_counter() - started_at)
+
+
+def track_stage(stage: str):
+    """Time an ingestion stage and count its failures"""
+    return _timed(INGESTION_STAGE_SECONDS, INGESTION_STAGE_FAILURES, stage=stage)
+
+
+def track_batches(stage: str, batches: Iterable[T]) -> Iterator[T]:
+    """Time how long an ingestion stage takes to produce each item of a lazy iterator"""
+    batches = iter(batches)
+    while True:
+        with track_stage(stage):
+            batch = next(batches, None)
+        if batch is None:
+            return
+        yield batch
+
+
+def track_search(modality: str):
+    """Time a search over one modality and count its failures; also usable as a decorator"""
+    return _timed(SEARCH_SECONDS, SEARCH_FAILURES, modality=modality)
+
+
+def track_ffmpeg(operation: str):
+    """Time an ffmpeg or ffprobe subprocess and count its failures"""
+    return _timed(FFMPEG_SECONDS, FFMPEG_FAILURES, operation=operation)
+
+
+def track_model_batch(model: str):
+    """Time a batched model call"""
+    return _timed(MODEL_BATCH_SECONDS, None, model=model)
+
+
+def instrument_tool(fn: Callable) -> Callable:
+    """Record latency and failures of an MCP tool, keeping its signature for FastMCP"""
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with _timed(TOOL_CALL_SECONDS, TOOL_CALL_FAILURES, tool=fn.__name__):
+            return fn(*args, **kwargs)
+
+    return wrapper
+
+
+def start_metrics_server(host: str, port: int):
+    """Serve every metric in Prometheus text format on http://host:port/metrics"""
+    start_http_server(port, addr=host)
+    logger.info(f"Prometheus metrics available at http://{host}:{port}/metrics")
@@ -1,6 +1,7 @@
 from typing import Dict
-from agent_mcp.video.ingestion.models import CachedTable , CachedTableMetadata
-from agent_mcp.video.ingestion.registry import get_registry
+from agent_mcp.video.ingestion.registry import get_index_metadata, get_registry
+from agent_mcp.video.library_search import get_library_index
+from agent_mcp.video.video_search_engine import get_search_engine
 
 
 def list_tables() -> Dict[str,str]:
@@ -11,6 +12,7 @@ def list_tables() -> Dict[str,str]:
     response = {
         "message": "current processed videos",
         "indexes": keys,
+        "resumable": [key for key in keys if get_index_metadata(key).status == "ingesting"],
     }
     return response
 
@@ -18,8 +20,12 @@ def table_info(table_name:str)->str:
     registry = get_registry()
     if table_name not in registry:
         return f"Video Index '{table_name}' does not exist"
-    table_metadata = registry[table_name]
-    table_info = CachedTableMetadata(**table_metadata)
-    table = CachedTable.from_metadata(table_info)
-    response = table.describe()
+    response = get_search_engine(table_name).video_index.describe()
+    return response
+
+def library_index_info() -> Dict[str,int]:
+    response = {
+        "message": "library index searched by search_video_library",
+        **get_library_index().info(),
+    }
     return response
@@ -1,24 +1,50 @@
 import click
 from fastmcp import FastMCP
 
+from agent_mcp.metrics import start_metrics_server
 from agent_mcp.prompts import general_system_prompt, routing_system_prompt, tool_use_system_prompt
-from agent_mcp.resources import list_tables
+from agent_mcp.resources import library_index_info, list_tables
 from agent_mcp.tools import (
     ask_question_about_video,
+    enqueue_video,
     get_video_clip_from_image,
     get_video_clip_from_user_query,
+    get_video_processing_status,
+    get_video_processing_statuses,
     process_video,
+    search_video_library,
 )
 
 
 def add_mcp_tools(mcp: FastMCP):
     mcp.add_tool(
         name="process_video",
-        description="Process a video file and prepare it for searching.",
+        description="Process a video file for searching and return its ingestion job, finished or still running.",
         fn=process_video,
         tags={"video", "process"},
     )
 
+    mcp.add_tool(
+        name="enqueue_video",
+        description="Queue a video file for background processing and return the ingestion job id.",
+        fn=enqueue_video,
+        tags={"video", "process"},
+    )
+
+    mcp.add_tool(
+        name="get_video_processing_status",
+        description="Get the status of a video processing job created with enqueue_video.",
+        fn=get_video_processing_status,
+        tags={"video", "process", "status"},
+    )
+
+    mcp.add_tool(
+        name="get_video_processing_statuses",
+        description="Get the status of several video processing jobs at once, keyed by job id.",
+        fn=get_video_processing_statuses,
+        tags={"video", "process", "status"},
+    )
+
     mcp.add_tool(
         name="get_video_clip_from_user_query",
         description="Use this tool to get a video clip from a video file based on a user query or question.",
@@ -40,6 +66,13 @@ def add_mcp_tools(mcp: FastMCP):
         tags={"ask", "question", "information"},
     )
 
+    mcp.add_tool(
+        name="search_video_library",
+        description="Use this tool to find which processed videos, and which moments in them, match a user query.",
+        fn=search_video_library,
+        tags={"video", "library", "query", "search"},
+    )
+
 
 def add_mcp_resources(mcp: FastMCP):
     mcp.add_resource_fn(
@@ -50,6 +83,14 @@ def add_mcp_resources(mcp: FastMCP):
         tags={"resource", "all"},
     )
 
+    mcp.add_resource_fn(
+        fn=library_index_info,
+        uri="file:///app/.records/library.json",
+        name="library_index",
+        description="Summarize the library index searched across all processed videos.",
+        tags={"resource", "all", "library"},
+    )
+
 
 def add_mcp_prompts(mcp: FastMCP):
     mcp.add_prompt(
@@ -85,10 +126,13 @@ add_mcp_resources(mcp)
 @click.option("--port", default=9090, help="FastMCP server port")
 @click.option("--host", default="0.0.0.0", help="FastMCP server host")
 @click.option("--transport", default="streamable-http", help="MCP Transport protocol type")
-def run_mcp(port, host, transport):
+@click.option("--metrics-port", default=9091, help="Prometheus metrics port, 0 to disable")
+def run_mcp(port, host, transport, metrics_port):
     """
     Run the FastMCP server with the specified port, host, and transport protocol.
     """
+    if metrics_port:
+        start_metrics_server(host=host, port=metrics_port)
     mcp.run(host=host, port=port, transport=transport)
 
 
@@ -1,41 +1,72 @@
-from typing import Dict
+from typing import Any, Dict, List, Optional
 from uuid import uuid4
 
 from loguru import logger
 
 from agent_mcp.config import get_settings
+from agent_mcp.metrics import instrument_tool
+from agent_mcp.video.ingestion.models import IngestionJobStatus
+from agent_mcp.video.ingestion.scheduler import get_scheduler
 from agent_mcp.video.ingestion.tools import extract_video_clip
-from agent_mcp.video.ingestion.video_processor import VideoProcessor
-from agent_mcp.video.video_search_engine import VideoSearchEngine
+from agent_mcp.video.library_search import get_library_index
+from agent_mcp.video.video_search_engine import get_search_engine
 
 logger = logger.bind(name="MCPVideoTools")
-video_processor = VideoProcessor()
 settings = get_settings()
 
 
-def process_video(video_path: str) -> str:
-    """Process a video file and prepare it for searching.    """
-    exists = video_processor._check_if_exists(video_path)
-    if exists:
-        logger.info(f"Video index for '{video_path}' already exists and is ready for use.")
-        return False
-    video_processor.setup_table(video_name=video_path)
-    is_done = video_processor.add_video(video_path=video_path)
-    return is_done
+@instrument_tool
+def process_video(video_path: str, content_hash: Optional[str] = None) -> Dict[str, Any]:
+    """Process a video file and prepare it for searching.
 
+    Waits briefly so short videos come back finished; otherwise returns the running
+    job, whose progress is polled with get_video_processing_status.
+    """
+    scheduler = get_scheduler()
+    job = scheduler.submit(video_path, content_hash=content_hash)
+    job = scheduler.wait(job.job_id, timeout=settings.PROCESS_VIDEO_TIMEOUT_SECONDS) or job
+    if job.status == IngestionJobStatus.FAILED:
+        raise RuntimeError(f"Failed to process video '{video_path}': {job.error}")
+    if not job.is_finished:
+        logger.info(f"Still processing '{video_path}' after {settings.PROCESS_VIDEO_TIMEOUT_SECONDS:.0f}s")
+    return job.model_dump(mode="json")
 
-def get_video_clip_from_user_query(video_path: str, user_query: str) -> Dict[str, str]:
-    """Get a video clip based on the user query using speech and caption similarity."""
-    search_engine = VideoSearchEngine(video_path)
 
-    speech_clips = search_engine.search_by_speech(user_query, settings.VIDEO_CLIP_SPEECH_SEARCH_TOP_K)
-    caption_clips = search_engine.search_by_caption(user_query, settings.VIDEO_CLIP_CAPTION_SEARCH_TOP_K)
+@instrument_tool
+def enqueue_video(video_path: str, content_hash: Optional[str] = None) -> Dict[str, str]:
+    """Queue a video for background processing and return the ingestion job."""
+    job = get_scheduler().submit(video_path, content_hash=content_hash)
+    return job.model_dump(mode="json")
+
+
+def _job_status(job_id: str) -> Dict[str, Any]:
+    job = get_scheduler().get_job(job_id)
+    if job is None:
+        return {"job_id": job_id, "status": IngestionJobStatus.NOT_FOUND.value}
+    return job.model_dump(mode="json")
+
 
-    speech_sim = speech_clips[0]["similarity"] if speech_clips else 0
-    caption_sim = caption_clips[0]["similarity"] if caption_clips else 0
+@instrument_tool
+def get_video_processing_status(job_id: str) -> Dict[str, str]:
+    """Get the status of a queued video processing job."""
+    return _job_status(job_id)
 
-    video_clip_info = speech_clips[0] if speech_sim > caption_sim else caption_clips[0]
 
+@instrument_tool
+def get_video_processing_statuses(job_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Get the status of several video processing jobs in one call, keyed by job id."""
+    return {job_id: _job_status(job_id) for job_id in dict.fromkeys(job_ids)}
+
+
+@instrument_tool
+def get_video_clip_from_user_query(video_path: str, user_query: str) -> Dict[str, str]:
+    """Get a video clip based on the user query using speech and caption similarity."""
+    search_engine = get_search_engine(video_path)
+    clips = search_engine.search_fused(user_query, top_k=1)
+    if not clips:
+        return {"message": "No part of this video has been indexed yet, try again shortly."}
+
+    video_clip_info = clips[0]
     video_clip = extract_video_clip(
         video_path=video_path,
         start_time=video_clip_info["start_time"],
@@ -43,13 +74,16 @@ def get_video_clip_from_user_query(video_path: str, user_query: str) -> Dict[str
         output_path=f"./shared_media/{str(uuid4())}.mp4",
     )
 
-    return {"clip_path": video_clip.filename}
+    return {"clip_path": video_clip.filename, "indexed_until_sec": str(video_clip_info["indexed_until_sec"])}
 
 
+@instrument_tool
 def get_video_clip_from_image(video_path: str, user_image: str) -> Dict[str, str]:
     """Get a video clip based on similarity to a provided image. """
-    search_engine = VideoSearchEngine(video_path)
+    search_engine = get_search_engine(video_path)
     image_clips = search_engine.search_by_image(user_image, settings.VIDEO_CLIP_IMAGE_SEARCH_TOP_K)
+    if not image_clips:
+        return {"message": "No part of this video has been indexed yet, try again shortly."}
 
     video_clip = extract_video_clip(
         video_path=video_path,
@@ -58,13 +92,34 @@ def get_video_clip_from_image(video_path: str, user_image: str) -> Dict[str, str
         output_path=f"./shared_media/{str(uuid4())}.mp4",
     )
 
-    return {"clip_path": video_clip.filename}
+    return {"clip_path": video_clip.filename, "indexed_until_sec": str(image_clips[0]["indexed_until_sec"])}
 
 
+@instrument_tool
 def ask_question_about_video(video_path: str, user_query: str) -> Dict[str, str]:
     """Get relevant captions from the video based on the user's question.        answer (str): Concatenated relevant captions from the video."""
-    search_engine = VideoSearchEngine(video_path)
+    search_engine = get_search_engine(video_path)
     caption_info = search_engine.get_caption_info(user_query, settings.QUESTION_ANSWER_TOP_K)
 
     answer = "\n".join(entry["caption"] for entry in caption_info)
-    return {"answer": answer}
+    coverage = search_engine.get_coverage()
+    return {"answer": answer, "indexed_until_sec": str(coverage["indexed_until_sec"])}
+
+
+@instrument_tool
+def search_video_library(user_query: str) -> Dict[str, Any]:
+    """Find the moments matching the user query across every processed video."""
+    hits = get_library_index().search(user_query, settings.LIBRARY_SEARCH_TOP_K)
+    if not hits:
+        return {"message": "No processed video matches this query."}
+    return {
+        "hits": [
+            {
+                "video_path": hit["video"],
+                "start_time": hit["start_time"],
+                "end_time": hit["end_time"],
+                "score": hit["score"],
+            }
+            for hit in hits
+        ]
+    }
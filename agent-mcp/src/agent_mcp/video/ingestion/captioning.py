@@ -0,0 +1,222 @@
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Optional
+
+import httpx
+import PIL.Image
+import pixeltable as pxt
+from loguru import logger
+from pixeltable.func import Batch
+
+from agent_mcp.config import get_settings
+from agent_mcp.metrics import track_model_batch
+from agent_mcp.video.ingestion.result_cache import cached_results, image_content_hash, result_key
+from agent_mcp.video.ingestion.tools import encode_image
+
+logger = logger.bind(name="FrameCaptioning")
+
+settings = get_settings()
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Thread-safe token bucket limiting how many requests start per second."""
+
+    def __init__(self, rate: float, burst: int):
+        if rate <= 0 or burst < 1:
+            raise ValueError("Token bucket needs a positive rate and a burst of at least 1")
+        self.rate = rate
+        self.capacity = float(burst)
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available and take it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class CaptionRequestError(Exception):
+    """A caption request failed and was not retried."""
+
+
+class CaptioningClient:
+    """Caption frames through the Gemini `generateContent` REST API.
+
+    Requests go through a shared pool capped at `max_in_flight`, start no faster
+    than the token bucket allows, and are retried with full-jitter exponential
+    backoff on rate limits and transient errors. With `images_per_request > 1`,
+    several frames are captioned by one request that returns a JSON array.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str,
+        max_in_flight: int,
+        rate_limit_per_second: float,
+        rate_limit_burst: int,
+        max_retries: int,
+        retry_base_delay: float,
+        retry_max_delay: float,
+        images_per_request: int,
+        timeout: float,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.images_per_request = max(1, images_per_request)
+
+        self._http = httpx.Client(timeout=timeout)
+        self._bucket = TokenBucket(rate_limit_per_second, rate_limit_burst)
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="caption")
+
+        self._stats_lock = threading.Lock()
+        self.frames_captioned = 0
+        self.requests_sent = 0
+        self.retries = 0
+        self.busy_seconds = 0.0
+
+    @property
+    def frames_per_second(self) -> float:
+        """Frames captioned per second of captioning wall time so far."""
+        return self.frames_captioned / self.busy_seconds if self.busy_seconds else 0.0
+
+    def caption(self, images: List[PIL.Image.Image], prompt: str, model: str) -> List[str]:
+        """Caption a batch of frames, preserving their order."""
+        if not images:
+            return []
+        started_at = time.perf_counter()
+        groups = [images[i : i + self.images_per_request] for i in range(0, len(images), self.images_per_request)]
+        with track_model_batch("caption"):
+            futures = [self._executor.submit(self._caption_group, group, prompt, model) for group in groups]
+            captions = [caption for future in futures for caption in future.result()]
+
+        elapsed = time.perf_counter() - started_at
+        with self._stats_lock:
+            self.frames_captioned += len(images)
+            self.busy_seconds += elapsed
+        logger.info(
+            f"Captioned {len(images)} frames in {elapsed:.2f}s ({len(images) / elapsed:.2f} frames/s, "
+            f"{self.frames_per_second:.2f} frames/s overall, {self.retries} retries so far)"
+        )
+        return captions
+
+    def _caption_group(self, images: List[PIL.Image.Image], prompt: str, model: str) -> List[str]:
+        if len(images) == 1:
+            return [self._generate(model, self._request_body(images, prompt))]
+
+        body = self._request_body(images, self._multi_image_prompt(prompt, len(images)))
+        body["generationConfig"] = {"responseMimeType": "application/json"}
+        try:
+            captions = json.loads(self._generate(model, body))
+        except json.JSONDecodeError:
+            captions = None
+        if isinstance(captions, list) and len(captions) == len(images):
+            return [str(caption) for caption in captions]
+
+        logger.warning(f"Multi-image caption response did not match {len(images)} images, captioning one by one")
+        return [self._generate(model, self._request_body([image], prompt)) for image in images]
+
+    @staticmethod
+    def _multi_image_prompt(prompt: str, num_images: int) -> str:
+        return (
+            f"{prompt}\n\nYou are given {num_images} images. Answer with a JSON array of exactly "
+            f"{num_images} strings, one per image, in the order the images were given."
+        )
+
+    @staticmethod
+    def _request_body(images: List[PIL.Image.Image], prompt: str) -> dict:
+        parts = [{"text": prompt}]
+        parts += [{"inline_data": {"mime_type": "image/jpeg", "data": encode_image(image)}} for image in images]
+        return {"contents": [{"role": "user", "parts": parts}]}
+
+    def _generate(self, model: str, body: dict) -> str:
+        url = f"{self.base_url}/models/{model}:generateContent"
+        for attempt in range(self.max_retries + 1):
+            self._bucket.acquire()
+            retry_after: Optional[float] = None
+            try:
+                with self._stats_lock:
+                    self.requests_sent += 1
+                response = self._http.post(url, json=body, headers={"x-goog-api-key": self.api_key})
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    response.raise_for_status()
+                    return self._response_text(response)
+                error = f"HTTP {response.status_code}"
+                if "retry-after" in response.headers:
+                    try:
+                        retry_after = float(response.headers["retry-after"])
+                    except ValueError:
+                        pass
+            except httpx.TransportError as e:
+                error = str(e)
+            except httpx.HTTPStatusError as e:
+                raise CaptionRequestError(f"Caption request failed: {e}") from e
+
+            if attempt == self.max_retries:
+                raise CaptionRequestError(f"Caption request failed after {attempt + 1} attempts: {error}")
+
+            delay = random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2**attempt))
+            delay = max(delay, retry_after or 0.0)
+            with self._stats_lock:
+                self.retries += 1
+            logger.warning(f"Caption request failed ({error}), retrying in {delay:.2f}s")
+            time.sleep(delay)
+
+    @staticmethod
+    def _response_text(response: httpx.Response) -> str:
+        """Text of the first candidate, or an empty caption when the response has none (e.g. it was blocked)."""
+        try:
+            payload = response.json()
+            return payload["candidates"][0]["content"]["parts"][0]["text"]
+        except (ValueError, KeyError, IndexError, TypeError):
+            logger.warning(f"Caption response has no candidate text, leaving the caption empty: {response.text[:200]}")
+            return ""
+
+
+@lru_cache(maxsize=1)
+def get_captioning_client() -> CaptioningClient:
+    """
+    Get the process-wide captioning client, shared by every ingestion worker
+    """
+    return CaptioningClient(
+        api_key=settings.GEMINI_API_KEY,
+        base_url=settings.CAPTION_API_BASE_URL,
+        max_in_flight=settings.CAPTION_MAX_IN_FLIGHT,
+        rate_limit_per_second=settings.CAPTION_RATE_LIMIT_PER_SECOND,
+        rate_limit_burst=settings.CAPTION_RATE_LIMIT_BURST,
+        max_retries=settings.CAPTION_MAX_RETRIES,
+        retry_base_delay=settings.CAPTION_RETRY_BASE_DELAY_SECONDS,
+        retry_max_delay=settings.CAPTION_RETRY_MAX_DELAY_SECONDS,
+        images_per_request=settings.CAPTION_IMAGES_PER_REQUEST,
+        timeout=settings.CAPTION_REQUEST_TIMEOUT_SECONDS,
+    )
+
+
+@pxt.udf(batch_size=settings.CAPTION_BATCH_SIZE)
+def caption_images(images: Batch[PIL.Image.Image], *, prompt: str, model: str) -> Batch[str]:
+    """Caption a batch of frames with the shared rate-limited captioning client, reusing cached captions"""
+    images = list(images)
+    keys = [result_key("caption", image_content_hash(image), model, prompt) for image in images]
+
+    def caption_missing(positions: List[int]) -> List[str]:
+        return get_captioning_client().caption([images[idx] for idx in positions], prompt=prompt, model=model)
+
+    return cached_results("caption", keys, caption_missing)
@@ -0,0 +1,46 @@
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from loguru import logger
+
+import agent_mcp.video.ingestion.constants as cc
+from agent_mcp.video.ingestion.models import IngestionCheckpoint
+
+logger = logger.bind(name="IngestionCheckpoints")
+
+_CHECKPOINT_LOCK = threading.Lock()
+
+
+def _checkpoint_path(video_cache: str) -> Path:
+    return Path(cc.DEFAULT_CHECKPOINTS_DIR) / f"{video_cache}.json"
+
+
+def load_checkpoint(video_cache: str) -> Optional[IngestionCheckpoint]:
+    """
+    Load the ingestion checkpoint of a video index, if one was written
+    """
+    path = _checkpoint_path(video_cache)
+    if not path.exists():
+        return None
+    with _CHECKPOINT_LOCK:
+        return IngestionCheckpoint.model_validate_json(path.read_text())
+
+
+def save_checkpoint(checkpoint: IngestionCheckpoint):
+    """
+    Persist an ingestion checkpoint, replacing the previous one atomically
+    """
+    checkpoint.updated_at = datetime.now()
+    path = _checkpoint_path(checkpoint.video_cache)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".json.tmp")
+    with _CHECKPOINT_LOCK:
+        tmp_path.write_text(checkpoint.model_dump_json(indent=4))
+        os.replace(tmp_path, path)
+    logger.debug(
+        f"Checkpoint for '{checkpoint.video_cache}': {checkpoint.frames_captioned} frames, "
+        f"{checkpoint.chunks_transcribed} audio chunks, indexed until {checkpoint.indexed_until_sec:.1f}s"
+    )
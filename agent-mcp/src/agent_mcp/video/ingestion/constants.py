@@ -1 +1,3 @@
-DEFAULT_CACHED_TABLES_REGISTRY_DIR = ".records"
\ No newline at end of file
+DEFAULT_CACHED_TABLES_REGISTRY_DIR = ".records"
+DEFAULT_CHECKPOINTS_DIR = ".records/checkpoints"
+DEFAULT_SNAPSHOTS_DIR = ".records/snapshots"
@@ -0,0 +1,194 @@
+import time
+import wave
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import av
+import numpy as np
+from loguru import logger
+
+from agent_mcp.video.ingestion.frame_sampling import FrameSampler
+from agent_mcp.video.ingestion.memory import MemoryBudget
+from agent_mcp.video.ingestion.models import DemuxBatch
+
+logger = logger.bind(name="VideoDemux")
+
+AUDIO_SAMPLE_RATE = 16000
+# Demuxed packets between memory budget checks, each of which reads /proc.
+MEMORY_CHECK_INTERVAL_PACKETS = 32
+
+
+def write_wav_chunk(output_dir: Path, pos: int, samples: np.ndarray, sample_rate: int) -> Path:
+    """Write mono 16-bit PCM samples as the `pos`-th chunk WAV file in a directory"""
+    chunk_path = output_dir / f"chunk_{pos:06d}.wav"
+    with wave.open(str(chunk_path), "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(samples.tobytes())
+    return chunk_path
+
+
+def spill_frames(output_dir: Path, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Write sampled frames as lossless PNG files, replacing each image with its path"""
+    for record in records:
+        frame_path = output_dir / f"frame_{record['pos_frame']:08d}.png"
+        record["frame"].save(frame_path)
+        record["frame"] = str(frame_path)
+    return records
+
+
+class AudioChunker:
+    """Cut a mono 16-bit PCM stream into overlapping WAV chunks.
+
+    Produces the same rows as pixeltable's AudioSplitter, but straight from decoded
+    samples, so there is no intermediate MP3 to encode and decode again.
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        chunk_duration: float,
+        overlap: float,
+        min_chunk_duration: float,
+        sample_rate: int = AUDIO_SAMPLE_RATE,
+    ):
+        if overlap >= chunk_duration:
+            raise ValueError("Audio chunk overlap must be shorter than the chunk duration")
+
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.sample_rate = sample_rate
+        self.chunk_samples = int(chunk_duration * sample_rate)
+        self.step_samples = int((chunk_duration - overlap) * sample_rate)
+        self.min_chunk_samples = int(min_chunk_duration * sample_rate)
+
+        self.bytes_written = 0
+        self.covered_until_sec = 0.0
+        self._buffer = np.zeros(0, dtype=np.int16)
+        self._buffer_start_sample = 0
+        self._next_pos = 0
+
+    def push(self, samples: np.ndarray) -> List[Dict[str, Any]]:
+        """Append decoded samples and return every chunk that is now complete."""
+        self._buffer = np.concatenate([self._buffer, samples.astype(np.int16, copy=False)])
+        chunks = []
+        while len(self._buffer) >= self.chunk_samples:
+            chunks.append(self._write_chunk(self._buffer[: self.chunk_samples]))
+            self._buffer = self._buffer[self.step_samples :]
+            self._buffer_start_sample += self.step_samples
+        return chunks
+
+    def flush(self) -> List[Dict[str, Any]]:
+        """Write the trailing partial chunk, if it holds enough new audio."""
+        buffer_end_sec = (self._buffer_start_sample + len(self._buffer)) / self.sample_rate
+        if len(self._buffer) < self.min_chunk_samples or buffer_end_sec <= self.covered_until_sec:
+            return []
+        chunk = self._write_chunk(self._buffer)
+        self._buffer = np.zeros(0, dtype=np.int16)
+        return [chunk]
+
+    def _write_chunk(self, samples: np.ndarray) -> Dict[str, Any]:
+        pos = self._next_pos
+        self._next_pos += 1
+        chunk_path = write_wav_chunk(self.output_dir, pos, samples, self.sample_rate)
+        self.bytes_written += samples.nbytes
+
+        start_time = self._buffer_start_sample / self.sample_rate
+        end_time = start_time + len(samples) / self.sample_rate
+        self.covered_until_sec = end_time
+        return {"pos": pos, "audio_chunk": str(chunk_path), "start_time_sec": start_time, "end_time_sec": end_time}
+
+
+def demux_video(
+    video_path: str,
+    sampler: FrameSampler,
+    chunker: Optional[AudioChunker],
+    window_seconds: Optional[float] = None,
+    frame_dir: Optional[str] = None,
+    memory_budget: Optional[MemoryBudget] = None,
+) -> Iterator[DemuxBatch]:
+    """
+    Decode a video once and fan it out to the frame sampler and the audio chunker.
+
+    Batches are yielded in time order, every `window_seconds` of decoded media (or
+    once at the end when no window is given). Each batch carries a watermark below
+    which every sampled frame and audio chunk has been released.
+
+    With a `frame_dir`, sampled frames are written there as soon as they are taken,
+    so a long scene does not hold its samples in memory, and batches carry their
+    paths instead of images. With a `memory_budget`, a batch is also yielded as soon
+    as the process reaches the budget (checked every MEMORY_CHECK_INTERVAL_PACKETS
+    packets), and once the consumer has committed it the budget is enforced.
+    """
+    if frame_dir is not None:
+        Path(frame_dir).mkdir(parents=True, exist_ok=True)
+        sampler.on_sample = lambda record: spill_frames(Path(frame_dir), [record])
+
+    started_at = time.perf_counter()
+    with av.open(video_path) as container:
+        video_stream = container.streams.video[0]
+        video_stream.thread_type = "AUTO"
+        audio_stream = container.streams.audio[0] if container.streams.audio and chunker else None
+        resampler = (
+            av.AudioResampler(format="s16", layout="mono", rate=chunker.sample_rate) if audio_stream else None
+        )
+        streams = [stream for stream in (video_stream, audio_stream) if stream is not None]
+
+        frames: List[Dict[str, Any]] = []
+        chunks: List[Dict[str, Any]] = []
+        frame_number = 0
+        next_flush_sec = window_seconds
+        for packet_number, packet in enumerate(container.demux(*streams), start=1):
+            for frame in packet.decode():
+                if packet.stream.type == "video":
+                    frames += sampler.push_video_frame(frame, frame_number)
+                    frame_number += 1
+                else:
+                    for resampled in resampler.resample(frame):
+                        chunks += chunker.push(resampled.to_ndarray().reshape(-1))
+
+            position_sec = sampler.last_pos_msec / 1000.0
+            window_full = next_flush_sec is not None and position_sec >= next_flush_sec
+            over_budget = (
+                memory_budget is not None
+                and packet_number % MEMORY_CHECK_INTERVAL_PACKETS == 0
+                and memory_budget.exceeded()
+            )
+            if window_full or over_budget:
+                yield DemuxBatch(
+                    frames=frames,
+                    audio_chunks=chunks,
+                    watermark_sec=_watermark(position_sec, sampler, chunker if resampler else None),
+                    frames_decoded=frame_number,
+                )
+                frames, chunks = [], []
+                if window_seconds is not None:
+                    next_flush_sec = position_sec + window_seconds
+                if over_budget:
+                    memory_budget.enforce()
+
+        if resampler:
+            for resampled in resampler.resample(None):
+                chunks += chunker.push(resampled.to_ndarray().reshape(-1))
+            chunks += chunker.flush()
+
+        end_sec = container.duration / av.time_base if container.duration else sampler.last_pos_msec / 1000.0
+        frames += sampler.flush(end_sec * 1000.0)
+        yield DemuxBatch(frames=frames, audio_chunks=chunks, watermark_sec=end_sec, frames_decoded=frame_number)
+
+    logger.info(
+        f"Single-pass demux of {video_path} took {time.perf_counter() - started_at:.2f}s: "
+        f"{frame_number} video frames decoded, {sampler.summary()}, "
+        f"{chunker.bytes_written / 1e6 if chunker else 0:.1f} MB of PCM audio written"
+        + (f", {memory_budget.summary()}" if memory_budget else "")
+    )
+
+
+def _watermark(position_sec: float, sampler: FrameSampler, chunker: Optional[AudioChunker]) -> float:
+    watermark = position_sec
+    if sampler.pending_since_msec is not None:
+        watermark = min(watermark, sampler.pending_since_msec / 1000.0)
+    if chunker is not None:
+        watermark = min(watermark, chunker.covered_until_sec)
+    return watermark
@@ -0,0 +1,277 @@
+import os
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import PIL.Image
+import pixeltable as pxt
+import pixeltable.type_system as ts
+import torch
+from loguru import logger
+from pixeltable.func import Batch
+from transformers import CLIPConfig, CLIPModel, CLIPProcessor
+
+from agent_mcp.config import get_settings
+from agent_mcp.metrics import QUERY_EMBEDDING_CACHE_LOOKUPS, track_model_batch
+from agent_mcp.video.ingestion.transcription import get_openai_client
+
+logger = logger.bind(name="ClipEmbeddings")
+
+settings = get_settings()
+
+OPENAI_EMBEDDING_DIMENSIONS = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536,
+}
+
+
+class ClipEmbedder:
+    """A CLIP model kept resident in memory and run on CPU in batches.
+
+    Inference is serialised so that every batch gets all of torch's intra-op
+    threads instead of concurrent ingestion workers oversubscribing the cores.
+    """
+
+    def __init__(self, model_id: str, num_threads: int):
+        self.model_id = model_id
+        self.num_threads = num_threads
+        torch.set_num_threads(num_threads)
+
+        started_at = time.perf_counter()
+        self.model = CLIPModel.from_pretrained(model_id).eval()
+        self.processor = CLIPProcessor.from_pretrained(model_id)
+        logger.info(
+            f"Loaded CLIP model '{model_id}' in {time.perf_counter() - started_at:.1f}s "
+            f"using {num_threads} torch threads"
+        )
+
+        self._lock = threading.Lock()
+        self.embeddings_computed = 0
+        self.busy_seconds = 0.0
+
+    @property
+    def embeddings_per_second_per_core(self) -> float:
+        if not self.busy_seconds:
+            return 0.0
+        return self.embeddings_computed / self.busy_seconds / self.num_threads
+
+    def embed_images(self, images: List[PIL.Image.Image]) -> List[np.ndarray]:
+        """Embed a batch of images."""
+        images = [image.convert("RGB") for image in images]
+        return self._run(
+            "clip_image", lambda: self.model.get_image_features(**self.processor(images=images, return_tensors="pt"))
+        )
+
+    def embed_texts(self, texts: List[str]) -> List[np.ndarray]:
+        """Embed a batch of strings."""
+        return self._run(
+            "clip_text",
+            lambda: self.model.get_text_features(
+                **self.processor(text=texts, return_tensors="pt", padding=True, truncation=True)
+            )
+        )
+
+    def _run(self, kind: str, forward) -> List[np.ndarray]:
+        with self._lock, torch.inference_mode(), track_model_batch(kind):
+            started_at = time.perf_counter()
+            features = forward().numpy()
+            elapsed = time.perf_counter() - started_at
+            self.embeddings_computed += len(features)
+            self.busy_seconds += elapsed
+
+        logger.info(
+            f"Embedded {len(features)} items with '{self.model_id}' in {elapsed:.2f}s "
+            f"({self.embeddings_per_second_per_core:.2f} embeddings/s/core overall)"
+        )
+        return list(features.astype(np.float32))
+
+
+_EMBEDDERS: Dict[str, ClipEmbedder] = {}
+_EMBEDDERS_LOCK = threading.Lock()
+
+
+def get_clip_embedder(model_id: str) -> ClipEmbedder:
+    """
+    Get the resident CLIP embedder for a model, loading it on first use
+    """
+    with _EMBEDDERS_LOCK:
+        if model_id not in _EMBEDDERS:
+            _EMBEDDERS[model_id] = ClipEmbedder(model_id, settings.EMBEDDING_TORCH_THREADS or os.cpu_count() or 1)
+        return _EMBEDDERS[model_id]
+
+
+def embedding_throughput() -> Dict[str, float]:
+    """Embeddings per second per core for every loaded CLIP model"""
+    with _EMBEDDERS_LOCK:
+        return {model_id: embedder.embeddings_per_second_per_core for model_id, embedder in _EMBEDDERS.items()}
+
+
+def normalize_query(text: str) -> str:
+    """Normalize Unicode forms and whitespace, so trivially different spellings of a query share an embedding"""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+class QueryEmbeddingCache:
+    """A size-bounded, least-recently-used cache of query embeddings, keyed by model and normalized text."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._embeddings: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, model: str, text: str) -> Optional[np.ndarray]:
+        with self._lock:
+            embedding = self._embeddings.get((model, text))
+            if embedding is None:
+                self.misses += 1
+            else:
+                self._embeddings.move_to_end((model, text))
+                self.hits += 1
+        QUERY_EMBEDDING_CACHE_LOOKUPS.labels(model=model, result="miss" if embedding is None else "hit").inc()
+        return embedding
+
+    def put(self, model: str, text: str, embedding: np.ndarray):
+        with self._lock:
+            self._embeddings[(model, text)] = embedding
+            self._embeddings.move_to_end((model, text))
+            while len(self._embeddings) > self.max_entries:
+                self._embeddings.popitem(last=False)
+
+
+@lru_cache(maxsize=1)
+def get_query_embedding_cache() -> QueryEmbeddingCache:
+    """
+    Get the process-wide query embedding cache
+    """
+    return QueryEmbeddingCache(settings.QUERY_EMBEDDING_CACHE_SIZE)
+
+
+def embed_queries_cached(
+    model: str, queries: List[str], embed: Callable[[List[str]], List[np.ndarray]]
+) -> List[np.ndarray]:
+    """
+    Embed search queries, serving repeated ones from the query embedding cache and
+    embedding the distinct rest in batches of EMBEDDING_BATCH_SIZE.
+
+    Only searches come through here; ingestion embeds with the UDFs, so a long
+    ingestion cannot evict the hot queries.
+    """
+    queries = [normalize_query(query) for query in queries]
+    if settings.QUERY_EMBEDDING_CACHE_SIZE <= 0:
+        missing = list(dict.fromkeys(queries))
+        found = {}
+    else:
+        cache = get_query_embedding_cache()
+        found = {query: cache.get(model, query) for query in dict.fromkeys(queries)}
+        missing = [query for query, embedding in found.items() if embedding is None]
+
+    batch_size = max(1, settings.EMBEDDING_BATCH_SIZE)
+    for start in range(0, len(missing), batch_size):
+        batch = missing[start : start + batch_size]
+        for query, embedding in zip(batch, embed(batch)):
+            found[query] = embedding
+            if settings.QUERY_EMBEDDING_CACHE_SIZE > 0:
+                cache.put(model, query, embedding)
+    if missing:
+        logger.debug(f"Embedded {len(missing)} of {len(queries)} queries with '{model}'")
+    return [found[query] for query in queries]
+
+
+def _text_embedder(backend: str, model: str) -> Callable[[List[str]], List[np.ndarray]]:
+    if backend == "clip":
+        return lambda batch: get_clip_embedder(model).embed_texts(batch)
+    if backend == "openai":
+        return lambda batch: _openai_embed(batch, model)
+    raise ValueError(f"Unknown text embedding backend '{backend}'")
+
+
+def embed_query_text(backend: str, model: str, query: str) -> np.ndarray:
+    """
+    Embed a search query outside pixeltable, as the 'clip' or 'openai' text embedding UDF would
+    """
+    return embed_queries_cached(model, [query], _text_embedder(backend, model))[0]
+
+
+def embed_query_texts(backend: str, model: str, queries: List[str]) -> List[np.ndarray]:
+    """Embed many search queries at once, as `embed_query_text` would"""
+    return embed_queries_cached(model, queries, _text_embedder(backend, model))
+
+
+def default_query_embeddings() -> Dict[str, Dict[str, str]]:
+    """
+    Backend and model of the default transcript, caption and frame embedding indexes,
+    used to embed queries outside pixeltable
+    """
+    return {
+        "speech": {"backend": "openai", "model": settings.TRANSCRIPT_SIMILARITAY_EMB_MODEL},
+        "caption": {"backend": "clip", "model": settings.CAPTION_SIMILARITY_EMBD_MODEL},
+        "image": {"backend": "clip", "model": settings.IMAGE_SIMILARITY_EMB_MODEL},
+    }
+
+
+def embed_query_image(model: str, image: PIL.Image.Image) -> np.ndarray:
+    """Embed a search image outside pixeltable, as `clip_image_embedding` would"""
+    return get_clip_embedder(model).embed_images([image])[0]
+
+
+@lru_cache(maxsize=None)
+def _clip_embedding_type(model_id: str) -> ts.ArrayType:
+    projection_dim = CLIPConfig.from_pretrained(model_id).projection_dim
+    return ts.ArrayType((projection_dim,), dtype=ts.FloatType(), nullable=False)
+
+
+@pxt.udf(batch_size=settings.EMBEDDING_BATCH_SIZE)
+def clip_image_embedding(images: Batch[PIL.Image.Image], *, model_id: str) -> Batch[pxt.Array[(None,), pxt.Float]]:
+    """Embed a batch of frames with a resident CLIP model"""
+    return get_clip_embedder(model_id).embed_images(list(images))
+
+
+@clip_image_embedding.conditional_return_type
+def _(model_id: str) -> ts.ArrayType:
+    return _clip_embedding_type(model_id)
+
+
+@pxt.udf(batch_size=settings.EMBEDDING_BATCH_SIZE)
+def clip_text_embedding(texts: Batch[str], *, model_id: str) -> Batch[pxt.Array[(None,), pxt.Float]]:
+    """Embed a batch of strings with a resident CLIP model"""
+    return get_clip_embedder(model_id).embed_texts(list(texts))
+
+
+@clip_text_embedding.conditional_return_type
+def _(model_id: str) -> ts.ArrayType:
+    return _clip_embedding_type(model_id)
+
+
+def _openai_embed(texts: List[str], model: str) -> List[np.ndarray]:
+    with track_model_batch("openai_text"):
+        response = get_openai_client().embeddings.create(input=texts, model=model)
+    return [np.array(item.embedding, dtype=np.float32) for item in response.data]
+
+
+@lru_cache(maxsize=None)
+def _openai_embedding_type(model: str) -> ts.ArrayType:
+    dimensions = OPENAI_EMBEDDING_DIMENSIONS.get(model) or len(_openai_embed(["dimension probe"], model)[0])
+    return ts.ArrayType((dimensions,), dtype=ts.FloatType(), nullable=False)
+
+
+@pxt.udf(batch_size=settings.EMBEDDING_BATCH_SIZE)
+def openai_text_embedding(texts: Batch[str], *, model: str) -> Batch[pxt.Array[(None,), pxt.Float]]:
+    """Embed a batch of strings with OpenAI"""
+    return _openai_embed(list(texts), model)
+
+
+@openai_text_embedding.conditional_return_type
+def _(model: str) -> ts.ArrayType:
+    return _openai_embedding_type(model)
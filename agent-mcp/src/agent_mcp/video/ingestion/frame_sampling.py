@@ -0,0 +1,442 @@
+import math
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import av
+import numpy as np
+import PIL.Image
+import pixeltable.type_system as ts
+from loguru import logger
+from pixeltable.iterators.base import ComponentIterator
+
+from agent_mcp.config import get_settings
+from agent_mcp.video.ingestion.tools import dhash, hamming_distance
+
+logger = logger.bind(name="FrameSampling")
+
+settings = get_settings()
+
+SIGNATURE_WIDTH = 32
+SIGNATURE_HEIGHT = 18
+HISTOGRAM_BINS = 16
+# Area averaging when shrinking frames in the decoder, close to PIL's antialiased thumbnails.
+DOWNSCALE_INTERPOLATION = "AREA"
+
+
+def fit_within(width: int, height: int, max_width: int, max_height: int) -> Tuple[int, int]:
+    """Largest size with the aspect ratio of width x height that fits in max_width x max_height, never upscaling."""
+    scale = min(max_width / width, max_height / height, 1.0)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def frame_difference(signature_a: np.ndarray, signature_b: np.ndarray) -> float:
+    """
+    Visual difference between two grayscale frame signatures, in [0, 1].
+
+    Averages the mean pixel difference (catches cuts between shots with similar
+    lighting) with the luma histogram distance (robust to camera and subject motion).
+    """
+    pixel_diff = np.abs(signature_a.astype(np.int16) - signature_b.astype(np.int16)).mean() / 255.0
+    hist_a = np.bincount(signature_a.ravel() // (256 // HISTOGRAM_BINS), minlength=HISTOGRAM_BINS) / signature_a.size
+    hist_b = np.bincount(signature_b.ravel() // (256 // HISTOGRAM_BINS), minlength=HISTOGRAM_BINS) / signature_b.size
+    hist_diff = 0.5 * np.abs(hist_a - hist_b).sum()
+    return float(0.5 * pixel_diff + 0.5 * hist_diff)
+
+
+class FrameSampler:
+    """Online, scene-aware selection of the frames worth captioning and embedding.
+
+    Frames are pushed in decode order with a small grayscale signature. A new scene
+    starts whenever the signature changes by more than `scene_threshold`. Each scene
+    gets its first frame, long scenes are sampled at least every `1 / min_fps`
+    seconds, and samples are never closer than `1 / max_fps` seconds nor more than
+    `frames_per_minute` within any minute. Samples are released when their scene
+    closes, so every sample knows the boundaries of its scene.
+
+    With a `dedup_threshold`, a sample whose dHash is within that Hamming distance of
+    the previous kept frame is dropped and folded into the kept frame's run, so the
+    kept frame's caption and embeddings stand in for the whole run.
+
+    With a `frame_size`, sampled frames are scaled down by the decoder to fit within
+    it, so full-resolution images are never created.
+
+    With `target_times_msec`, scene detection and rate limits are bypassed: the
+    decoded frame nearest to each target time is sampled instead.
+
+    `on_sample`, if set, is called with every kept sample as soon as it is taken, so
+    its image can be moved out of memory while its scene is still open.
+    """
+
+    def __init__(
+        self,
+        scene_threshold: float,
+        min_fps: float,
+        max_fps: float,
+        frames_per_minute: int,
+        dedup_threshold: Optional[int] = None,
+        probe_fps: float = 4.0,
+        frame_size: Optional[Tuple[int, int]] = None,
+        target_times_msec: Optional[Sequence[float]] = None,
+    ):
+        if not 0 < min_fps <= max_fps:
+            raise ValueError("Frame sampling rates must satisfy 0 < min_fps <= max_fps")
+        if frames_per_minute < min_fps * 60:
+            raise ValueError("frames_per_minute must allow at least min_fps samples per minute")
+
+        self.scene_threshold = scene_threshold
+        self.min_interval_msec = 1000.0 / min_fps
+        self.max_interval_msec = 1000.0 / max_fps
+        self.frames_per_minute = frames_per_minute
+        self.dedup_threshold = dedup_threshold
+        self.probe_interval_msec = 1000.0 / probe_fps
+        self.frame_size = frame_size
+
+        self.frames_seen = 0
+        self.frames_sampled = 0
+        self.frames_deduplicated = 0
+        self.scene_count = 0
+
+        self._prev_signature: Optional[np.ndarray] = None
+        self._scene_start_msec = 0.0
+        self._scene_needs_sample = True
+        self._last_sample_msec: Optional[float] = None
+        self._recent_samples: Deque[float] = deque()
+        self._pending: List[Dict[str, Any]] = []
+        self._last_kept: Optional[Dict[str, Any]] = None
+        self._last_kept_hash: Optional[int] = None
+        self._last_kept_signature: Optional[np.ndarray] = None
+        self._last_probe_msec: Optional[float] = None
+        self.last_pos_msec = 0.0
+        self.on_sample: Optional[Callable[[Dict[str, Any]], None]] = None
+
+        self._targets_msec = list(target_times_msec) if target_times_msec is not None else None
+        self._next_target = 0
+        # Last decoded frame, kept as the candidate for a target time that falls before the next one.
+        self._candidate: Optional[Tuple[av.VideoFrame, int, float]] = None
+        self._last_sampled_frame: Optional[int] = None
+
+    @classmethod
+    def uniform(
+        cls, num_frames: int, duration_sec: float, frame_size: Optional[Tuple[int, int]] = None
+    ) -> "FrameSampler":
+        """Sampler for `num_frames` evenly spaced frames: one scene, the frame nearest each target time."""
+        fps = num_frames / max(duration_sec, 1.0)
+        return cls(
+            scene_threshold=math.inf,
+            min_fps=fps,
+            max_fps=fps,
+            frames_per_minute=math.ceil(fps * 60) + 1,
+            frame_size=frame_size,
+            target_times_msec=np.linspace(0.0, max(duration_sec, 0.0) * 1000.0, num_frames, endpoint=False),
+        )
+
+    @property
+    def pending_since_msec(self) -> Optional[float]:
+        """Position of the earliest sample not yet released, if any."""
+        positions = [record["pos_msec"] for record in self._pending[:1]]
+        if self._candidate is not None and self._next_target < len(self._targets_msec):
+            positions.append(self._candidate[2])
+        return min(positions) if positions else None
+
+    @property
+    def dedup_ratio(self) -> float:
+        """Share of sampled frames that were suppressed as near-duplicates."""
+        candidates = self.frames_sampled + self.frames_deduplicated
+        return self.frames_deduplicated / candidates if candidates else 0.0
+
+    def push(
+        self, pos_msec: float, signature: np.ndarray, make_record: Callable[[], Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Feed the next frame. `make_record` is only called if the frame is sampled,
+        so unsampled frames are never converted to images.
+
+        Returns the samples of any scene closed by this frame.
+        """
+        self.frames_seen += 1
+        return self._push(pos_msec, signature, make_record)
+
+    def _push(
+        self, pos_msec: float, signature: np.ndarray, make_record: Callable[[], Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        closed = []
+        if self._prev_signature is None:
+            self._start_scene(pos_msec)
+        elif frame_difference(self._prev_signature, signature) > self.scene_threshold:
+            closed = self._close_scene(pos_msec)
+            self._start_scene(pos_msec)
+        self._prev_signature = signature
+
+        if self._should_sample(pos_msec):
+            record = make_record()
+            frame_hash = dhash(record["frame"]) if self.dedup_threshold is not None else None
+            if self._is_duplicate(frame_hash, signature):
+                self._last_kept["duplicate_count"] += 1
+                self._last_kept["run_end_msec"] = pos_msec
+                self.frames_deduplicated += 1
+                self._record_sample(pos_msec, kept=False)
+            else:
+                record.update(
+                    scene_idx=self.scene_count - 1,
+                    scene_start_msec=self._scene_start_msec,
+                    duplicate_count=0,
+                    run_end_msec=pos_msec,
+                )
+                self._pending.append(record)
+                self._last_kept, self._last_kept_hash, self._last_kept_signature = record, frame_hash, signature
+                if self.on_sample is not None:
+                    self.on_sample(record)
+                self._record_sample(pos_msec, kept=True)
+        return closed
+
+    def push_video_frame(self, frame: av.VideoFrame, frame_number: int) -> List[Dict[str, Any]]:
+        """Feed a decoded PyAV frame, probing it at most every `1 / probe_fps` seconds."""
+        if frame.time is None:
+            return []
+        pos_msec = frame.time * 1000.0
+        self.last_pos_msec = pos_msec
+        if self._targets_msec is not None:
+            return self._push_nearest(frame, frame_number, pos_msec)
+        if self._last_probe_msec is not None and pos_msec - self._last_probe_msec < self.probe_interval_msec:
+            return []
+        self._last_probe_msec = pos_msec
+
+        signature = frame.to_ndarray(width=SIGNATURE_WIDTH, height=SIGNATURE_HEIGHT, format="gray")
+        return self.push(
+            pos_msec,
+            signature,
+            lambda: {"pos_msec": pos_msec, "pos_frame": frame_number, "frame": self._to_image(frame)},
+        )
+
+    def _push_nearest(self, frame: av.VideoFrame, frame_number: int, pos_msec: float) -> List[Dict[str, Any]]:
+        """Sample, for every target time this frame has passed, whichever of it and the previous frame is nearer."""
+        self.frames_seen += 1
+        released = []
+        while self._next_target < len(self._targets_msec) and self._targets_msec[self._next_target] <= pos_msec:
+            target = self._targets_msec[self._next_target]
+            self._next_target += 1
+            if self._candidate is not None and target - self._candidate[2] < pos_msec - target:
+                released += self._sample_frame(*self._candidate)
+            else:
+                released += self._sample_frame(frame, frame_number, pos_msec)
+        self._candidate = (frame, frame_number, pos_msec)
+        return released
+
+    def _sample_frame(self, frame: av.VideoFrame, frame_number: int, pos_msec: float) -> List[Dict[str, Any]]:
+        # Targets closer together than the frame rate share their nearest frame, which is sampled once.
+        if frame_number == self._last_sampled_frame:
+            return []
+        self._last_sampled_frame = frame_number
+        signature = frame.to_ndarray(width=SIGNATURE_WIDTH, height=SIGNATURE_HEIGHT, format="gray")
+        return self._push(
+            pos_msec,
+            signature,
+            lambda: {"pos_msec": pos_msec, "pos_frame": frame_number, "frame": self._to_image(frame)},
+        )
+
+    def _to_image(self, frame: av.VideoFrame) -> PIL.Image.Image:
+        if self.frame_size is None:
+            return frame.to_image()
+        width, height = fit_within(frame.width, frame.height, *self.frame_size)
+        if (width, height) == (frame.width, frame.height):
+            return frame.to_image()
+        return frame.to_image(width=width, height=height, interpolation=DOWNSCALE_INTERPOLATION)
+
+    def summary(self) -> str:
+        return (
+            f"sampled {self.frames_sampled} of {self.frames_seen} probed frames across {self.scene_count} scenes, "
+            f"suppressed {self.frames_deduplicated} near-duplicates (dedup ratio {self.dedup_ratio:.1%})"
+        )
+
+    def flush(self, end_msec: float) -> List[Dict[str, Any]]:
+        """Close the last scene at the end of the video and return all remaining samples."""
+        released = []
+        if self._candidate is not None and self._next_target < len(self._targets_msec):
+            # The last decoded frame is the nearest one to every target past it.
+            released += self._sample_frame(*self._candidate)
+            self._next_target = len(self._targets_msec)
+        self._candidate = None
+        released += self._close_scene(end_msec) + self._pending
+        self._pending = []
+        return released
+
+    def _is_duplicate(self, frame_hash: Optional[int], signature: np.ndarray) -> bool:
+        if frame_hash is None or self._last_kept_hash is None:
+            return False
+        if hamming_distance(frame_hash, self._last_kept_hash) > self.dedup_threshold:
+            return False
+        # dHash only sees gradients, so also require the same overall tone as the kept frame.
+        return frame_difference(signature, self._last_kept_signature) <= self.scene_threshold
+
+    def _start_scene(self, pos_msec: float):
+        self.scene_count += 1
+        self._scene_start_msec = pos_msec
+        self._scene_needs_sample = True
+
+    def _close_scene(self, end_msec: float) -> List[Dict[str, Any]]:
+        for record in self._pending:
+            record.setdefault("scene_end_msec", max(end_msec, record["pos_msec"]))
+        # The last kept frame is held back, as duplicates in the next scene may still extend its run.
+        released, self._pending = self._pending[:-1], self._pending[-1:]
+        return released
+
+    def _should_sample(self, pos_msec: float) -> bool:
+        if self._targets_msec is not None:
+            return True
+        if self._last_sample_msec is not None and pos_msec - self._last_sample_msec < self.max_interval_msec:
+            return False
+        while self._recent_samples and pos_msec - self._recent_samples[0] >= 60_000:
+            self._recent_samples.popleft()
+        if len(self._recent_samples) >= self.frames_per_minute:
+            return False
+        if self._scene_needs_sample:
+            return True
+        return pos_msec - self._last_sample_msec >= self.min_interval_msec
+
+    def _record_sample(self, pos_msec: float, kept: bool):
+        self._scene_needs_sample = False
+        self._last_sample_msec = pos_msec
+        if kept:
+            # Only kept frames cost model calls, so only they count against the budget.
+            self.frames_sampled += 1
+            self._recent_samples.append(pos_msec)
+
+
+def build_frame_sampler(duration_sec: float, num_frames: int) -> FrameSampler:
+    """
+    Create the sampler selected by FRAME_SAMPLING_MODE for a video of the given length,
+    decoding frames at the IMAGE_RESIZE_* size. `num_frames` applies to fixed sampling.
+    """
+    frame_size = (settings.IMAGE_RESIZE_WIDTH, settings.IMAGE_RESIZE_HEIGHT)
+    if settings.FRAME_SAMPLING_MODE == "scene":
+        return FrameSampler(
+            scene_threshold=settings.SCENE_CHANGE_THRESHOLD,
+            min_fps=settings.FRAME_SAMPLING_MIN_FPS,
+            max_fps=settings.FRAME_SAMPLING_MAX_FPS,
+            frames_per_minute=settings.FRAME_SAMPLING_BUDGET_PER_MINUTE,
+            dedup_threshold=(
+                settings.FRAME_DEDUP_HAMMING_THRESHOLD if settings.FRAME_DEDUP_HAMMING_THRESHOLD >= 0 else None
+            ),
+            probe_fps=settings.SCENE_DETECTION_PROBE_FPS,
+            frame_size=frame_size,
+        )
+    return FrameSampler.uniform(num_frames, duration_sec, frame_size=frame_size)
+
+
+class SceneFrameIterator(ComponentIterator):
+    """
+    Iterate over the frames of a video selected by a FrameSampler.
+
+    Drop-in replacement for pixeltable's FrameIterator that also outputs the scene
+    each frame belongs to. With `num_frames > 0`, that many evenly spaced frames are
+    sampled instead of detecting scenes. Frames are decoded straight to fit within
+    `frame_width` x `frame_height` when both are set.
+    """
+
+    def __init__(
+        self,
+        video: str,
+        *,
+        scene_threshold: float,
+        min_fps: float,
+        max_fps: float,
+        frames_per_minute: int,
+        probe_fps: float,
+        dedup_threshold: int = -1,
+        num_frames: int = 0,
+        frame_width: int = 0,
+        frame_height: int = 0,
+    ):
+        self.video_path = video
+        self.scene_threshold = scene_threshold
+        self.min_fps = min_fps
+        self.max_fps = max_fps
+        self.frames_per_minute = frames_per_minute
+        self.probe_fps = probe_fps
+        self.dedup_threshold = dedup_threshold if dedup_threshold >= 0 else None
+        self.num_frames = num_frames
+        self.frame_size = (frame_width, frame_height) if frame_width > 0 and frame_height > 0 else None
+        self._open()
+
+    @classmethod
+    def input_schema(cls) -> Dict[str, ts.ColumnType]:
+        return {
+            "video": ts.VideoType(nullable=False),
+            "scene_threshold": ts.FloatType(),
+            "min_fps": ts.FloatType(),
+            "max_fps": ts.FloatType(),
+            "frames_per_minute": ts.IntType(),
+            "probe_fps": ts.FloatType(),
+            "dedup_threshold": ts.IntType(),
+            "num_frames": ts.IntType(),
+            "frame_width": ts.IntType(),
+            "frame_height": ts.IntType(),
+        }
+
+    @classmethod
+    def output_schema(cls, *args: Any, **kwargs: Any) -> Tuple[Dict[str, ts.ColumnType], List[str]]:
+        return (
+            {
+                "frame_idx": ts.IntType(),
+                "pos_msec": ts.FloatType(),
+                "pos_frame": ts.IntType(),
+                "frame": ts.ImageType(),
+                "scene_idx": ts.IntType(),
+                "scene_start_msec": ts.FloatType(),
+                "scene_end_msec": ts.FloatType(),
+                "duplicate_count": ts.IntType(),
+                "run_end_msec": ts.FloatType(),
+            },
+            ["frame"],
+        )
+
+    def _open(self):
+        self.container = av.open(self.video_path)
+        self.video_stream = self.container.streams.video[0]
+        self.video_stream.thread_type = "AUTO"
+        if self.num_frames > 0:
+            self.sampler = FrameSampler.uniform(self.num_frames, self._duration_sec(), frame_size=self.frame_size)
+        else:
+            self.sampler = FrameSampler(
+                self.scene_threshold,
+                self.min_fps,
+                self.max_fps,
+                self.frames_per_minute,
+                dedup_threshold=self.dedup_threshold,
+                probe_fps=self.probe_fps,
+                frame_size=self.frame_size,
+            )
+        self._records = self._sample_frames()
+        self.next_pos = 0
+
+    def _sample_frames(self) -> Iterator[Dict[str, Any]]:
+        for frame_number, frame in enumerate(self.container.decode(self.video_stream)):
+            yield from self.sampler.push_video_frame(frame, frame_number)
+
+        end_msec = self._duration_sec() * 1000.0 or self.sampler.last_pos_msec
+        yield from self.sampler.flush(end_msec)
+        logger.info(f"Frame sampling of {self.video_path}: {self.sampler.summary()}")
+
+    def _duration_sec(self) -> float:
+        if self.container.duration:
+            return self.container.duration / av.time_base
+        if self.video_stream.duration:
+            return float(self.video_stream.duration * self.video_stream.time_base)
+        return 0.0
+
+    def __next__(self) -> Dict[str, Any]:
+        record = next(self._records)
+        record["frame_idx"] = self.next_pos
+        self.next_pos += 1
+        return record
+
+    def close(self) -> None:
+        self.container.close()
+
+    def set_pos(self, pos: int) -> None:
+        """Seek to the `pos`-th sampled frame; sampling is deterministic, so replay from the start if needed."""
+        if pos < self.next_pos:
+            self.close()
+            self._open()
+        while self.next_pos < pos:
+            next(self)
@@ -10,9 +10,12 @@ def extract_text_from_chunk(transcript: pxt.type_system.Json) ->str:
 @pxt.udf
 def resize_image(image: pxt.type_system.Image, width: int, height: int)->pxt.type_system.Image:
     """
-    Resize an image to fit within the specified width and height
+    Resize an image to fit within the specified width and height, leaving the input untouched
     """
     if not isinstance(image,Image.Image):
         raise TypeError("Input must be a PIL Image")
-    image.thumbnail((width,height))
-    return image
\ No newline at end of file
+    if image.width <= width and image.height <= height:
+        return image
+    resized = image.copy()
+    resized.thumbnail((width,height))
+    return resized
\ No newline at end of file
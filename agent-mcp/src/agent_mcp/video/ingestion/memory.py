@@ -0,0 +1,81 @@
+import ctypes
+import ctypes.util
+import gc
+import os
+from functools import lru_cache
+from typing import Optional
+
+from loguru import logger
+
+logger = logger.bind(name="MemoryBudget")
+
+
+class MemoryBudgetExceededError(Exception):
+    """Ingestion memory stayed above the budget after everything buffered was released."""
+
+
+def current_rss_bytes() -> Optional[int]:
+    """Resident set size of this process, or None where /proc is not available"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+@lru_cache(maxsize=1)
+def _libc() -> Optional[ctypes.CDLL]:
+    name = ctypes.util.find_library("c")
+    if name is None:
+        return None
+    libc = ctypes.CDLL(name)
+    return libc if hasattr(libc, "malloc_trim") else None
+
+
+def release_memory():
+    """Collect garbage and hand freed heap pages back to the OS, so RSS reflects live data"""
+    gc.collect()
+    libc = _libc()
+    if libc is not None:
+        libc.malloc_trim(0)
+
+
+class MemoryBudget:
+    """A limit on the resident memory of the ingestion process.
+
+    RSS is process-wide, so the budget covers every job running in the process,
+    not just the one checking it.
+    """
+
+    def __init__(self, limit_bytes: int):
+        self.limit_bytes = limit_bytes
+        self.peak_bytes = current_rss_bytes() or 0
+        self.early_flushes = 0
+
+    def exceeded(self) -> bool:
+        rss = current_rss_bytes()
+        if rss is None:
+            return False
+        self.peak_bytes = max(self.peak_bytes, rss)
+        return rss >= self.limit_bytes
+
+    def enforce(self):
+        """
+        Release freed memory after buffered data has been committed, and raise if the
+        process is still over budget.
+        """
+        self.early_flushes += 1
+        release_memory()
+        rss = current_rss_bytes()
+        if rss is not None and rss >= self.limit_bytes:
+            raise MemoryBudgetExceededError(
+                f"Ingestion uses {rss / 2**20:.0f} MB with nothing left to release, "
+                f"over the {self.limit_bytes / 2**20:.0f} MB budget"
+            )
+        logger.info(f"Back to {(rss or 0) / 2**20:.0f} MB of {self.limit_bytes / 2**20:.0f} MB after releasing buffers")
+
+    def summary(self) -> str:
+        return (
+            f"peak RSS {self.peak_bytes / 2**20:.0f} MB of {self.limit_bytes / 2**20:.0f} MB budget, "
+            f"{self.early_flushes} early flushes"
+        )
@@ -1,6 +1,8 @@
 import base64
 import  io
-from typing import List, Literal, Union
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, List, Literal, Optional, Union
 
 import pixeltable as pxt
 from PIL import Image
@@ -17,6 +19,19 @@ class CachedTableMetadata(BaseModel):
         ...,
         description= "After chunking audio, getting trascript and splittig it into sentence",
     )
+    content_hash: Optional[str] = Field(default= None, description= "SHA-256 of the source video file")
+    frame_sampling: Literal["fixed", "scene"] = Field(
+        default= "fixed",
+        description= "How frames were sampled; scene sampled frames carry their scene boundaries",
+    )
+    status: Literal["ingesting", "ready"] = Field(
+        default= "ready",
+        description= "'ingesting' indexes were interrupted or are still running and can be resumed",
+    )
+    query_embeddings: Optional[Dict[str, Dict[str, str]]] = Field(
+        default= None,
+        description= "Backend and model that embed queries per modality; unset for indexes registered before it was recorded",
+    )
 
 class CachedTable:
     video_cache: str = Field(..., description= "Path to the video cache")
@@ -27,12 +42,17 @@ class CachedTable:
         description= "After chunking audio, getting trascript and splittig it into sentence",
     )
 
-    def __init__(self, video_name:str , video_cache:str,video_table: pxt.Table, frames_view:pxt.Table, audio_chunks_view: pxt.Table,):
+    def __init__(self, video_name:str , video_cache:str,video_table: pxt.Table, frames_view:pxt.Table, audio_chunks_view: pxt.Table, frame_sampling: str = "fixed"):
         self.video_name = video_name
         self.video_cache = video_cache
         self.video_table = video_table
         self.frames_view = frames_view
         self.audio_chunks_view = audio_chunks_view
+        self.frame_sampling = frame_sampling
+
+    @property
+    def scene_aware(self) -> bool:
+        return self.frame_sampling == "scene"
 
     @classmethod
     def from_metadata(cls,metadata: dict | CachedTableMetadata)-> "CachedTable":
@@ -43,6 +63,7 @@ class CachedTable:
             video_table = pxt.get_table(metadata.video_table),
             frames_view = pxt.get_table(metadata.frames_view),
             audio_chunks_view = pxt.get_table(metadata.audio_chunks_view),
+            frame_sampling = metadata.frame_sampling,
         )       
     
     def __str__(self):
@@ -58,6 +79,88 @@ class CachedTable:
         return f"Video Index '{self.video_name}' info: {','.join(self.video_table.columns)}"
     
 
+# Ingestion Job Models
+
+class IngestionJobStatus(str, Enum):
+    PENDING = "pending"
+    IN_PROGRESS = "in_progress"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    NOT_FOUND = "not_found"
+
+class IngestionJob(BaseModel):
+    job_id: str = Field(..., description= "Unique id of the ingestion job")
+    video_path: str = Field(..., description= "Path to the video being ingested")
+    content_hash: Optional[str] = Field(default= None, description= "SHA-256 of the video file claimed by the submitter, verified before use")
+    status: IngestionJobStatus = Field(default= IngestionJobStatus.PENDING, description= "Current state of the job")
+    error: Optional[str] = Field(default= None, description= "Error message if the job failed")
+    stage: Optional[str] = Field(default= None, description= "Ingestion stage the job reported last")
+    progress: float = Field(default= 0.0, description= "Overall progress of the job, in percent")
+    stage_progress: Dict[str, float] = Field(default_factory= dict, description= "Progress of every stage reached, in percent")
+    submitted_at: datetime = Field(default_factory= datetime.now, description= "When the job was queued")
+    started_at: Optional[datetime] = Field(default= None, description= "When a worker picked up the job")
+    finished_at: Optional[datetime] = Field(default= None, description= "When the job completed or failed")
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (IngestionJobStatus.COMPLETED, IngestionJobStatus.FAILED)
+
+
+# Ingestion Checkpoint Models
+
+class IngestionCheckpoint(BaseModel):
+    video_name: str = Field(..., description= "Name of the video the index was created for")
+    video_cache: str = Field(..., description= "Pixeltable directory holding the index")
+    single_pass: bool = Field(..., description= "Whether the index is filled by the single-pass demuxer")
+    streaming: bool = Field(..., description= "Whether the video is inserted in time-ordered batches")
+    voice_activity_detection: bool = Field(default= False, description= "Whether audio chunks follow detected speech")
+    indexes_built: bool = Field(default= False, description= "Tables, computed columns and embedding indexes exist")
+    audio_extracted: bool = Field(default= False, description= "All audio chunks of the video have been produced")
+    chunks_transcribed: int = Field(default= 0, description= "Audio chunks transcribed and embedded so far")
+    frames_captioned: int = Field(default= 0, description= "Frames captioned and embedded so far")
+    segments_committed: int = Field(default= 0, description= "Video table rows committed so far")
+    indexed_until_sec: float = Field(default= 0.0, description= "Everything before this point is searchable")
+    audio_seconds_skipped: float = Field(default= 0.0, description= "Seconds of audio not transcribed as non-speech")
+    shard_seconds: float = Field(default= 0.0, description= "Length of the time shards decoded in parallel, 0 if not sharded")
+    completed: bool = Field(default= False, description= "The whole video has been ingested")
+    updated_at: datetime = Field(default_factory= datetime.now, description= "When the checkpoint was written")
+
+
+# Video Segment Models
+
+class VideoSegment(BaseModel):
+    path: str = Field(..., description= "Path to the segment file")
+    start_sec: float = Field(..., description= "Offset of the segment in the source video")
+    end_sec: float = Field(..., description= "End of the segment in the source video")
+
+
+class DemuxBatch(BaseModel):
+    frames: List[Dict[str, Any]] = Field(default_factory= list, description= "Sampled frame rows, in time order")
+    audio_chunks: List[Dict[str, Any]] = Field(default_factory= list, description= "Audio chunk rows, in time order")
+    watermark_sec: float = Field(..., description= "Everything before this point has been released")
+    frames_decoded: int = Field(default= 0, description= "Video frames decoded so far")
+
+
+class ShardResult(BaseModel):
+    shard_idx: int = Field(..., description= "Position of the shard in the video")
+    start_sec: float = Field(..., description= "Offset of the shard in the source video")
+    end_sec: float = Field(..., description= "End of the shard in the source video")
+    frames: List[Dict[str, Any]] = Field(default_factory= list, description= "Sampled frame rows, timed from the shard start")
+    audio_chunks: List[Dict[str, Any]] = Field(default_factory= list, description= "Audio chunk rows, timed from the shard start")
+    frames_decoded: int = Field(..., description= "Video frames decoded from the shard")
+    scene_count: int = Field(..., description= "Scenes detected in the shard")
+
+
+# Video Compatibility Models
+
+class VideoProbe(BaseModel):
+    container: str = Field(..., description= "Container format name reported by ffprobe")
+    video_codec: Optional[str] = Field(default= None, description= "Codec of the first video stream")
+    pixel_format: Optional[str] = Field(default= None, description= "Pixel format of the first video stream")
+    audio_codec: Optional[str] = Field(default= None, description= "Codec of the first audio stream")
+    decodable: bool = Field(..., description= "Whether PyAV could decode a frame from the file")
+
+
 # Image Processing Models
 
 class Base64Image(BaseModel):
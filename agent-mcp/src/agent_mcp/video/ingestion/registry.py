@@ -1,22 +1,26 @@
 import json
 import os
+import threading
 from datetime import datetime
 from functools import lru_cache
 from pathlib import Path
-from typing import Dict
+from typing import Callable, Dict, List, Optional
 
 from loguru import logger
 
 import agent_mcp.video.ingestion.constants as cc
 from agent_mcp.video.ingestion.models import CachedTable, CachedTableMetadata
+from agent_mcp.video.ingestion.snapshots import remove_snapshot
 
 logger = logger.bind(name = "TableRegistry")
 
 
 VIDEO_INDEXES_REGISTRY: Dict[str,CachedTableMetadata] = {}
+_REGISTRY_LOCK = threading.Lock()
+_CHANGE_LISTENERS: List[Callable[[str, str], None]] = []
 
 
-@lru_cache(max_size = 1)
+@lru_cache(maxsize = 1)
 def get_registry() -> Dict[str, CachedTableMetadata]:
     """
     Get the global video index registry
@@ -35,7 +39,7 @@ def get_registry() -> Dict[str, CachedTableMetadata]:
 
             if registry_files:
                 latest_file = max(registry_files)
-                latest_registry = Path(cc.DEFAULT_CACHED_TABLES_REGISTRY_DIR)
+                latest_registry = Path(cc.DEFAULT_CACHED_TABLES_REGISTRY_DIR) / latest_file
                 with open(str(latest_registry),"r") as f:
                     VIDEO_INDEXES_REGISTRY = json.load(f)
                     for key,value in VIDEO_INDEXES_REGISTRY.items():
@@ -54,19 +58,88 @@ def add_index_to_registry(
         video_cache: str,
         frames_view_name: str,
         audio_view_name: str,
+        content_hash: Optional[str] = None,
+        frame_sampling: str = "fixed",
+        status: str = "ingesting",
+        query_embeddings: Optional[Dict[str, Dict[str, str]]] = None,
 ):
     """Register a video index in the global registry"""
-    global VIDEO_INDEXES_REGISTRY
     cached_table_meta = CachedTableMetadata(
         video_name = video_name,
         video_cache=video_cache,
         video_table= f"{video_cache}.table",
         frames_view= frames_view_name,
         audio_chunks_view= audio_view_name,
-    ).model_dump_json()
-    VIDEO_INDEXES_REGISTRY[video_name] = cached_table_meta
+        content_hash= content_hash,
+        frame_sampling= frame_sampling,
+        status= status,
+        query_embeddings= query_embeddings,
+    )
+    with _REGISTRY_LOCK:
+        _save_registry_entry(video_name, cached_table_meta)
+    logger.info(f"Video Index '{video_name}' registered in the global registry")
+
+def add_alias_to_registry(video_name: str, metadata: CachedTableMetadata):
+    """Register another name for an existing video index, sharing its pixeltable cache"""
+    with _REGISTRY_LOCK:
+        _save_registry_entry(video_name, metadata.model_copy(update={"video_name": video_name}))
+    logger.info(f"Video '{video_name}' registered as an alias of index '{metadata.video_cache}'")
+
+def set_index_status(video_name: str, status: str):
+    """Mark a registered video index as 'ingesting' (resumable) or 'ready'"""
+    with _REGISTRY_LOCK:
+        metadata = _to_metadata(get_registry()[video_name])
+        _save_registry_entry(video_name, metadata.model_copy(update={"status": status}))
+    logger.info(f"Video Index '{video_name}' marked as {status}")
+
+def remove_index_from_registry(video_name: str):
+    """Unregister a video index, or one of its aliases, deleting its search snapshot once nothing refers to it"""
+    with _REGISTRY_LOCK:
+        value = get_registry().pop(video_name, None)
+        if value is None:
+            return
+        _write_registry()
+        video_cache = _to_metadata(value).video_cache
+        if all(_to_metadata(other).video_cache != video_cache for other in get_registry().values()):
+            remove_snapshot(video_cache)
+        _notify_index_changed(video_name, video_cache)
+    logger.info(f"Video Index '{video_name}' removed from the global registry")
+
+def on_index_changed(listener: Callable[[str, str], None]):
+    """
+    Call `listener` with the video name and pixeltable cache of every registry entry
+    that is written or removed
+    """
+    _CHANGE_LISTENERS.append(listener)
 
+def get_index_metadata(video_name: str) -> Optional[CachedTableMetadata]:
+    """Get the registry entry of a video index, if it is registered"""
+    with _REGISTRY_LOCK:
+        value = get_registry().get(video_name)
+    return _to_metadata(value) if value is not None else None
 
+def find_index_by_content_hash(content_hash: str) -> Optional[CachedTableMetadata]:
+    """Find a registered video index built from a file with the given content hash"""
+    with _REGISTRY_LOCK:
+        values = list(get_registry().values())
+    for value in values:
+        metadata = _to_metadata(value)
+        if metadata.content_hash == content_hash:
+            return metadata
+    return None
+
+def _to_metadata(value: str | dict | CachedTableMetadata) -> CachedTableMetadata:
+    if isinstance(value,str):
+        value = json.loads(value)
+    return CachedTableMetadata(**value) if isinstance(value,dict) else value
+
+def _save_registry_entry(video_name: str, cached_table_meta: CachedTableMetadata):
+    global VIDEO_INDEXES_REGISTRY
+    VIDEO_INDEXES_REGISTRY[video_name] = cached_table_meta.model_dump_json()
+    _write_registry()
+    _notify_index_changed(video_name, cached_table_meta.video_cache)
+
+def _write_registry():
     dt = datetime.now()
     dtstr = dt.strftime("%Y-%m-%d%H:%M:%S")
     records_dir = Path(cc.DEFAULT_CACHED_TABLES_REGISTRY_DIR)
@@ -77,21 +150,20 @@ def add_index_to_registry(
                 v = v.model_dump_json()
             VIDEO_INDEXES_REGISTRY[k] = v
         json.dump(VIDEO_INDEXES_REGISTRY,f,indent = 4)
-    
-    logger.info(f"Video Index '{video_name}' registered in the global registry")
 
-def get_table(video_name:str) -> Dict[str,CachedTable]:
+def _notify_index_changed(video_name: str, video_cache: str):
+    for listener in _CHANGE_LISTENERS:
+        listener(video_name, video_cache)
+
+def get_table(video_name:str) -> Optional[CachedTable]:
     """
-    Get the global video index registry
-    
+    Open the pixeltable tables of a registered video index
+
     Returns:
-        Dict[str, CachedTable]: The video index registry.
+        Optional[CachedTable]: The video index, or None if it is not registered.
     """
 
-    registry = get_registry()
-    logger.info(f"Registry: {registry}")
-    metadata = registry.get(video_name)
-    if isinstance(metadata,str):
-        metadata = json.loads(metadata)
-    logger.info(f"Metadata: {metadata}")
-    return CachedTable.from_metadata(metadata)
\ No newline at end of file
+    metadata = get_index_metadata(video_name)
+    if metadata is None:
+        return None
+    return CachedTable.from_metadata(metadata)
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import PIL.Image
+from loguru import logger
+
+from agent_mcp.config import get_settings
+from agent_mcp.metrics import RESULT_CACHE_LOOKUPS
+
+logger = logger.bind(name="ResultCache")
+
+settings = get_settings()
+
+EVICTION_BATCH = 256
+
+
+def image_content_hash(image: PIL.Image.Image) -> str:
+    """SHA-256 of an image's mode, size and pixels, independent of how it was encoded on disk"""
+    digest = hashlib.sha256(f"{image.mode}:{image.size[0]}x{image.size[1]}:".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+def result_key(kind: str, content_hash: str, model: str, prompt: str = "") -> str:
+    """Cache key of a model result for some content, model and prompt"""
+    return hashlib.sha256("\0".join((kind, model, prompt, content_hash)).encode()).hexdigest()
+
+
+class ResultCache:
+    """A size-bounded, least-recently-used cache of model results in a SQLite file.
+
+    Values are JSON documents keyed by `result_key`. Every hit refreshes the entry,
+    and once the stored values exceed `max_bytes` the least recently used entries
+    are evicted.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+        self._total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get_many(self, kind: str, keys: List[str]) -> Dict[str, Any]:
+        """Return the cached values among `keys`, refreshing their recency."""
+        if not keys:
+            return {}
+        with self._lock:
+            placeholders = ",".join("?" * len(keys))
+            rows = self._db.execute(f"SELECT key, value FROM results WHERE key IN ({placeholders})", keys).fetchall()
+            found = {key: json.loads(value) for key, value in rows}
+            if found:
+                now = time.time()
+                self._db.executemany("UPDATE results SET last_used = ? WHERE key = ?", [(now, key) for key in found])
+
+            hits = sum(1 for key in keys if key in found)
+            self.hits += hits
+            self.misses += len(keys) - hits
+        RESULT_CACHE_LOOKUPS.labels(kind=kind, result="hit").inc(hits)
+        RESULT_CACHE_LOOKUPS.labels(kind=kind, result="miss").inc(len(keys) - hits)
+        return found
+
+    def put_many(self, values: Dict[str, Any]):
+        """Store results, evicting the least recently used ones if the cache grows too large."""
+        if not values:
+            return
+        with self._lock:
+            now = time.time()
+            for key, value in values.items():
+                document = json.dumps(value)
+                old_size = self._db.execute("SELECT size FROM results WHERE key = ?", (key,)).fetchone()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                    (key, document, len(document), now),
+                )
+                self._total_bytes += len(document) - (old_size[0] if old_size else 0)
+            self._evict()
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes:
+            rows = self._db.execute(
+                "SELECT key, size FROM results ORDER BY last_used LIMIT ?", (EVICTION_BATCH,)
+            ).fetchall()
+            if not rows:
+                break
+            victims = []
+            for key, size in rows:
+                if self._total_bytes <= self.max_bytes:
+                    break
+                victims.append((key,))
+                self._total_bytes -= size
+            self._db.executemany("DELETE FROM results WHERE key = ?", victims)
+            self.evictions += len(victims)
+
+    def summary(self) -> str:
+        return (
+            f"{self.hits} hits, {self.misses} misses (hit rate {self.hit_rate:.1%}), "
+            f"{self.evictions} evictions, {self._total_bytes / 1e6:.1f} MB stored"
+        )
+
+
+@lru_cache(maxsize=1)
+def get_result_cache() -> Optional[ResultCache]:
+    """
+    Get the process-wide model result cache, or None if it is disabled
+    """
+    if not settings.RESULT_CACHE_ENABLED:
+        return None
+    cache = ResultCache(settings.RESULT_CACHE_PATH, settings.RESULT_CACHE_MAX_BYTES)
+    logger.info(f"Model result cache at {cache.path}, limited to {cache.max_bytes / 1e6:.0f} MB")
+    return cache
+
+
+def cached_results(kind: str, keys: List[str], compute: Callable[[List[int]], List[Any]]) -> List[Any]:
+    """
+    Return one result per key, serving what the cache has and calling `compute` with
+    the positions of the rest. Identical keys in a batch are computed only once.
+    Empty and None results, such as the caption of a blocked response, are returned
+    but not cached, so the next run asks the model again.
+    """
+    cache = get_result_cache()
+    if cache is None:
+        return compute(list(range(len(keys))))
+
+    results = cache.get_many(kind, keys)
+    missing: Dict[str, int] = {}
+    for idx, key in enumerate(keys):
+        if key not in results and key not in missing:
+            missing[key] = idx
+
+    if missing:
+        computed = dict(zip(missing, compute(list(missing.values()))))
+        cache.put_many({key: value for key, value in computed.items() if value not in (None, "")})
+        results.update(computed)
+
+    logger.info(f"{kind}: {len(keys) - len(missing)} of {len(keys)} results served from cache ({cache.summary()})")
+    return [results[key] for key in keys]
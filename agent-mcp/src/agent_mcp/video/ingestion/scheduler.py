@@ -0,0 +1,250 @@
+import functools
+import os
+import queue
+import threading
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from uuid import uuid4
+
+from loguru import logger
+
+from agent_mcp.config import get_settings
+import agent_mcp.video.ingestion.registry as registry
+from agent_mcp.metrics import (
+    INGESTION_BACKLOG,
+    INGESTION_JOBS,
+    INGESTION_JOBS_DEDUPLICATED,
+    INGESTION_JOBS_IN_PROGRESS,
+    track_stage,
+)
+from agent_mcp.video.ingestion.models import IngestionJob, IngestionJobStatus
+from agent_mcp.video.ingestion.tools import compute_file_hash
+from agent_mcp.video.ingestion.video_processor import VideoProcessor
+
+logger = logger.bind(name="IngestionScheduler")
+
+settings = get_settings()
+
+# Share of a job's overall progress taken by each stage the VideoProcessor reports.
+STAGE_WEIGHTS = {"setup": 0.05, "convert": 0.15, "index": 0.80}
+
+
+class IngestionScheduler:
+    """A bounded pool of ingestion workers fed from a job queue.
+
+    Every worker owns its own VideoProcessor and handles one job at a time, so
+    the per-video state of concurrent jobs never overlaps.
+
+    Submissions are single-flight: a path that already has a queued or running job
+    attaches to that job instead of starting another. Jobs for different paths with
+    the same content run one at a time, so the later one finds the finished index
+    and reuses it. A content hash given on submission is only a hint; the worker
+    hashes the file itself before using it.
+
+    Only the most recent `history_limit` finished jobs are kept; older ones are
+    forgotten as new jobs finish.
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        max_queue_size: int,
+        history_limit: int = 1000,
+        processor_factory: Callable[[], VideoProcessor] = VideoProcessor,
+    ):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+
+        self._processor_factory = processor_factory
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue(maxsize=max_queue_size)
+        self._jobs: Dict[str, IngestionJob] = {}
+        self._done_events: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._workers: List[threading.Thread] = []
+        self._inflight: Dict[str, str] = {}
+        self._content_locks: Dict[str, Tuple[threading.Lock, int]] = {}
+        self._history_limit = history_limit
+        self._finished: "deque[str]" = deque()
+
+        for idx in range(max_workers):
+            worker = threading.Thread(target=self._worker_loop, name=f"ingestion-worker-{idx}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+        INGESTION_BACKLOG.set_function(self._queue.qsize)
+        logger.info(f"Ingestion scheduler started with {max_workers} workers and a queue of {max_queue_size}")
+
+    def submit(self, video_path: str, content_hash: Optional[str] = None) -> IngestionJob:
+        """Queue a video for ingestion and return its job, or the job already ingesting it."""
+        flight_keys = self._flight_keys(video_path)
+        with self._lock:
+            for key in flight_keys:
+                if key in self._inflight:
+                    inflight_job_id = self._inflight[key]
+                    INGESTION_JOBS_DEDUPLICATED.inc()
+                    logger.info(f"'{video_path}' is already being ingested by job {inflight_job_id}, attaching to it")
+                    return self._jobs[inflight_job_id].model_copy()
+
+            job = IngestionJob(job_id=str(uuid4()), video_path=video_path, content_hash=content_hash)
+            self._jobs[job.job_id] = job
+            self._done_events[job.job_id] = threading.Event()
+            self._inflight.update(dict.fromkeys(flight_keys, job.job_id))
+
+        try:
+            self._queue.put_nowait(job.job_id)
+        except queue.Full:
+            with self._lock:
+                self._jobs.pop(job.job_id)
+                self._done_events.pop(job.job_id)
+                for key in flight_keys:
+                    self._inflight.pop(key)
+            raise RuntimeError(f"Ingestion queue is full ({self._queue.maxsize} jobs), try again later")
+
+        logger.info(f"Queued ingestion job {job.job_id} for '{video_path}' (queue size: {self._queue.qsize()})")
+        return job.model_copy()
+
+    def get_job(self, job_id: str) -> Optional[IngestionJob]:
+        """Return a snapshot of a job, or None if the id is unknown."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.model_copy() if job else None
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[IngestionJob]:
+        """Block until a job finishes (or the timeout expires) and return its latest state."""
+        with self._lock:
+            done_event = self._done_events.get(job_id)
+        if done_event is None:
+            return None
+        done_event.wait(timeout)
+        return self.get_job(job_id)
+
+    @property
+    def backlog(self) -> int:
+        """Number of jobs waiting for a free worker."""
+        return self._queue.qsize()
+
+    def shutdown(self, wait: bool = True):
+        """Stop the workers once the jobs already queued have been processed."""
+        for _ in self._workers:
+            self._queue.put(None)
+        if wait:
+            for worker in self._workers:
+                worker.join()
+
+    def _update_job(self, job_id: str, **fields):
+        with self._lock:
+            job = self._jobs[job_id]
+            self._jobs[job_id] = job.model_copy(update=fields)
+
+    @staticmethod
+    def _flight_keys(video_path: str) -> List[str]:
+        return [f"path:{os.path.realpath(video_path)}"]
+
+    @staticmethod
+    def _resolve_content(job: IngestionJob) -> Tuple[str, Optional[str]]:
+        """
+        The key of the index a job will write to, and the content hash to pass to
+        ingest(). New videos are hashed here rather than in ingest(), so the hash can
+        key the lock that keeps two jobs from ingesting the same content at once.
+        The submitter's hash is never trusted: a wrong one would link the video to
+        another video's index.
+        """
+        metadata = registry.get_index_metadata(job.video_path)
+        if metadata is not None:
+            return metadata.content_hash or metadata.video_cache, None
+        content_hash = compute_file_hash(job.video_path)
+        if job.content_hash and job.content_hash != content_hash:
+            logger.warning(
+                f"Ignoring the content hash submitted for '{job.video_path}': "
+                f"it is {job.content_hash}, the file hashes to {content_hash}"
+            )
+        return content_hash, content_hash
+
+    @contextmanager
+    def _exclusive(self, key: str) -> Iterator[None]:
+        """Hold a lock shared by every job for the same key, dropping it once unused."""
+        with self._lock:
+            lock, users = self._content_locks.get(key, (threading.Lock(), 0))
+            self._content_locks[key] = (lock, users + 1)
+        try:
+            with lock:
+                yield
+        finally:
+            with self._lock:
+                lock, users = self._content_locks[key]
+                if users == 1:
+                    del self._content_locks[key]
+                else:
+                    self._content_locks[key] = (lock, users - 1)
+
+    def _report_progress(self, job_id: str, stage: str, percent: float):
+        with self._lock:
+            job = self._jobs[job_id]
+            stage_progress = {**job.stage_progress, stage: round(percent, 1)}
+            progress = sum(weight * stage_progress.get(name, 0.0) for name, weight in STAGE_WEIGHTS.items())
+            self._jobs[job_id] = job.model_copy(
+                update={"stage": stage, "stage_progress": stage_progress, "progress": round(progress, 1)}
+            )
+
+    def _worker_loop(self):
+        processor = self._processor_factory()
+        while True:
+            job_id = self._queue.get()
+            try:
+                if job_id is None:
+                    return
+                self._run_job(processor, job_id)
+            finally:
+                self._queue.task_done()
+
+    def _run_job(self, processor: VideoProcessor, job_id: str):
+        job = self.get_job(job_id)
+        logger.info(f"{threading.current_thread().name} started job {job_id} for '{job.video_path}'")
+        self._update_job(job_id, status=IngestionJobStatus.IN_PROGRESS, started_at=datetime.now())
+
+        processor.progress_callback = functools.partial(self._report_progress, job_id)
+        try:
+            index_key, content_hash = self._resolve_content(job)
+            with self._exclusive(index_key):
+                with INGESTION_JOBS_IN_PROGRESS.track_inprogress(), track_stage("job"):
+                    processor.ingest(job.video_path, content_hash=content_hash)
+        except Exception as e:
+            logger.error(f"Ingestion job {job_id} for '{job.video_path}' failed: {e}")
+            self._update_job(job_id, status=IngestionJobStatus.FAILED, error=str(e), finished_at=datetime.now())
+            INGESTION_JOBS.labels(status=IngestionJobStatus.FAILED.value).inc()
+        else:
+            logger.info(f"Ingestion job {job_id} for '{job.video_path}' completed")
+            self._update_job(
+                job_id, status=IngestionJobStatus.COMPLETED, progress=100.0, finished_at=datetime.now()
+            )
+            INGESTION_JOBS.labels(status=IngestionJobStatus.COMPLETED.value).inc()
+        finally:
+            processor.progress_callback = None
+            processor.reset()
+            with self._lock:
+                for key in self._flight_keys(job.video_path):
+                    self._inflight.pop(key, None)
+                self._done_events[job_id].set()
+                self._finished.append(job_id)
+                self._prune()
+
+    def _prune(self):
+        while len(self._finished) > self._history_limit:
+            job_id = self._finished.popleft()
+            self._jobs.pop(job_id, None)
+            self._done_events.pop(job_id, None)
+
+
+@lru_cache(maxsize=1)
+def get_scheduler() -> IngestionScheduler:
+    """
+    Get the process-wide ingestion scheduler
+    """
+    return IngestionScheduler(
+        max_workers=settings.INGESTION_MAX_WORKERS,
+        max_queue_size=settings.INGESTION_QUEUE_SIZE,
+        history_limit=settings.INGESTION_JOB_HISTORY_LIMIT,
+    )
@@ -0,0 +1,104 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator, List
+
+from loguru import logger
+
+from agent_mcp.config import get_settings
+from agent_mcp.video.ingestion.demux import demux_video
+from agent_mcp.video.ingestion.frame_sampling import build_frame_sampler
+from agent_mcp.video.ingestion.models import ShardResult, VideoSegment
+from agent_mcp.video.ingestion.vad import build_audio_chunker
+
+logger = logger.bind(name="ShardedIngestion")
+
+settings = get_settings()
+
+
+def decode_shard(
+    shard: VideoSegment, shard_idx: int, output_dir: str, video_duration: float, voice_activity_detection: bool
+) -> ShardResult:
+    """
+    Sample the frames and cut the audio chunks of one shard, spilling both to disk.
+
+    Runs in a worker process; rows are timed from the start of the shard.
+    """
+    started_at = time.perf_counter()
+    shard_dir = Path(output_dir) / f"shard_{shard_idx:05d}"
+    shard_duration = shard.end_sec - shard.start_sec
+    # Fixed sampling spreads SPLIT_FRAMES_COUNT over the whole video, so each shard gets its share.
+    num_frames = max(1, round(settings.SPLIT_FRAMES_COUNT * shard_duration / max(video_duration, 1.0)))
+    sampler = build_frame_sampler(shard_duration, num_frames)
+    chunker = build_audio_chunker(str(shard_dir / "audio_chunks"), voice_activity_detection)
+
+    result = ShardResult(
+        shard_idx=shard_idx, start_sec=shard.start_sec, end_sec=shard.end_sec, frames_decoded=0, scene_count=0
+    )
+    for batch in demux_video(shard.path, sampler, chunker, frame_dir=str(shard_dir / "frames")):
+        result.frames += batch.frames
+        result.audio_chunks += batch.audio_chunks
+        result.frames_decoded = batch.frames_decoded
+    result.scene_count = sampler.scene_count
+
+    logger.info(
+        f"Decoded shard {shard_idx} ({shard.start_sec:.1f}s-{shard.end_sec:.1f}s) in "
+        f"{time.perf_counter() - started_at:.2f}s: {len(result.frames)} frames, {len(result.audio_chunks)} audio chunks"
+    )
+    return result
+
+
+def decode_shards(
+    shards: List[VideoSegment],
+    output_dir: str,
+    video_duration: float,
+    voice_activity_detection: bool,
+    max_workers: int,
+) -> Iterator[ShardResult]:
+    """
+    Decode shards in parallel worker processes and yield their results in time order,
+    so the first shards can be committed while later ones are still being decoded.
+    """
+    # Spawned rather than forked: the parent holds pixeltable's connections and model threads.
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(shards)), mp_context=context) as executor:
+        futures = [
+            executor.submit(decode_shard, shard, idx, output_dir, video_duration, voice_activity_detection)
+            for idx, shard in enumerate(shards)
+        ]
+        for future in futures:
+            yield future.result()
+
+
+class ShardMerger:
+    """Rewrite shard rows so they read as one video decoded in a single pass.
+
+    Times are shifted by the shard offset, and frame indices, frame numbers, scene
+    indices and audio chunk positions continue from the previous shards.
+    """
+
+    def __init__(self):
+        self.frames_merged = 0
+        self.frames_decoded = 0
+        self.scenes = 0
+        self.audio_chunks_merged = 0
+
+    def merge(self, result: ShardResult) -> ShardResult:
+        offset_msec = result.start_sec * 1000.0
+        for record in result.frames:
+            for key in ("pos_msec", "scene_start_msec", "scene_end_msec", "run_end_msec"):
+                record[key] += offset_msec
+            record["frame_idx"] = self.frames_merged
+            record["pos_frame"] += self.frames_decoded
+            record["scene_idx"] += self.scenes
+            self.frames_merged += 1
+        for chunk in result.audio_chunks:
+            chunk["start_time_sec"] += result.start_sec
+            chunk["end_time_sec"] += result.start_sec
+            chunk["pos"] = self.audio_chunks_merged
+            self.audio_chunks_merged += 1
+
+        self.frames_decoded += result.frames_decoded
+        self.scenes += result.scene_count
+        return result
@@ -0,0 +1,308 @@
+import json
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+import agent_mcp.video.ingestion.constants as cc
+from agent_mcp.video.ingestion.models import CachedTable
+
+logger = logger.bind(name="IndexSnapshots")
+
+SNAPSHOT_FORMAT_VERSION = 2
+# File in a video's snapshot directory naming the version directory to read.
+CURRENT_POINTER = "CURRENT"
+# Attempts to open the current version when exports keep replacing it meanwhile.
+LOAD_ATTEMPTS = 3
+# Rows upcast to float32 per matrix multiply; small blocks stay in cache and bound scratch memory.
+SCORE_BLOCK_ROWS = 512
+# Queries scored together by `search_many`, bounding the Q x N score matrix.
+SCORE_BLOCK_QUERIES = 256
+
+
+def snapshot_dir(video_cache: str) -> Path:
+    """Directory holding the snapshot versions of a video index and the pointer to the current one"""
+    return Path(cc.DEFAULT_SNAPSHOTS_DIR) / video_cache
+
+
+def remove_snapshot(video_cache: str):
+    """Delete every snapshot version of a video index; loaded snapshots keep their open files"""
+    directory = snapshot_dir(video_cache)
+    if directory.exists():
+        shutil.rmtree(directory, ignore_errors=True)
+        logger.info(f"Removed the search snapshot of '{video_cache}'")
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Scale each row to unit length, so dot products are cosine similarities"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def cosine_scores(embeddings: np.ndarray, queries: np.ndarray) -> np.ndarray:
+    """
+    Cosine similarity of every query (Q x D) to every unit-length row of `embeddings`
+    (N x D, any float dtype), as a Q x N matrix.
+    """
+    queries = normalize_rows(np.atleast_2d(queries))
+    scores = np.empty((len(queries), len(embeddings)), dtype=np.float32)
+    for start in range(0, len(embeddings), SCORE_BLOCK_ROWS):
+        block = np.asarray(embeddings[start : start + SCORE_BLOCK_ROWS], dtype=np.float32)
+        scores[:, start : start + len(block)] = queries @ block.T
+    return scores
+
+
+def top_k_rows(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k highest scores, best first"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+class IndexSnapshot:
+    """A finished video index exported to memory-mapped .npy files.
+
+    Embeddings are stored unit-length in float16, next to the times of their rows,
+    so a search is a matrix product and a partial sort over pages that the OS page
+    cache shares between every worker process. Every file of a version is opened
+    when the snapshot is loaded, so a loaded snapshot keeps reading that version
+    even after a newer export replaces it.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        manifest: Dict[str, Any],
+        arrays: Optional[Dict[str, np.ndarray]] = None,
+        texts: Optional[Dict[str, List[str]]] = None,
+    ):
+        self.directory = directory
+        self.manifest = manifest
+        self._arrays: Dict[str, np.ndarray] = dict(arrays or {})
+        self._texts: Dict[str, List[str]] = dict(texts or {})
+
+    @classmethod
+    def load(cls, video_cache: str) -> Optional["IndexSnapshot"]:
+        """Open the current snapshot of a video index, if one was exported in the current format."""
+        pointer = snapshot_dir(video_cache) / CURRENT_POINTER
+        for _ in range(LOAD_ATTEMPTS):
+            try:
+                directory = pointer.parent / pointer.read_text().strip()
+            except FileNotFoundError:
+                return None
+            try:
+                return cls._open(video_cache, directory)
+            except FileNotFoundError:
+                # A newer export switched the pointer and removed this version before it was opened.
+                continue
+        logger.warning(f"Could not open a stable snapshot of '{video_cache}' after {LOAD_ATTEMPTS} attempts")
+        return None
+
+    @classmethod
+    def _open(cls, video_cache: str, directory: Path) -> Optional["IndexSnapshot"]:
+        manifest = json.loads((directory / "manifest.json").read_text())
+        if manifest.get("version") != SNAPSHOT_FORMAT_VERSION:
+            logger.warning(f"Ignoring snapshot of '{video_cache}' in format {manifest.get('version')}")
+            return None
+        arrays = {name: np.load(directory / f"{name}.npy", mmap_mode="r") for name in manifest["arrays"]}
+        texts = {name: json.loads((directory / f"{name}.json").read_text()) for name in manifest["texts"]}
+        return cls(directory, manifest, arrays, texts)
+
+    @property
+    def scene_aware(self) -> bool:
+        return self.manifest["scene_aware"]
+
+    def model(self, modality: str) -> Dict[str, str]:
+        """Embedding backend and model the rows of a modality were embedded with"""
+        return self.manifest["models"][modality]
+
+    def coverage(self) -> Dict[str, float]:
+        duration = self.manifest["duration_sec"]
+        return {
+            "indexed_until_sec": self.manifest["indexed_until_sec"],
+            "duration_sec": duration,
+            "coverage": self.manifest["indexed_until_sec"] / duration if duration else 0.0,
+        }
+
+    def array(self, name: str) -> np.ndarray:
+        return self._arrays[name]
+
+    def texts(self, name: str) -> List[str]:
+        return self._texts[name]
+
+    def search(self, modality: str, query: np.ndarray, top_k: int) -> List[Dict[str, Any]]:
+        """Rows of a modality most similar to a query embedding, best first, with their times."""
+        return self.search_many(modality, np.atleast_2d(query), top_k)[0]
+
+    def search_many(self, modality: str, queries: np.ndarray, top_k: int) -> List[List[Dict[str, Any]]]:
+        """
+        Like `search` for every row of a Q x D matrix of query embeddings, scoring a
+        block of queries against the whole modality with one matrix product.
+        """
+        embeddings = self.array(f"{modality}_embeddings")
+        results = []
+        for start in range(0, len(queries), SCORE_BLOCK_QUERIES):
+            scores = cosine_scores(embeddings, queries[start : start + SCORE_BLOCK_QUERIES])
+            for query_scores in scores:
+                results.append(
+                    [
+                        {**self.row(modality, int(idx)), "similarity": float(query_scores[idx])}
+                        for idx in top_k_rows(query_scores, top_k)
+                    ]
+                )
+        return results
+
+    def row(self, modality: str, idx: int) -> Dict[str, Any]:
+        """
+        Times of a speech row in seconds from the start of the video, or the frame
+        columns of a caption or image row as the pixeltable views name them.
+        """
+        if modality == "speech":
+            return {
+                "start_time": float(self.array("speech_start_time_sec")[idx]),
+                "end_time": float(self.array("speech_end_time_sec")[idx]),
+                "text": self.texts("speech_text")[idx],
+            }
+
+        if modality == "caption":
+            caption = self.texts("caption_text")[idx]
+            idx = int(self.array("caption_rows")[idx])
+        entry = {
+            "pos_msec": float(self.array("frame_pos_msec")[idx]),
+            "segment_start_sec": float(self.array("frame_segment_start_sec")[idx]),
+        }
+        if self.scene_aware:
+            for column in ("scene_start_msec", "scene_end_msec", "run_end_msec"):
+                entry[column] = float(self.array(f"frame_{column}")[idx])
+        if modality == "caption":
+            entry["caption"] = caption
+        return entry
+
+
+def _read_index(index: CachedTable) -> Tuple[Dict[str, np.ndarray], Dict[str, List[str]], Dict[str, int]]:
+    """Arrays, texts and row counts of a snapshot, read from the pixeltable views of an index"""
+    audio = index.audio_chunks_view
+    speech_rows = [
+        row
+        for row in audio.select(
+            audio.segment_start_sec,
+            audio.start_time_sec,
+            audio.end_time_sec,
+            audio.chunk_text,
+            embedding=audio.chunk_text.embedding(),
+        ).collect()
+        if row["embedding"] is not None
+    ]
+
+    frames = index.frames_view
+    frame_columns = ["pos_msec", "segment_start_sec"]
+    if index.scene_aware:
+        frame_columns += ["scene_start_msec", "scene_end_msec", "run_end_msec"]
+    frame_rows = list(
+        frames.select(
+            *(getattr(frames, column) for column in frame_columns),
+            frames.im_caption,
+            image_embedding=frames.resized_frame.embedding(),
+            caption_embedding=frames.im_caption.embedding(),
+        ).collect()
+    )
+    captioned = [idx for idx, row in enumerate(frame_rows) if row["caption_embedding"] is not None]
+
+    def embeddings(vectors: List[Any]) -> np.ndarray:
+        if not vectors:
+            return np.zeros((0, 0), dtype=np.float16)
+        return normalize_rows(np.stack(vectors)).astype(np.float16)
+
+    arrays = {
+        "speech_embeddings": embeddings([row["embedding"] for row in speech_rows]),
+        "speech_start_time_sec": np.array(
+            [row["segment_start_sec"] + row["start_time_sec"] for row in speech_rows], dtype=np.float64
+        ),
+        "speech_end_time_sec": np.array(
+            [row["segment_start_sec"] + row["end_time_sec"] for row in speech_rows], dtype=np.float64
+        ),
+        "image_embeddings": embeddings([row["image_embedding"] for row in frame_rows]),
+        "caption_embeddings": embeddings([frame_rows[idx]["caption_embedding"] for idx in captioned]),
+        "caption_rows": np.array(captioned, dtype=np.int64),
+    }
+    for column in frame_columns:
+        arrays[f"frame_{column}"] = np.array([row[column] for row in frame_rows], dtype=np.float64)
+    texts = {
+        "speech_text": [row["chunk_text"] for row in speech_rows],
+        "caption_text": [frame_rows[idx]["im_caption"] for idx in captioned],
+    }
+    rows = {"speech": len(speech_rows), "frames": len(frame_rows), "captions": len(captioned)}
+    return arrays, texts, rows
+
+
+def _manifest(
+    index: CachedTable,
+    models: Dict[str, Dict[str, str]],
+    arrays: Dict[str, np.ndarray],
+    texts: Dict[str, List[str]],
+    rows: Dict[str, int],
+    indexed_until_sec: float,
+    duration_sec: float,
+) -> Dict[str, Any]:
+    return {
+        "version": SNAPSHOT_FORMAT_VERSION,
+        "video_cache": index.video_cache,
+        "scene_aware": index.scene_aware,
+        "models": models,
+        "indexed_until_sec": indexed_until_sec,
+        "duration_sec": duration_sec,
+        "rows": rows,
+        "arrays": sorted(arrays),
+        "texts": sorted(texts),
+    }
+
+
+def export_snapshot(
+    index: CachedTable, models: Dict[str, Dict[str, str]], indexed_until_sec: float, duration_sec: float
+) -> Path:
+    """
+    Export the embeddings and row times of a finished video index.
+
+    Each export is written to a new version directory, and the CURRENT pointer is
+    then switched to it with an atomic rename, so readers open either the previous
+    version or the complete new one. Older versions are removed afterwards; loaded
+    snapshots keep their open files.
+    """
+    arrays, texts, rows = _read_index(index)
+    manifest = _manifest(index, models, arrays, texts, rows, indexed_until_sec, duration_sec)
+
+    root = snapshot_dir(index.video_cache)
+    version = f"v{uuid.uuid4().hex}"
+    directory = root / version
+    directory.mkdir(parents=True)
+    for name, array in arrays.items():
+        np.save(directory / f"{name}.npy", array)
+    for name, values in texts.items():
+        (directory / f"{name}.json").write_text(json.dumps(values))
+    (directory / "manifest.json").write_text(json.dumps(manifest, indent=4))
+
+    pointer_tmp = root / f".{version}.{CURRENT_POINTER}"
+    pointer_tmp.write_text(version)
+    os.replace(pointer_tmp, root / CURRENT_POINTER)
+
+    for stale in root.iterdir():
+        if stale.name in (version, CURRENT_POINTER):
+            continue
+        if stale.is_dir():
+            shutil.rmtree(stale, ignore_errors=True)
+        else:
+            stale.unlink(missing_ok=True)
+
+    size_mb = sum(path.stat().st_size for path in directory.iterdir()) / 1e6
+    logger.info(
+        f"Exported snapshot of '{index.video_cache}' to {directory}: {rows['speech']} audio chunks, "
+        f"{rows['frames']} frames, {rows['captions']} captions, {size_mb:.1f} MB"
+    )
+    return directory
@@ -1,17 +1,26 @@
 import base64
+import csv
+import hashlib
+import json
+import os
 import subprocess
+import time
+from functools import lru_cache
 from io import BytesIO
 from pathlib import Path
-
+from typing import List, Literal, Optional
 
 import av
 import loguru 
-from moviepy import VideoFileCLip
+from moviepy import VideoFileClip
 from PIL import Image
 
+from agent_mcp.metrics import track_ffmpeg
+from agent_mcp.video.ingestion.models import VideoProbe, VideoSegment
+
 logger = loguru.logger.bind(name = "VideoTools")
 
-def extract_video_clip(video_path:str , start_time: float, end_time: float,output_path: str = None) -> VideoFileCLip:
+def extract_video_clip(video_path:str , start_time: float, end_time: float,output_path: str = None) -> VideoFileClip:
     if start_time>=end_time:
         raise ValueError("start_time must be less than end_time")
 
@@ -36,10 +45,11 @@ def extract_video_clip(video_path:str , start_time: float, end_time: float,outpu
     ]
 
     try:
-        process = subprocess.Popen(command,stdout = subprocess.PIPE,stderr = subprocess.PIPE)
-        stdout , _ = process.communicate()
-        logger.debug(f"FFMpeg output: {stdout.decode('utf-8',erros = 'ignore')}")
-        return VideoFileCLip(output_path)
+        with track_ffmpeg("clip"):
+            process = subprocess.Popen(command,stdout = subprocess.PIPE,stderr = subprocess.PIPE)
+            stdout , _ = process.communicate()
+        logger.debug(f"FFMpeg output: {stdout.decode('utf-8',errors = 'ignore')}")
+        return VideoFileClip(output_path)
     except subprocess.CalledProcessError as e:
         raise IOError(f"Failed to extract video clip: {str(e)}")
 
@@ -72,41 +82,229 @@ def decode_image(base64_string: str)->Image.Image:
     except (ValueError,IOError) as e:
         raise IOError(f"Failed to decode image: {str(e)}")
     
-def re_encode_video(video_path: str)-> str:
-    """RE-Encode a video file to ensure compatibility with PyAV"""
+def dhash(image: Image.Image, hash_size: int = 8) -> int:
+    """Compute the difference hash of an image as a `hash_size * hash_size` bit integer"""
+    pixels = image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR).tobytes()
+    bits = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return bits
+
+
+def hamming_distance(hash_a: int, hash_b: int) -> int:
+    """Number of differing bits between two image hashes"""
+    return (hash_a ^ hash_b).bit_count()
+
+
+SUPPORTED_VIDEO_CODECS = {"h264", "hevc", "vp8", "vp9", "av1", "mpeg4"}
+SUPPORTED_PIXEL_FORMATS = {"yuv420p", "yuvj420p", "nv12"}
+
+CompatibilityAction = Literal["original", "remux", "transcode"]
+
+
+def probe_video(video_path: str) -> VideoProbe:
+    """Probe the container, codecs and pixel format of a video, cached per file version"""
+    stat = os.stat(video_path)
+    return _probe_video(str(video_path), stat.st_mtime_ns, stat.st_size)
+
+
+@lru_cache(maxsize=1024)
+def _probe_video(video_path: str, mtime_ns: int, size: int) -> VideoProbe:
+    command = [
+        "ffprobe",
+        "-v",
+        "error",
+        "-show_entries",
+        "format=format_name:stream=codec_type,codec_name,pix_fmt",
+        "-of",
+        "json",
+        video_path,
+    ]
+    with track_ffmpeg("probe"):
+        result = subprocess.run(command, capture_output=True, text=True, check=True)
+    info = json.loads(result.stdout)
+
+    streams = info.get("streams", [])
+    video_stream = next((stream for stream in streams if stream.get("codec_type") == "video"), {})
+    audio_stream = next((stream for stream in streams if stream.get("codec_type") == "audio"), {})
+    return VideoProbe(
+        container=info.get("format", {}).get("format_name", ""),
+        video_codec=video_stream.get("codec_name"),
+        pixel_format=video_stream.get("pix_fmt"),
+        audio_codec=audio_stream.get("codec_name"),
+        decodable=_can_decode(video_path),
+    )
+
+
+def _can_decode(video_path: str) -> bool:
+    try:
+        with av.open(video_path) as container:
+            next(container.decode(video=0))
+        return True
+    except Exception:
+        return False
+
+
+def choose_compatibility_action(probe: VideoProbe) -> CompatibilityAction:
+    """
+    Pick the cheapest way to make a probed video usable for ingestion. Anything PyAV
+    decodes is used as it is; the allowlists only decide whether an undecodable file
+    can be fixed by remuxing its streams or has to be transcoded.
+    """
+    if probe.decodable:
+        return "original"
+    if probe.video_codec in SUPPORTED_VIDEO_CODECS and probe.pixel_format in SUPPORTED_PIXEL_FORMATS:
+        return "remux"
+    return "transcode"
+
+
+def re_encode_video(video_path: str) -> Optional[str]:
+    """Make a video compatible with PyAV, doing as little work as possible.
+
+    The file is probed once. Files PyAV can decode are used as they are. Of the rest,
+    files with a supported codec and pixel format are remuxed into MP4 with stream
+    copy, and only the others are transcoded to H.264.
+    """
     if not Path(video_path).exists():
         logger.error(f"Error: Video file not found at {video_path}")
-        return False
-    
+        return None
+
+    started_at = time.perf_counter()
+    try:
+        probe = probe_video(video_path)
+    except (subprocess.CalledProcessError, json.JSONDecodeError) as e:
+        logger.error(f"Failed to probe video {video_path}: {e}")
+        return None
+    probe_seconds = time.perf_counter() - started_at
+
+    action = choose_compatibility_action(probe)
+    logger.info(
+        f"Compatibility decision for {video_path}: {action} (container={probe.container}, "
+        f"video={probe.video_codec}/{probe.pixel_format}, audio={probe.audio_codec}, probe took {probe_seconds:.2f}s)"
+    )
+    if action == "original":
+        return str(video_path)
+
+    o_dir, o_fname = Path(video_path).parent, Path(video_path).name
+    output_path = Path(o_dir) / f"re_{o_fname}.mp4"
+    if output_path.exists() and output_path.stat().st_mtime >= Path(video_path).stat().st_mtime:
+        if probe_video(str(output_path)).decodable:
+            logger.info(f"Reusing previously converted video {output_path}")
+            return str(output_path)
+
+    if action == "remux":
+        converted = _run_ffmpeg_conversion(
+            video_path, output_path, ["-map", "0:v:0", "-map", "0:a?", "-c", "copy"], "remux"
+        )
+        if converted:
+            return converted
+        logger.warning(f"Remuxing {video_path} did not produce a decodable file, falling back to a transcode")
+
+    return _run_ffmpeg_conversion(
+        video_path,
+        output_path,
+        ["-map", "0:v:0", "-map", "0:a?", "-c:v", "libx264", "-pix_fmt", "yuv420p", "-c:a", "aac"],
+        "transcode",
+    )
+
+
+def _run_ffmpeg_conversion(video_path: str, output_path: Path, codec_args: List[str], action: str) -> Optional[str]:
+    command = ["ffmpeg", "-i", video_path, *codec_args, "-movflags", "+faststart", "-y", str(output_path)]
+    logger.info(f"Running FFmpeg {action}: {' '.join(command)}")
+
+    started_at = time.perf_counter()
+    try:
+        with track_ffmpeg(action):
+            result = subprocess.run(command, capture_output=True, text=True, check=True)
+        logger.debug(f"FFmpeg stderr: {result.stderr}")
+    except subprocess.CalledProcessError as e:
+        logger.error(f"FFmpeg {action} of {video_path} failed: {e.stderr}")
+        return None
+    elapsed = time.perf_counter() - started_at
+
+    if not probe_video(str(output_path)).decodable:
+        logger.error(f"FFmpeg {action} of {video_path} produced an undecodable file {output_path}")
+        return None
+
+    logger.info(f"FFmpeg {action} of {video_path} to {output_path} took {elapsed:.2f}s")
+    return str(output_path)
+
+
+def compute_file_hash(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Compute the SHA-256 hex digest of a file, reading it in chunks"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_video_duration(video_path: str) -> float:
+    """Get the duration of a video file in seconds"""
+    with av.open(video_path) as container:
+        if container.duration is not None:
+            return container.duration / av.time_base
+        stream = container.streams.video[0]
+        return float(stream.duration * stream.time_base)
+
+
+def split_video_segments(video_path: str, segment_seconds: float, output_dir: str) -> List[VideoSegment]:
+    """Split a video into time-ordered segments without re-encoding.
+
+    Cuts happen on keyframes, so segment lengths are only approximately
+    `segment_seconds`. Offsets are the cut times ffmpeg reports in its segment list,
+    measured from the start of the first segment, so they do not drift over a long video.
+    """
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    segment_pattern = str(Path(output_dir) / "segment_%05d.mp4")
+    segment_list = Path(output_dir) / "segments.csv"
+    command = [
+        "ffmpeg",
+        "-i",
+        video_path,
+        "-map",
+        "0:v:0",
+        "-map",
+        "0:a?",
+        "-c",
+        "copy",
+        "-f",
+        "segment",
+        "-segment_time",
+        str(segment_seconds),
+        "-segment_list",
+        str(segment_list),
+        "-segment_list_type",
+        "csv",
+        "-reset_timestamps",
+        "1",
+        "-y",
+        segment_pattern,
+    ]
+
+    logger.info(f"Splitting video into segments: {' '.join(command)}")
     try:
-        with av.open(video_path) as _ :
-            logger.info(f"Video {video_path} successfully opened by pyAv")
-            return str(video_path)
-    except Exception as e:
-        logger.error(f"An Unexpected error occured while trying to open video {video_path}: {e}")
-    finally:
-        o_dir , o_fname = Path(video_path).parent , Path(video_path).name
-        reencoded_filename = f"re_{o_fname}.mp4"
-        reencoded_video_path = Path(o_dir) / reencoded_filename
-
-        command = ["ffmpeg", "-i", video_path, "-c:v", "libx264", "-c:a", "copy", str(reencoded_video_path)]
-
-        logger.info(f"Attempting to re-encode video using FFmpeg: {' '.join(command) }")
-
-        try:
-            result = subprocess.run(command,capture_output= True, text = True, check = True)
-            logger.info(f"FFMpeg re-encoding successful for {video_path} to {reencoded_video_path}")
-            logger.debug(f"FFMpeg stdout : {result.stdout}")
-            logger.debug(f"FFmpeg stderr: {result.stderr}")
-
-            try:
-                with av.open(reencoded_video_path) as _ :
-                    logger.info(f"RE encoded video {reencoded_video_path} successsfully opened by PyAV")
-                    return str(reencoded_video_path)
-            except Exception as e:
-                logger.error(f"An unexpected error occured while trying to open re-encoded video {reencoded_video_path}: {e}")
-                return None
-
-        except Exception as e:
-            logger.error(f"An Unexpected error occured during FFMpeg re-encoding : {e}")
-            return None    
\ No newline at end of file
+        with track_ffmpeg("segment"):
+            subprocess.run(command, capture_output=True, text=True, check=True)
+    except subprocess.CalledProcessError as e:
+        raise IOError(f"Failed to split video {video_path} into segments: {e.stderr}")
+    return read_segment_list(segment_list)
+
+
+def read_segment_list(segment_list: Path) -> List[VideoSegment]:
+    """Segments of an ffmpeg CSV segment list (`file,start,end` rows), located next to the list"""
+    with open(segment_list, newline="") as f:
+        rows = [row for row in csv.reader(f) if row]
+    if not rows:
+        return []
+    origin = float(rows[0][1])
+    return [
+        VideoSegment(
+            path=str(segment_list.parent / Path(filename).name),
+            start_sec=float(start) - origin,
+            end_sec=float(end) - origin,
+        )
+        for filename, start, end in rows
+    ]
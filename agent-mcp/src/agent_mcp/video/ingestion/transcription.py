@@ -0,0 +1,50 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List
+
+import openai
+import pixeltable as pxt
+from loguru import logger
+from pixeltable.func import Batch
+
+from agent_mcp.config import get_settings
+from agent_mcp.metrics import track_model_batch
+from agent_mcp.video.ingestion.result_cache import cached_results, result_key
+from agent_mcp.video.ingestion.tools import compute_file_hash
+
+logger = logger.bind(name="AudioTranscription")
+
+settings = get_settings()
+
+
+@lru_cache(maxsize=1)
+def get_transcription_executor() -> ThreadPoolExecutor:
+    """
+    Get the process-wide pool that caps concurrent transcription requests
+    """
+    return ThreadPoolExecutor(max_workers=settings.TRANSCRIPTION_MAX_IN_FLIGHT, thread_name_prefix="transcribe")
+
+
+@lru_cache(maxsize=1)
+def get_openai_client() -> openai.OpenAI:
+    return openai.OpenAI()
+
+
+def _transcribe(audio_path: str, model: str) -> dict:
+    with open(audio_path, "rb") as f:
+        return get_openai_client().audio.transcriptions.create(file=f, model=model).model_dump()
+
+
+@pxt.udf(batch_size=settings.TRANSCRIPTION_BATCH_SIZE)
+def transcribe_audio(audios: Batch[pxt.Audio], *, model: str) -> Batch[pxt.Json]:
+    """Transcribe audio chunks with OpenAI, reusing cached transcripts of identical chunks"""
+    audios = list(audios)
+    keys = [result_key("transcription", compute_file_hash(audio), model) for audio in audios]
+
+    def transcribe_missing(positions: List[int]) -> List[dict]:
+        with track_model_batch("transcription"):
+            executor = get_transcription_executor()
+            futures = [executor.submit(_transcribe, audios[idx], model) for idx in positions]
+            return [future.result() for future in futures]
+
+    return cached_results("transcription", keys, transcribe_missing)
@@ -0,0 +1,317 @@
+import hashlib
+import math
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import av
+import numpy as np
+import pixeltable.type_system as ts
+from loguru import logger
+from pixeltable.iterators.base import ComponentIterator
+
+from agent_mcp.config import get_settings
+from agent_mcp.video.ingestion.demux import AUDIO_SAMPLE_RATE, AudioChunker, write_wav_chunk
+
+logger = logger.bind(name="VoiceActivity")
+
+settings = get_settings()
+
+SPEECH_BAND_HZ = (200.0, 4000.0)
+NOISE_FLOOR_ADAPTATION = 0.05
+PAUSE_DEPTH_DB = 15.0
+
+
+class SpeechDetector:
+    """Classify short PCM frames as speech from their energy and spectrum.
+
+    A frame is speech when it is louder than both an absolute floor and the adaptive
+    noise floor by `energy_margin_db`, and most of its energy lies in the speech band.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        min_energy_dbfs: float,
+        energy_margin_db: float,
+        speech_band_ratio: float,
+    ):
+        self.sample_rate = sample_rate
+        self.min_energy_dbfs = min_energy_dbfs
+        self.energy_margin_db = energy_margin_db
+        self.speech_band_ratio = speech_band_ratio
+        self.noise_floor_db: Optional[float] = None
+        self._band_masks: Dict[int, np.ndarray] = {}
+
+    def classify(self, frame: np.ndarray) -> Tuple[bool, float]:
+        """Return whether a frame of int16 samples is speech, and its energy in dBFS."""
+        samples = frame.astype(np.float32) / 32768.0
+        energy_db = 10.0 * math.log10(float(np.mean(samples**2)) + 1e-12)
+
+        if self.noise_floor_db is None or energy_db < self.noise_floor_db:
+            self.noise_floor_db = energy_db
+        if energy_db < max(self.min_energy_dbfs, self.noise_floor_db + self.energy_margin_db):
+            self.noise_floor_db += NOISE_FLOOR_ADAPTATION * (energy_db - self.noise_floor_db)
+            return False, energy_db
+
+        spectrum = np.abs(np.fft.rfft(samples * np.hanning(len(samples)))) ** 2
+        band_energy = spectrum[self._band_mask(len(samples))].sum()
+        return band_energy >= self.speech_band_ratio * max(spectrum.sum(), 1e-12), energy_db
+
+    def _band_mask(self, frame_samples: int) -> np.ndarray:
+        if frame_samples not in self._band_masks:
+            freqs = np.fft.rfftfreq(frame_samples, 1.0 / self.sample_rate)
+            self._band_masks[frame_samples] = (freqs >= SPEECH_BAND_HZ[0]) & (freqs <= SPEECH_BAND_HZ[1])
+        return self._band_masks[frame_samples]
+
+
+class SpeechChunker(AudioChunker):
+    """Cut a mono 16-bit PCM stream into chunks that follow detected speech.
+
+    Speech regions separated by less than `merge_gap` are merged, padded by `padding`
+    on both sides, and split into `chunk_duration` pieces overlapping by `overlap`.
+    Regions shorter than `min_speech_duration`, and chunks with too few pauses to be
+    speech (music, tones), are dropped, so they are never sent for transcription.
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        chunk_duration: float,
+        overlap: float,
+        detector: SpeechDetector,
+        min_speech_duration: float,
+        merge_gap: float,
+        padding: float,
+        min_pause_ratio: float,
+        frame_ms: int = 30,
+        sample_rate: int = AUDIO_SAMPLE_RATE,
+    ):
+        super().__init__(output_dir, chunk_duration, overlap, min_chunk_duration=0.0, sample_rate=sample_rate)
+        if padding > merge_gap:
+            raise ValueError("Speech padding must not exceed the merge gap")
+
+        self.detector = detector
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self.frame_sec = self.frame_samples / sample_rate
+        self.chunk_frames = int(chunk_duration / self.frame_sec)
+        self.overlap_frames = int(overlap / self.frame_sec)
+        self.min_speech_frames = math.ceil(min_speech_duration / self.frame_sec)
+        self.merge_gap_frames = max(1, int(merge_gap / self.frame_sec))
+        self.padding_frames = int(padding / self.frame_sec)
+        self.min_pause_ratio = min_pause_ratio
+
+        self.audio_seconds = 0.0
+        self.transcribed_seconds = 0.0
+        self.chunks_dropped = 0
+
+        self._buffer_frame = 0
+        self._energies: List[float] = []
+        self._frames = 0
+        self._region_start: Optional[int] = None
+        self._last_speech = 0
+        self._transcribed_until_frame = 0
+
+    @property
+    def skipped_seconds(self) -> float:
+        return max(self.audio_seconds - self.transcribed_seconds, 0.0)
+
+    def push(self, samples: np.ndarray) -> List[Dict[str, Any]]:
+        """Append decoded samples and return every speech chunk that is now complete."""
+        self._buffer = np.concatenate([self._buffer, samples.astype(np.int16, copy=False)])
+        chunks = []
+        while (self._frames - self._buffer_frame + 1) * self.frame_samples <= len(self._buffer):
+            offset = (self._frames - self._buffer_frame) * self.frame_samples
+            is_speech, energy_db = self.detector.classify(self._buffer[offset : offset + self.frame_samples])
+            self._energies.append(energy_db)
+            self._frames += 1
+            chunks += self._advance(self._frames - 1, is_speech)
+
+        self._trim()
+        self.audio_seconds = self._frames * self.frame_sec
+        self.covered_until_sec = self._pending_from() * self.frame_sec
+        return chunks
+
+    def flush(self) -> List[Dict[str, Any]]:
+        """Close the speech region still open at the end of the stream."""
+        chunks = []
+        if self._region_start is not None:
+            chunks = self._emit(self._region_start, self._last_speech + 1)
+            self._region_start = None
+        self.audio_seconds = (self._buffer_frame * self.frame_samples + len(self._buffer)) / self.sample_rate
+        self.covered_until_sec = self.audio_seconds
+        return chunks
+
+    def summary(self) -> str:
+        return (
+            f"transcribing {self.transcribed_seconds:.1f}s of {self.audio_seconds:.1f}s of audio, "
+            f"skipped {self.skipped_seconds:.1f}s without speech ({self.chunks_dropped} non-speech regions dropped)"
+        )
+
+    def _advance(self, idx: int, is_speech: bool) -> List[Dict[str, Any]]:
+        if is_speech:
+            if self._region_start is None:
+                self._region_start = idx
+            self._last_speech = idx
+        if self._region_start is None:
+            return []
+
+        if idx - self._last_speech >= self.merge_gap_frames:
+            chunks = self._emit(self._region_start, self._last_speech + 1)
+            self._region_start = None
+            return chunks
+        if idx + 1 - self._region_start >= self.chunk_frames:
+            chunks = self._emit(self._region_start, idx + 1, pad_end=False)
+            self._region_start = idx + 1 - self.overlap_frames
+            return chunks
+        return []
+
+    def _emit(self, start: int, end: int, pad_end: bool = True) -> List[Dict[str, Any]]:
+        energies = self._energies[start - self._buffer_frame : end - self._buffer_frame]
+        if end - start < self.min_speech_frames or not self._has_pauses(energies):
+            self.chunks_dropped += 1
+            return []
+
+        first = max(start - self.padding_frames, self._buffer_frame)
+        last = min(end + self.padding_frames, self._frames) if pad_end else end
+        offset = first - self._buffer_frame
+        samples = self._buffer[offset * self.frame_samples : (offset + last - first) * self.frame_samples]
+
+        pos = self._next_pos
+        self._next_pos += 1
+        chunk_path = write_wav_chunk(self.output_dir, pos, samples, self.sample_rate)
+        self.bytes_written += samples.nbytes
+        self.transcribed_seconds += max(last - max(first, self._transcribed_until_frame), 0) * self.frame_sec
+        self._transcribed_until_frame = max(self._transcribed_until_frame, last)
+        return [
+            {
+                "pos": pos,
+                "audio_chunk": str(chunk_path),
+                "start_time_sec": first * self.frame_sec,
+                "end_time_sec": last * self.frame_sec,
+            }
+        ]
+
+    def _has_pauses(self, energies: List[float]) -> bool:
+        """Speech keeps dropping between syllables and words; music and tones do not."""
+        if len(energies) * self.frame_sec < 1.0:
+            return True
+        energies = np.asarray(energies)
+        pauses = energies < np.percentile(energies, 90) - PAUSE_DEPTH_DB
+        return float(pauses.mean()) >= self.min_pause_ratio
+
+    def _pending_from(self) -> int:
+        """First frame a future chunk may still start at."""
+        if self._region_start is None:
+            return self._frames
+        return max(self._region_start - self.padding_frames, 0)
+
+    def _trim(self):
+        keep_from = max(min(self._pending_from(), self._frames - self.padding_frames), self._buffer_frame)
+        drop = keep_from - self._buffer_frame
+        if drop > 0:
+            self._buffer = self._buffer[drop * self.frame_samples :]
+            self._energies = self._energies[drop:]
+            self._buffer_frame = keep_from
+
+
+def build_speech_chunker(output_dir: str, chunk_duration: float, overlap: float) -> SpeechChunker:
+    """
+    Create a speech chunker tuned by the AUDIO_VAD_* settings
+    """
+    return SpeechChunker(
+        output_dir=output_dir,
+        chunk_duration=chunk_duration,
+        overlap=overlap,
+        detector=SpeechDetector(
+            sample_rate=AUDIO_SAMPLE_RATE,
+            min_energy_dbfs=settings.AUDIO_VAD_MIN_ENERGY_DBFS,
+            energy_margin_db=settings.AUDIO_VAD_ENERGY_MARGIN_DB,
+            speech_band_ratio=settings.AUDIO_VAD_SPEECH_BAND_RATIO,
+        ),
+        min_speech_duration=settings.AUDIO_VAD_MIN_SPEECH_SECONDS,
+        merge_gap=settings.AUDIO_VAD_MERGE_GAP_SECONDS,
+        padding=settings.AUDIO_VAD_PADDING_SECONDS,
+        min_pause_ratio=settings.AUDIO_VAD_MIN_PAUSE_RATIO,
+        frame_ms=settings.AUDIO_VAD_FRAME_MS,
+    )
+
+
+def build_audio_chunker(output_dir: str, voice_activity_detection: bool) -> AudioChunker:
+    """
+    Create the single-pass audio chunker, following detected speech if enabled
+    """
+    if voice_activity_detection:
+        return build_speech_chunker(output_dir, settings.AUDIO_CHUNK_LENGTH, settings.AUDIO_OVERLAP_SECONDS)
+    return AudioChunker(
+        output_dir=output_dir,
+        chunk_duration=settings.AUDIO_CHUNK_LENGTH,
+        overlap=settings.AUDIO_OVERLAP_SECONDS,
+        min_chunk_duration=settings.AUDIO_MIN_CHUNK_DURATION_SECONDS,
+    )
+
+
+class SpeechAudioSplitter(ComponentIterator):
+    """
+    Split an audio file into chunks that follow detected speech.
+
+    Drop-in replacement for pixeltable's AudioSplitter that skips silence and music.
+    """
+
+    def __init__(self, audio: str, *, output_dir: str, chunk_duration_sec: float, overlap_sec: float):
+        self.audio_path = audio
+        # Several audio files may be split into the same directory, one subdirectory each.
+        self.output_dir = str(Path(output_dir) / hashlib.sha1(str(audio).encode()).hexdigest()[:12])
+        self.chunk_duration_sec = chunk_duration_sec
+        self.overlap_sec = overlap_sec
+        self._open()
+
+    @classmethod
+    def input_schema(cls) -> Dict[str, ts.ColumnType]:
+        return {
+            "audio": ts.AudioType(nullable=False),
+            "output_dir": ts.StringType(),
+            "chunk_duration_sec": ts.FloatType(),
+            "overlap_sec": ts.FloatType(),
+        }
+
+    @classmethod
+    def output_schema(cls, *args: Any, **kwargs: Any) -> Tuple[Dict[str, ts.ColumnType], List[str]]:
+        return (
+            {
+                "start_time_sec": ts.FloatType(),
+                "end_time_sec": ts.FloatType(),
+                "audio_chunk": ts.AudioType(),
+            },
+            [],
+        )
+
+    def _open(self):
+        self.chunker = build_speech_chunker(self.output_dir, self.chunk_duration_sec, self.overlap_sec)
+        self._chunks = self._split()
+        self.next_pos = 0
+
+    def _split(self) -> Iterator[Dict[str, Any]]:
+        with av.open(self.audio_path) as container:
+            resampler = av.AudioResampler(format="s16", layout="mono", rate=self.chunker.sample_rate)
+            for frame in container.decode(container.streams.audio[0]):
+                for resampled in resampler.resample(frame):
+                    yield from self.chunker.push(resampled.to_ndarray().reshape(-1))
+            for resampled in resampler.resample(None):
+                yield from self.chunker.push(resampled.to_ndarray().reshape(-1))
+        yield from self.chunker.flush()
+        logger.info(f"Voice activity detection for {self.audio_path}: {self.chunker.summary()}")
+
+    def __next__(self) -> Dict[str, Any]:
+        chunk = next(self._chunks)
+        self.next_pos += 1
+        return {key: chunk[key] for key in ("start_time_sec", "end_time_sec", "audio_chunk")}
+
+    def close(self) -> None:
+        pass
+
+    def set_pos(self, pos: int) -> None:
+        """Seek to the `pos`-th chunk; detection is deterministic, so replay from the start if needed."""
+        if pos < self.next_pos:
+            self._open()
+        while self.next_pos < pos:
+            next(self)
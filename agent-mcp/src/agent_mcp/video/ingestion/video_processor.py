@@ -1,39 +1,97 @@
+import shutil
 import uuid
 from pathlib import Path
-from typing import TYPE_CHECKING , Optional
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
 
 
 import pixeltable as pxt
 from loguru import logger
-from pixeltable.functions import gemini
-from pixeltable.functions.huggingface import clip
-from pixeltable.functions.gemini import embeddings, vision # Need to verify
 from pixeltable.functions.video import extract_audio
 from pixeltable.iterators import AudioSplitter
-from pixeltable.iterators.video import FrameIterator
 
 
 import agent_mcp.video.ingestion.registry as registry
 from agent_mcp.config import get_settings
+from agent_mcp.metrics import track_batches, track_stage
+from agent_mcp.video.ingestion.captioning import caption_images
+from agent_mcp.video.ingestion.checkpoints import load_checkpoint, save_checkpoint
+from agent_mcp.video.ingestion.embeddings import (
+    clip_image_embedding,
+    clip_text_embedding,
+    default_query_embeddings,
+    embedding_throughput,
+    openai_text_embedding,
+)
+from agent_mcp.video.ingestion.demux import AudioChunker, demux_video
+from agent_mcp.video.ingestion.frame_sampling import FrameSampler, SceneFrameIterator, build_frame_sampler
 from agent_mcp.video.ingestion.functions import extract_text_from_chunk, resize_image
-from agent_mcp.video.ingestion.tools import re_encode_video
+from agent_mcp.video.ingestion.memory import MemoryBudget
+from agent_mcp.video.ingestion.models import IngestionCheckpoint
+from agent_mcp.video.ingestion.sharding import ShardMerger, decode_shards
+from agent_mcp.video.ingestion.snapshots import export_snapshot, remove_snapshot
+from agent_mcp.video.ingestion.tools import (
+    compute_file_hash,
+    get_video_duration,
+    re_encode_video,
+    split_video_segments,
+)
+from agent_mcp.video.ingestion.transcription import transcribe_audio
+from agent_mcp.video.ingestion.vad import SpeechAudioSplitter, build_audio_chunker
 
 
 if TYPE_CHECKING:
-    from agent_mcp.video.ingestion.models import CachedTable
+    from agent_mcp.video.ingestion.models import CachedTable, CachedTableMetadata
 
 
 logger = logger.bind(name =" Video Processor")
 
 settings = get_settings()
 
+class IngestionModels:
+    """
+    The model functions a VideoProcessor builds its computed columns and indexes from.
+
+    Defaults to the hosted and CLIP models from the settings. The benchmark suite
+    passes deterministic local stand-ins instead.
+    """
+
+    def __init__(
+        self,
+        transcription: Optional[pxt.Function] = None,
+        captioning: Optional[pxt.Function] = None,
+        image_embedding: Optional[pxt.Function] = None,
+        caption_embedding: Optional[pxt.Function] = None,
+        transcript_embedding: Optional[pxt.Function] = None,
+    ):
+        self.transcription = transcription or transcribe_audio.using(model=settings.AUDIO_TRANSCRIPT_MODEL)
+        self.captioning = captioning or caption_images.using(
+            prompt=settings.CAPTION_MODEL_PROMPT,
+            model=settings.IMAGE_CAPTION_MODEL,
+        )
+        self.image_embedding = image_embedding or clip_image_embedding.using(
+            model_id=settings.IMAGE_SIMILARITY_EMB_MODEL
+        )
+        self.caption_embedding = caption_embedding or clip_text_embedding.using(
+            model_id=settings.CAPTION_SIMILARITY_EMBD_MODEL
+        )
+        self.transcript_embedding = transcript_embedding or openai_text_embedding.using(
+            model=settings.TRANSCRIPT_SIMILARITAY_EMB_MODEL
+        )
+        # How searches embed their queries; only known for the default embeddings.
+        customized = {"speech": transcript_embedding, "caption": caption_embedding, "image": image_embedding}
+        self.query_embeddings: Dict[str, Dict[str, str]] = {
+            modality: embedding
+            for modality, embedding in default_query_embeddings().items()
+            if customized[modality] is None
+        }
+
+
 class VideoProcessor:
-    def __init__(self):
-        self._pxt_cache : Optional[str] = None
-        self._video_table = None
-        self._frames_view =  None
-        self._audio_chunks = None
-        self._video_mapping_idx = Optional[str] = None
+    def __init__(self, models: Optional[IngestionModels] = None):
+        self.models = models or IngestionModels()
+        # Called with (stage, percent) as ingestion advances; kept across reset().
+        self.progress_callback: Optional[Callable[[str, float], None]] = None
+        self.reset()
 
         logger.info(
             "VideoProcessor initialized",
@@ -41,10 +99,64 @@ class VideoProcessor:
             f"\n Audio Chunk: {settings.AUDIO_CHUNK_LENGTH} seconds",
         )
 
-    def setup_table(self, video_name: str):
+    def reset(self):
+        """Clear all per-video state so the processor can be reused for another video."""
+        self.pxt_cache: Optional[str] = None
+        self.video_table = None
+        self.frames_view = None
+        self.audio_chunks = None
+        self.video_table_name: Optional[str] = None
+        self.frames_view_name: Optional[str] = None
+        self.audio_view_name: Optional[str] = None
+        self._video_mapping_idx: Optional[str] = None
+        self.streaming = settings.INGESTION_STREAMING_MODE
+        self.single_pass = settings.INGESTION_SINGLE_PASS
+        self.vad = settings.AUDIO_VAD_ENABLED
+        self.checkpoint: Optional[IngestionCheckpoint] = None
+
+    def ingest(self, video_path: str, content_hash: Optional[str] = None) -> bool:
+        """
+        Create the video index for a video and insert it, unless it is already indexed.
+
+        Files with the same content as an indexed video are registered as an alias of
+        the existing index instead of being processed again. Partially ingested
+        indexes are resumed from their last checkpoint.
+        """
+        if self._check_if_exists(video_path):
+            logger.info(f"Video index for '{video_path}' already exists and is ready for use.")
+            return False
+
+        metadata = registry.get_index_metadata(video_path)
+        if metadata is None:
+            content_hash = content_hash or compute_file_hash(video_path)
+            existing_index = registry.find_index_by_content_hash(content_hash)
+            if existing_index and existing_index.status == "ready":
+                logger.info(
+                    f"Video '{video_path}' has the same content as '{existing_index.video_name}', "
+                    f"reusing index '{existing_index.video_cache}'"
+                )
+                registry.add_alias_to_registry(video_path, existing_index)
+                return False
+            metadata = existing_index
+
+        self.reset()
+        self._report_progress("setup", 0.0)
+        if metadata is None:
+            self.setup_table(video_name=video_path, content_hash=content_hash)
+            self._report_progress("setup", 100.0)
+            return self.add_video(video_path=video_path)
+
+        self._resume_table(metadata)
+        self._report_progress("setup", 100.0)
+        added = self.add_video(video_path=video_path)
+        if metadata.video_name != video_path:
+            registry.add_alias_to_registry(video_path, registry.get_index_metadata(metadata.video_name))
+        return added
+
+    def setup_table(self, video_name: str, content_hash: Optional[str] = None):
         self._video_mapping_idx = video_name
-        exists = self._check_if_exists(video_name)
-        if exists:
+        metadata = registry.get_index_metadata(video_name)
+        if metadata and metadata.status == "ready":
             logger.info(f"Video index '{self._video_mapping_idx}' already exists and is ready for use.")
             cached_table: "CachedTable" = registry.get_table(self._video_mapping_idx)
             self.pxt_cache = cached_table.video_cache
@@ -52,6 +164,9 @@ class VideoProcessor:
             self.frames_view = cached_table.frames_view
             self.audio_chunks = cached_table.audio_chunks_view
 
+        elif metadata:
+            self._resume_table(metadata)
+
         else:
             self.pxt_cache = f"cache_{uuid.uuid4().hex[-4:]}"
             self.video_table_name = f"{self.pxt_cache}.table"
@@ -59,23 +174,83 @@ class VideoProcessor:
             self.audio_view_name = f"{self.video_table_name}_audio_chunks"
             self.video_table = None
 
-            self._setup_table()
-
+            # Register first, so an interrupted setup is retried under the same cache name.
             registry.add_index_to_registry(
                 video_name=self._video_mapping_idx,
                 video_cache=self.pxt_cache,
                 frames_view_name=self.frames_view_name,
                 audio_view_name=self.audio_view_name,
+                content_hash=content_hash,
+                frame_sampling=settings.FRAME_SAMPLING_MODE,
+                status="ingesting",
+                query_embeddings=self.models.query_embeddings,
+            )
+            self.checkpoint = IngestionCheckpoint(
+                video_name=self._video_mapping_idx,
+                video_cache=self.pxt_cache,
+                single_pass=self.single_pass,
+                streaming=self.streaming,
+                voice_activity_detection=self.vad,
             )
             logger.info(f"Creating new video index '{self.video_table_name}' in '{self.pxt_cache}'")
+            self._setup_table()
+            self._save_checkpoint(indexes_built=True)
+
+    def _resume_table(self, metadata: "CachedTableMetadata"):
+        """
+        Reopen a partially ingested video index, with the layout it was created with.
+        """
+        self._video_mapping_idx = metadata.video_name
+        self.pxt_cache = metadata.video_cache
+        self.video_table_name = metadata.video_table
+        self.frames_view_name = metadata.frames_view
+        self.audio_view_name = metadata.audio_chunks_view
+        self.checkpoint = load_checkpoint(self.pxt_cache) or IngestionCheckpoint(
+            video_name=metadata.video_name,
+            video_cache=metadata.video_cache,
+            single_pass=self.single_pass,
+            streaming=self.streaming,
+            voice_activity_detection=self.vad,
+        )
+        self.single_pass = self.checkpoint.single_pass
+        self.streaming = self.checkpoint.streaming
+        self.vad = self.checkpoint.voice_activity_detection
+        # A snapshot left from an earlier run would not match the index being rebuilt.
+        remove_snapshot(self.pxt_cache)
+
+        if not self.checkpoint.indexes_built:
+            logger.info(f"Setup of '{self.pxt_cache}' was interrupted, creating its tables again")
+            self._setup_table()
+            self._save_checkpoint(indexes_built=True)
+            return
+
+        logger.info(
+            f"Resuming video index '{self.pxt_cache}' for '{metadata.video_name}': "
+            f"{self.checkpoint.frames_captioned} frames and {self.checkpoint.chunks_transcribed} audio chunks "
+            f"already done, indexed until {self.checkpoint.indexed_until_sec:.1f}s"
+        )
+        self.video_table = pxt.get_table(self.video_table_name)
+        self.frames_view = pxt.get_table(self.frames_view_name)
+        self.audio_chunks = pxt.get_table(self.audio_view_name)
+
+    def _report_progress(self, stage: str, percent: float):
+        if self.progress_callback is not None:
+            self.progress_callback(stage, min(max(percent, 0.0), 100.0))
+
+    def _save_checkpoint(self, **progress):
+        for key, value in progress.items():
+            setattr(self.checkpoint, key, value)
+        save_checkpoint(self.checkpoint)
 
     def _check_if_exists(self, video_path: str) -> bool:
         """
-        Checks if the PixelTable table and related views/index for the video index exist.
+        Checks if the PixelTable table and related views/index for the video index exist
+        and were fully ingested.
         """
-        existing_tables = registry.get_registry()
-        return video_path in existing_tables
+        metadata = registry.get_index_metadata(video_path)
+        return metadata is not None and metadata.status == "ready"
 
+    @track_stage("setup")
     def _setup_table(self):
         self._setup_cache_directory()
         self._create_video_table()
@@ -90,13 +265,21 @@ class VideoProcessor:
     def _create_video_table(self):
         self.video_table = pxt.create_table(
             self.video_table_name,
-            schema={"video": pxt.Video},
+            schema={
+                "video": pxt.Video,
+                "segment_start_sec": pxt.Float,
+                "segment_end_sec": pxt.Float,
+                "video_duration_sec": pxt.Float,
+            },
             if_exists="replace_force",
         )
 
     def _setup_audio_processing(self):
-        self._add_audio_extraction()
-        self._create_audio_chunks_view()
+        if self.single_pass:
+            self._create_audio_chunks_table()
+        else:
+            self._add_audio_extraction()
+            self._create_audio_chunks_view()
         self._add_audio_transcription()
         self._add_audio_text_extraction()
         self._add_audio_embedding_index()
@@ -111,21 +294,42 @@ class VideoProcessor:
         self.audio_chunks = pxt.create_view(
             self.audio_view_name,
             self.video_table,
-            iterator=AudioSplitter.create(
+            iterator=self._audio_splitter(),
+            if_exists="replace_force",
+        )
+
+    def _audio_splitter(self):
+        if self.vad:
+            return SpeechAudioSplitter.create(
                 audio=self.video_table.audio_extract,
+                output_dir=str(Path(self.pxt_cache).resolve() / "audio_chunks"),
                 chunk_duration_sec=settings.AUDIO_CHUNK_LENGTH,
                 overlap_sec=settings.AUDIO_OVERLAP_SECONDS,
-                min_chunk_duration_sec=settings.AUDIO_MIN_CHUNK_DURATION_SECONDS,
-            ),
+            )
+        return AudioSplitter.create(
+            audio=self.video_table.audio_extract,
+            chunk_duration_sec=settings.AUDIO_CHUNK_LENGTH,
+            overlap_sec=settings.AUDIO_OVERLAP_SECONDS,
+            min_chunk_duration_sec=settings.AUDIO_MIN_CHUNK_DURATION_SECONDS,
+        )
+
+    def _create_audio_chunks_table(self):
+        """Audio chunks table filled by the single-pass demuxer, with the columns AudioSplitter would produce."""
+        self.audio_chunks = pxt.create_table(
+            self.audio_view_name,
+            schema={
+                "pos": pxt.Int,
+                "audio_chunk": pxt.Audio,
+                "start_time_sec": pxt.Float,
+                "end_time_sec": pxt.Float,
+                "segment_start_sec": pxt.Float,
+            },
             if_exists="replace_force",
         )
 
     def _add_audio_transcription(self):
         self.audio_chunks.add_computed_column(
-            transcription=openai.transcriptions(
-                audio=self.audio_chunks.audio_chunk,
-                model=settings.AUDIO_TRANSCRIPT_MODEL,
-            ),
+            transcription=self.models.transcription(audio=self.audio_chunks.audio_chunk),
             if_exists="ignore",
         )
 
@@ -138,13 +342,17 @@ class VideoProcessor:
     def _add_audio_embedding_index(self):
         self.audio_chunks.add_embedding_index(
             column=self.audio_chunks.chunk_text,
-            string_embed=embeddings.using(model=settings.TRANSCRIPT_SIMILARITY_EMBD_MODEL),
+            string_embed=self.models.transcript_embedding,
             if_exists="ignore",
             idx_name="chunks_index",
         )
 
     def _setup_frame_processing(self):
-        self._create_frames_view()
+        if self.single_pass:
+            self._create_frames_table()
+        else:
+            self._create_frames_view()
+            self._add_frame_resizing()
         self._add_frame_embedding_index()
         self._add_frame_captioning()
         self._add_caption_embedding_index()
@@ -153,9 +361,36 @@ class VideoProcessor:
         self.frames_view = pxt.create_view(
             self.frames_view_name,
             self.video_table,
-            iterator=FrameIterator.create(video=self.video_table.video, num_frames=settings.SPLIT_FRAMES_COUNT),
+            iterator=self._frame_iterator(),
             if_exists="ignore",
         )
+
+    def _create_frames_table(self):
+        """
+        Frames table filled by the single-pass demuxer, with the columns SceneFrameIterator
+        would produce. The demuxer decodes frames at their resized dimensions, so only the
+        reduced frame is stored.
+        """
+        self.frames_view = pxt.create_table(
+            self.frames_view_name,
+            schema={
+                "frame_idx": pxt.Int,
+                "pos_msec": pxt.Float,
+                "pos_frame": pxt.Int,
+                "resized_frame": pxt.Image,
+                "scene_idx": pxt.Int,
+                "scene_start_msec": pxt.Float,
+                "scene_end_msec": pxt.Float,
+                "duplicate_count": pxt.Int,
+                "run_end_msec": pxt.Float,
+                "segment_start_sec": pxt.Float,
+            },
+            if_exists="replace_force",
+        )
+
+    def _add_frame_resizing(self):
+        # The iterator's frames are unstored and already decoded at this size, so this
+        # column is the one persisted copy of each frame.
         self.frames_view.add_computed_column(
             resized_frame=resize_image(
                 self.frames_view.frame,
@@ -164,29 +399,44 @@ class VideoProcessor:
             )
         )
 
+    def _frame_iterator(self):
+        return SceneFrameIterator.create(
+            video=self.video_table.video,
+            scene_threshold=settings.SCENE_CHANGE_THRESHOLD,
+            min_fps=settings.FRAME_SAMPLING_MIN_FPS,
+            max_fps=settings.FRAME_SAMPLING_MAX_FPS,
+            frames_per_minute=settings.FRAME_SAMPLING_BUDGET_PER_MINUTE,
+            probe_fps=settings.SCENE_DETECTION_PROBE_FPS,
+            dedup_threshold=settings.FRAME_DEDUP_HAMMING_THRESHOLD,
+            num_frames=self._frames_per_row() if settings.FRAME_SAMPLING_MODE != "scene" else 0,
+            frame_width=settings.IMAGE_RESIZE_WIDTH,
+            frame_height=settings.IMAGE_RESIZE_HEIGHT,
+        )
+
+    def _frames_per_row(self) -> int:
+        """Frames sampled from each row of the video table (a whole video, or one segment when streaming)."""
+        return settings.STREAMING_FRAMES_PER_SEGMENT if self.streaming else settings.SPLIT_FRAMES_COUNT
+
     def _add_frame_embedding_index(self):
         self.frames_view.add_embedding_index(
             column=self.frames_view.resized_frame,
-            image_embed=clip.using(model_id=settings.IMAGE_SIMILARITY_EMBD_MODEL),
+            image_embed=self.models.image_embedding,
             if_exists="replace_force",
         )
 
     def _add_frame_captioning(self):
         self.frames_view.add_computed_column(
-            im_caption=vision(
-                prompt=settings.CAPTION_MODEL_PROMPT,
-                image=self.frames_view.resized_frame,
-                model=settings.IMAGE_CAPTION_MODEL,
-            )
+            im_caption=self.models.captioning(self.frames_view.resized_frame)
         )
 
     def _add_caption_embedding_index(self):
         self.frames_view.add_embedding_index(
             column=self.frames_view.im_caption,
-            string_embed=clip.using(model_id=settings.CAPTION_SIMILARITY_EMBD_MODEL),
+            string_embed=self.models.caption_embedding,
             if_exists="replace_force",
         )
 
+    @track_stage("add_video")
     def add_video(self, video_path: str) -> bool:
         """
         Add a video to the pixel table.
@@ -195,8 +445,279 @@ class VideoProcessor:
             raise ValueError("Video table is not initialized. Call setup_table() first.")
         logger.info(f"Adding video {video_path} to table {self.video_table_name}")
 
-        new_video_path = re_encode_video(video_path=video_path)
-        if new_video_path:
-            self.video_table.insert([{"video": video_path}])
+        self._report_progress("convert", 0.0)
+        with track_stage("convert"):
+            new_video_path = re_encode_video(video_path=video_path)
+        if not new_video_path:
+            return False
+        self._report_progress("convert", 100.0)
+
+        duration = get_video_duration(new_video_path)
+        self._report_progress("index", 100.0 * self.checkpoint.indexed_until_sec / max(duration, 1e-6))
+        if self.single_pass and self._use_shards(duration):
+            self._add_video_sharded(new_video_path, duration)
+        elif self.single_pass:
+            self._add_video_single_pass(new_video_path, duration)
+        elif self.streaming:
+            self._add_video_segments(new_video_path, duration)
+        elif self.video_table.count() == 0:
+            with track_stage("insert_video"):
+                self.video_table.insert(
+                    [
+                        {
+                            "video": new_video_path,
+                            "segment_start_sec": 0.0,
+                            "segment_end_sec": duration,
+                            "video_duration_sec": duration,
+                        }
+                    ]
+                )
+        self._save_checkpoint(
+            audio_extracted=True,
+            frames_captioned=self.frames_view.count(),
+            chunks_transcribed=self.audio_chunks.count(),
+            segments_committed=self.video_table.count(),
+            indexed_until_sec=duration,
+            audio_seconds_skipped=self._audio_seconds_skipped(duration),
+            completed=True,
+        )
+        self._export_snapshot(duration)
+        registry.set_index_status(self._video_mapping_idx, "ready")
+        self._report_progress("index", 100.0)
+
+        self._log_frame_dedup_stats()
+        for model_id, rate in embedding_throughput().items():
+            logger.info(f"CLIP '{model_id}' throughput so far: {rate:.2f} embeddings/s/core")
         return True
 
+    def _export_snapshot(self, duration: float):
+        """
+        Export the finished index for in-process NumPy search. Searches fall back to
+        pixeltable queries without a snapshot, so a failed export does not fail ingestion.
+        """
+        if not settings.SEARCH_SNAPSHOTS_ENABLED:
+            return
+        if set(self.models.query_embeddings) != {"speech", "caption", "image"}:
+            logger.info("Not exporting a search snapshot: queries cannot be embedded for custom embedding functions")
+            return
+        try:
+            with track_stage("export_snapshot"):
+                export_snapshot(
+                    registry.get_table(self._video_mapping_idx),
+                    self.models.query_embeddings,
+                    indexed_until_sec=duration,
+                    duration_sec=duration,
+                )
+        except Exception as e:
+            logger.warning(f"Could not export a search snapshot of '{self.pxt_cache}': {e}")
+
+    def _audio_seconds_skipped(self, duration: float) -> float:
+        """Seconds of the soundtrack not covered by any audio chunk, i.e. never transcribed."""
+        chunks = self.audio_chunks
+        rows = chunks.select(chunks.start_time_sec, chunks.end_time_sec, chunks.segment_start_sec).collect()
+        intervals = sorted(
+            (row["segment_start_sec"] + row["start_time_sec"], row["segment_start_sec"] + row["end_time_sec"])
+            for row in rows
+        )
+
+        transcribed, covered_until = 0.0, 0.0
+        for start, end in intervals:
+            transcribed += max(end - max(start, covered_until), 0.0)
+            covered_until = max(covered_until, end)
+        skipped = max(duration - transcribed, 0.0)
+        logger.info(
+            f"Audio for '{self._video_mapping_idx}': {len(intervals)} chunks cover {transcribed:.1f}s of "
+            f"{duration:.1f}s, {skipped:.1f}s skipped without transcription"
+        )
+        return skipped
+
+    def _log_frame_dedup_stats(self):
+        if settings.FRAME_SAMPLING_MODE != "scene":
+            return
+        duplicate_counts = [
+            row["duplicate_count"] for row in self.frames_view.select(self.frames_view.duplicate_count).collect()
+        ]
+        suppressed = sum(duplicate_counts)
+        total = suppressed + len(duplicate_counts)
+        ratio = suppressed / total if total else 0.0
+        logger.info(
+            f"Frame dedup for '{self._video_mapping_idx}': {len(duplicate_counts)} frames captioned and embedded, "
+            f"{suppressed} near-duplicates reused them (dedup ratio {ratio:.1%})"
+        )
+
+    def _build_frame_sampler(self, duration: float) -> FrameSampler:
+        return build_frame_sampler(duration, settings.SPLIT_FRAMES_COUNT)
+
+    def _build_audio_chunker(self) -> AudioChunker:
+        return build_audio_chunker(str(Path(self.pxt_cache).resolve() / "audio_chunks"), self.vad)
+
+    def _add_video_single_pass(self, video_path: str, duration: float):
+        """
+        Decode the video once, feeding the frame sampler and the audio chunker from the
+        same pass, and insert their output in time-ordered batches. Frames are spilled to
+        the cache directory as they are sampled, so batches hold paths rather than images.
+        """
+        frames_done, chunks_done = self._start_single_pass(video_path, duration)
+        chunker = self._build_audio_chunker()
+        window_seconds = settings.STREAMING_SEGMENT_SECONDS if self.streaming else None
+
+        memory_budget = (
+            MemoryBudget(settings.INGESTION_MEMORY_BUDGET_MB * 2**20) if settings.INGESTION_MEMORY_BUDGET_MB else None
+        )
+
+        frame_idx = 0
+        batches = demux_video(
+            video_path,
+            self._build_frame_sampler(duration),
+            chunker,
+            window_seconds,
+            frame_dir=str(Path(self.pxt_cache).resolve() / "frames"),
+            memory_budget=memory_budget,
+        )
+        for batch in track_batches("demux", batches):
+            for record in batch.frames:
+                record["frame_idx"] = frame_idx
+                frame_idx += 1
+            frames_done, chunks_done = self._commit_rows(batch.frames, batch.audio_chunks, frames_done, chunks_done)
+            self._advance_watermark(video_path, duration, batch.watermark_sec, frames_done, chunks_done)
+
+    def _add_video_sharded(self, video_path: str, duration: float):
+        """
+        Split the video into time shards at keyframes, decode them in parallel processes
+        and commit their rows in time order, as if the video were decoded in one pass.
+
+        Captioning, transcription and embedding run here as the rows are inserted: their
+        requests are already concurrent and CLIP already uses every core, while one CLIP
+        model per worker process would multiply its memory.
+        """
+        frames_done, chunks_done = self._start_single_pass(video_path, duration)
+        shards_dir = str(Path(self.pxt_cache).resolve() / "shards" / Path(video_path).stem)
+        # The stream-copied shards are only read by the workers; the frames and audio
+        # chunks they spill next to them stay, as the committed rows point at them.
+        split_dir = Path(shards_dir) / "split"
+        shards = split_video_segments(video_path, self.checkpoint.shard_seconds, str(split_dir))
+        logger.info(
+            f"Decoding {len(shards)} shards of '{video_path}' with up to "
+            f"{settings.INGESTION_SHARD_WORKERS} worker processes"
+        )
+
+        merger = ShardMerger()
+        results = decode_shards(shards, shards_dir, duration, self.vad, settings.INGESTION_SHARD_WORKERS)
+        for result in track_batches("decode_shard", results):
+            merger.merge(result)
+            frames_done, chunks_done = self._commit_rows(result.frames, result.audio_chunks, frames_done, chunks_done)
+            self._advance_watermark(video_path, duration, result.end_sec, frames_done, chunks_done)
+        shutil.rmtree(split_dir, ignore_errors=True)
+
+    def _use_shards(self, duration: float) -> bool:
+        """
+        Whether to ingest the video in parallel shards. Decided once per index, since
+        resuming must replay the same frame and chunk sequence.
+        """
+        if self.video_table.count() == 0:
+            shard_seconds = settings.INGESTION_SHARD_SECONDS
+            sharded = settings.INGESTION_SHARD_WORKERS > 1 and duration > shard_seconds
+            self._save_checkpoint(shard_seconds=shard_seconds if sharded else 0.0)
+        return self.checkpoint.shard_seconds > 0
+
+    def _start_single_pass(self, video_path: str, duration: float) -> Tuple[int, int]:
+        """
+        Register the video row and return how many frames and audio chunks are already committed.
+        """
+        if self.video_table.count() == 0:
+            self.video_table.insert(
+                [
+                    {
+                        "video": video_path,
+                        "segment_start_sec": 0.0,
+                        "segment_end_sec": 0.0,
+                        "video_duration_sec": duration,
+                    }
+                ]
+            )
+
+        # The tables, not the checkpoint, are the source of truth: an insert may have
+        # committed just before a crash that kept its checkpoint from being written.
+        # Sampling and chunking are deterministic, so rows are replayed with the same
+        # frame_idx and pos, and everything already committed is skipped.
+        frames_done = self.frames_view.count()
+        chunks_done = self.audio_chunks.count()
+        if frames_done or chunks_done:
+            logger.info(
+                f"Skipping {frames_done} frames and {chunks_done} audio chunks of '{video_path}' "
+                "that were ingested before the restart"
+            )
+        return frames_done, chunks_done
+
+    def _commit_rows(
+        self, frames: List[Dict[str, Any]], chunks: List[Dict[str, Any]], frames_done: int, chunks_done: int
+    ) -> Tuple[int, int]:
+        """Insert the demuxed rows that are not committed yet and return the updated counts."""
+        for record in frames:
+            # Frames come out of the decoder already reduced and spilled to disk, so their
+            # files are stored as the resized frame and no images are held in memory.
+            record.update(segment_start_sec=0.0, resized_frame=record.pop("frame"))
+        new_frames = [record for record in frames if record["frame_idx"] >= frames_done]
+        new_chunks = [chunk for chunk in chunks if chunk["pos"] >= chunks_done]
+        if new_frames:
+            with track_stage("insert_frames"):
+                self.frames_view.insert(new_frames)
+        if new_chunks:
+            with track_stage("insert_audio_chunks"):
+                self.audio_chunks.insert([{**chunk, "segment_start_sec": 0.0} for chunk in new_chunks])
+
+        if frames:
+            frames_done = max(frames_done, frames[-1]["frame_idx"] + 1)
+        if chunks:
+            chunks_done = max(chunks_done, chunks[-1]["pos"] + 1)
+        return frames_done, chunks_done
+
+    def _advance_watermark(
+        self, video_path: str, duration: float, watermark_sec: float, frames_done: int, chunks_done: int
+    ):
+        if watermark_sec <= self.checkpoint.indexed_until_sec:
+            return
+        self.video_table.update({"segment_end_sec": watermark_sec})
+        self._save_checkpoint(
+            frames_captioned=frames_done,
+            chunks_transcribed=chunks_done,
+            indexed_until_sec=watermark_sec,
+        )
+        logger.info(f"Indexed '{video_path}' up to {watermark_sec:.1f}s of {duration:.1f}s")
+        self._report_progress("index", 100.0 * watermark_sec / max(duration, 1e-6))
+
+    def _add_video_segments(self, video_path: str, duration: float):
+        """
+        Insert a video one time-ordered segment at a time.
+
+        Every insert commits the segment's frames, audio chunks, captions, transcripts
+        and embeddings, so the part of the video ingested so far is searchable while
+        the remaining segments are still being processed.
+        """
+        # Segments are the rows of the video table, so they are kept for as long as the index.
+        segments_dir = str(Path(self.pxt_cache).resolve() / "segments" / Path(video_path).stem)
+        segments = split_video_segments(video_path, settings.STREAMING_SEGMENT_SECONDS, segments_dir)
+        segments_done = self.video_table.count()
+        logger.info(
+            f"Streaming {len(segments) - segments_done} of {len(segments)} segments of '{video_path}' "
+            f"into {self.video_table_name}"
+        )
+
+        for segments_committed, segment in enumerate(segments[segments_done:], start=segments_done + 1):
+            with track_stage("insert_segment"):
+                self.video_table.insert(
+                    [
+                        {
+                            "video": segment.path,
+                            "segment_start_sec": segment.start_sec,
+                            "segment_end_sec": segment.end_sec,
+                            "video_duration_sec": duration,
+                        }
+                    ]
+                )
+            self._save_checkpoint(
+                segments_committed=segments_committed,
+                indexed_until_sec=segment.end_sec,
+            )
+            logger.info(f"Indexed '{video_path}' up to {segment.end_sec:.1f}s of {duration:.1f}s")
+            self._report_progress("index", 100.0 * segment.end_sec / max(duration, 1e-6))
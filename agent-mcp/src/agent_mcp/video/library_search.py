@@ -0,0 +1,160 @@
+import heapq
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+import agent_mcp.video.ingestion.registry as registry
+from agent_mcp.config import get_settings
+from agent_mcp.metrics import track_search
+from agent_mcp.video.ingestion.snapshots import IndexSnapshot
+from agent_mcp.video.video_search_engine import (
+    get_search_engine,
+    get_search_executor,
+    reciprocal_rank_fusion,
+    snapshot_hits,
+)
+
+logger = logger.bind(name="LibrarySearch")
+
+settings = get_settings()
+
+LIBRARY_MODALITIES = ("speech", "caption")
+
+
+class LibraryVideo:
+    """A finished video index in the library, under the first name it was registered with."""
+
+    def __init__(self, video_name: str, video_cache: str, snapshot: Optional[IndexSnapshot]):
+        self.video_name = video_name
+        self.video_cache = video_cache
+        self.snapshot = snapshot
+        self.aliases: List[str] = []
+
+    def hits(self, modality: str, query: str, top_k: int) -> List[Dict[str, Any]]:
+        if self.snapshot is not None:
+            hits = snapshot_hits(self.snapshot, modality, query, top_k)
+        else:
+            hits = get_search_engine(self.video_name).modality_hits(modality, query, top_k)
+        return [
+            {
+                "video": self.video_name,
+                "start_time": hit["start_time"],
+                "end_time": hit["end_time"],
+                "similarity": hit["similarity"],
+            }
+            for hit in hits
+        ]
+
+
+class LibraryIndex:
+    """Every finished video index, split into shards that are searched in parallel.
+
+    A query is fanned out to all shards; each returns its best hits per modality,
+    which are merged into a global top k per modality and then fused across
+    modalities. Videos with an exported snapshot are searched with NumPy, the rest
+    through their pixeltable indexes. The shards are built from the registry on
+    first use and rebuilt after any registry change.
+    """
+
+    def __init__(self, shard_size: int):
+        self.shard_size = shard_size
+        self._shards: Optional[List[List[LibraryVideo]]] = None
+        self._lock = threading.Lock()
+        # Bumped on every invalidation, so shards built concurrently with one are not kept.
+        self._generation = 0
+
+    def invalidate(self, video_name: str, video_cache: str):
+        with self._lock:
+            self._generation += 1
+            self._shards = None
+
+    def shards(self) -> List[List[LibraryVideo]]:
+        with self._lock:
+            if self._shards is not None:
+                return self._shards
+            generation = self._generation
+
+        # Built without holding the lock: registry writes notify invalidate() under the registry lock.
+        shards = self._build_shards()
+        with self._lock:
+            if generation == self._generation:
+                self._shards = shards
+        return shards
+
+    def info(self) -> Dict[str, Any]:
+        shards = self.shards()
+        videos = [video for shard in shards for video in shard]
+        return {
+            "videos": len(videos),
+            "shards": len(shards),
+            "videos_with_snapshot": sum(1 for video in videos if video.snapshot is not None),
+        }
+
+    @track_search("library")
+    def search(self, query: str, top_k: int) -> List[Dict[str, Any]]:
+        """
+        Search every finished video for clips matching a text query.
+
+        Returns up to `top_k` windows, best first, each with its video, start and end
+        times, fused score and the similarity found by each modality.
+        """
+        candidates = settings.LIBRARY_SEARCH_CANDIDATES
+        executor = get_search_executor()
+        searches = [executor.submit(self._search_shard, shard, query, candidates) for shard in self.shards()]
+
+        rankings: Dict[str, List[Dict[str, Any]]] = {modality: [] for modality in LIBRARY_MODALITIES}
+        for search in searches:
+            for modality, hits in search.result().items():
+                rankings[modality] += hits
+        # Every video of a modality is embedded with the same model, so similarities compare across videos.
+        rankings = {
+            modality: heapq.nlargest(candidates, hits, key=lambda hit: hit["similarity"])
+            for modality, hits in rankings.items()
+        }
+        return reciprocal_rank_fusion(rankings, top_k, settings.SEARCH_FUSION_RRF_K)
+
+    @staticmethod
+    def _search_shard(shard: List[LibraryVideo], query: str, top_k: int) -> Dict[str, List[Dict[str, Any]]]:
+        hits: Dict[str, List[Dict[str, Any]]] = {modality: [] for modality in LIBRARY_MODALITIES}
+        for video in shard:
+            for modality in LIBRARY_MODALITIES:
+                try:
+                    hits[modality] += video.hits(modality, query, top_k)
+                except Exception as e:
+                    logger.warning(f"Skipping {modality} search of '{video.video_name}': {e}")
+        return {
+            modality: heapq.nlargest(top_k, modality_hits, key=lambda hit: hit["similarity"])
+            for modality, modality_hits in hits.items()
+        }
+
+    def _build_shards(self) -> List[List[LibraryVideo]]:
+        videos: Dict[str, LibraryVideo] = {}
+        for video_name in list(registry.get_registry()):
+            metadata = registry.get_index_metadata(video_name)
+            if metadata is None or metadata.status != "ready":
+                continue
+            if metadata.video_cache in videos:
+                videos[metadata.video_cache].aliases.append(video_name)
+                continue
+            snapshot = IndexSnapshot.load(metadata.video_cache) if settings.SEARCH_SNAPSHOTS_ENABLED else None
+            videos[metadata.video_cache] = LibraryVideo(video_name, metadata.video_cache, snapshot)
+
+        ordered = list(videos.values())
+        shards = [ordered[start : start + self.shard_size] for start in range(0, len(ordered), self.shard_size)]
+        logger.info(
+            f"Library index built: {len(ordered)} videos in {len(shards)} shards, "
+            f"{sum(1 for video in ordered if video.snapshot is not None)} with snapshots"
+        )
+        return shards
+
+
+@lru_cache(maxsize=1)
+def get_library_index() -> LibraryIndex:
+    """
+    Get the process-wide library index, invalidated by registry changes
+    """
+    index = LibraryIndex(max(1, settings.LIBRARY_SEARCH_SHARD_SIZE))
+    registry.on_index_changed(index.invalidate)
+    return index
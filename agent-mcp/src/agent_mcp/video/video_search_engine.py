@@ -1,83 +1,348 @@
-from typing import Any, Dict, List
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+import PIL.Image
+from loguru import logger
 
 import agent_mcp.video.ingestion.registry as registry
 from agent_mcp.config import get_settings
+from agent_mcp.metrics import SEARCH_ENGINE_CACHE_LOOKUPS, track_search
+from agent_mcp.video.ingestion.embeddings import (
+    default_query_embeddings,
+    embed_query_image,
+    embed_query_text,
+    embed_query_texts,
+)
 from agent_mcp.video.ingestion.models import CachedTable
+from agent_mcp.video.ingestion.snapshots import IndexSnapshot
 from agent_mcp.video.ingestion.tools import decode_image
 
+logger = logger.bind(name="VideoSearchEngine")
+
 settings = get_settings()
 
 
+@lru_cache(maxsize=1)
+def get_search_executor() -> ThreadPoolExecutor:
+    """
+    Get the process-wide pool running the per-modality queries of fused searches and library shards
+    """
+    return ThreadPoolExecutor(max_workers=settings.SEARCH_MAX_WORKERS, thread_name_prefix="search")
+
+
+def reciprocal_rank_fusion(
+    rankings: Dict[str, List[Dict[str, Any]]], top_k: int, rrf_k: int
+) -> List[Dict[str, Any]]:
+    """
+    Merge per-modality rankings of clip windows into one ranked list of windows.
+
+    A hit at rank r adds 1 / (rrf_k + r) to the score of its window. Hits overlapping
+    a window already taken by a better ranked hit add to that window instead, so a
+    moment found by several modalities outranks one found by a single modality.
+    Only ranks are compared, never similarities from different embedding spaces.
+    Hits carrying a "video" only merge with windows of the same video.
+    """
+    windows: List[Dict[str, Any]] = []
+    depth = max((len(hits) for hits in rankings.values()), default=0)
+    for rank in range(depth):
+        for modality, hits in rankings.items():
+            if rank >= len(hits):
+                continue
+            hit = hits[rank]
+            window = next(
+                (
+                    window
+                    for window in windows
+                    if hit.get("video") == window.get("video")
+                    and hit["start_time"] < window["end_time"]
+                    and window["start_time"] < hit["end_time"]
+                ),
+                None,
+            )
+            if window is None:
+                window = {"start_time": hit["start_time"], "end_time": hit["end_time"], "score": 0.0, "similarities": {}}
+                if "video" in hit:
+                    window = {"video": hit["video"], **window}
+                windows.append(window)
+            if modality not in window["similarities"]:
+                window["score"] += 1.0 / (rrf_k + rank + 1)
+                window["similarities"][modality] = hit["similarity"]
+
+    windows.sort(key=lambda window: window["score"], reverse=True)
+    return windows[:top_k]
+
+
+def frame_window(entry: Dict[str, Any], scene_aware: bool) -> Dict[str, float]:
+    """Clip window around a frame, in seconds from the start of the video.
+
+    For scene sampled indexes the window is clipped to the frame's scene, so clips
+    start and end on real cuts instead of a fixed distance from the frame, and is
+    stretched to cover the near-duplicate frames the hit stands in for.
+    """
+    offset = entry["segment_start_sec"]
+    frame_time = offset + entry["pos_msec"] / 1000.0
+    start_time = max(frame_time - settings.DELTA_SECONDS_FRAME_INTERVAL, 0.0)
+    end_time = frame_time + settings.DELTA_SECONDS_FRAME_INTERVAL
+    if scene_aware:
+        start_time = max(start_time, offset + entry["scene_start_msec"] / 1000.0)
+        end_time = min(end_time, offset + entry["scene_end_msec"] / 1000.0)
+        end_time = max(end_time, offset + entry["run_end_msec"] / 1000.0)
+        if end_time <= start_time:
+            end_time = frame_time + settings.DELTA_SECONDS_FRAME_INTERVAL
+    return {"start_time": start_time, "end_time": end_time}
+
+
+def snapshot_hits(
+    snapshot: IndexSnapshot, modality: str, query: Union[str, PIL.Image.Image], top_k: int
+) -> List[Dict[str, Any]]:
+    """
+    Rows of a snapshot most similar to a text query (speech, caption) or an image
+    query (image), best first, with their clip windows.
+    """
+    model = snapshot.model(modality)
+    if modality == "image":
+        embedding = embed_query_image(model["model"], query)
+    else:
+        embedding = embed_query_text(model["backend"], model["model"], query)
+    return _with_windows(snapshot, modality, snapshot.search(modality, embedding, top_k))
+
+
+def _with_windows(snapshot: IndexSnapshot, modality: str, hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    if modality == "speech":
+        return hits
+    return [{**hit, **frame_window(hit, snapshot.scene_aware)} for hit in hits]
+
+
 class VideoSearchEngine:
     """A class that provides video search capabilities using different modalities."""
 
     def __init__(self, video_name: str):
         """Initialize the video search engine.
+
+        Finished indexes with an exported snapshot are searched in-process with NumPy;
+        the rest go through pixeltable queries.
         """
-        self.video_index: CachedTable = registry.get_table(video_name)
-        if not self.video_index:
+        metadata = registry.get_index_metadata(video_name)
+        if metadata is None:
             raise ValueError(f"Video index {video_name} not found in registry.")
+        self.video_index: CachedTable = CachedTable.from_metadata(metadata)
         self.video_name = video_name
+        # Indexes registered before their query embeddings were recorded used the defaults.
+        self.query_embeddings: Dict[str, Dict[str, str]] = (
+            default_query_embeddings() if metadata.query_embeddings is None else metadata.query_embeddings
+        )
+        self.snapshot: Optional[IndexSnapshot] = None
+        if settings.SEARCH_SNAPSHOTS_ENABLED and metadata.status == "ready":
+            self.snapshot = IndexSnapshot.load(metadata.video_cache)
+
+    def get_coverage(self) -> Dict[str, float]:
+        """Get how much of the video has been indexed so far.
+
+        Segments are committed in time order, so the furthest committed segment end
+        is a watermark below which every frame and audio chunk is searchable.
+        """
+        if self.snapshot is not None:
+            return self.snapshot.coverage()
+        rows = self.video_index.video_table.select(
+            self.video_index.video_table.segment_end_sec,
+            self.video_index.video_table.video_duration_sec,
+        ).collect()
+
+        indexed_until = max((float(row["segment_end_sec"]) for row in rows), default=0.0)
+        duration = max((float(row["video_duration_sec"]) for row in rows), default=0.0)
+        return {
+            "indexed_until_sec": indexed_until,
+            "duration_sec": duration,
+            "coverage": indexed_until / duration if duration else 0.0,
+        }
 
     def search_by_speech(self, query: str, top_k: int) -> List[Dict[str, Any]]:
         """Search video clips by speech similarity """
-        sims = self.video_index.audio_chunks_view.chunk_text.similarity(query)
+        return self._with_coverage(self._speech_hits(query, top_k))
+
+    def search_by_image(self, image_base64: str, top_k: int) -> List[Dict[str, Any]]:
+        """Search video clips by image similarity"""
+        return self._with_coverage(self._image_hits(image_base64, top_k))
+
+    def search_by_caption(self, query: str, top_k: int) -> List[Dict[str, Any]]:
+        """Search video clips by caption similarity. """
+        return self._with_coverage(self._caption_hits(query, top_k))
+
+    @track_search("fused")
+    def search_fused(
+        self, query: str, top_k: int, image_base64: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Search video clips by speech, caption and optionally image similarity at once.
+
+        The modality indexes are queried concurrently, so this takes as long as the
+        slowest of them, and their rankings are merged with reciprocal rank fusion.
+        """
+        executor = get_search_executor()
+        searches = {
+            "speech": executor.submit(self._speech_hits, query, settings.VIDEO_CLIP_SPEECH_SEARCH_TOP_K),
+            "caption": executor.submit(self._caption_hits, query, settings.VIDEO_CLIP_CAPTION_SEARCH_TOP_K),
+        }
+        if image_base64:
+            searches["image"] = executor.submit(
+                self._image_hits, image_base64, settings.VIDEO_CLIP_IMAGE_SEARCH_TOP_K
+            )
+        coverage = executor.submit(self.get_coverage)
+
+        rankings = {modality: search.result() for modality, search in searches.items()}
+        fused = reciprocal_rank_fusion(rankings, top_k, settings.SEARCH_FUSION_RRF_K)
+        indexed_until = coverage.result()["indexed_until_sec"]
+        return [{**window, "indexed_until_sec": indexed_until} for window in fused]
+
+    @track_search("batch")
+    def search_batch(self, queries: List[str], top_k: int, modality: str = "caption") -> List[List[Dict[str, Any]]]:
+        """Search video clips for many text queries at once, by speech or caption similarity.
+
+        The queries are embedded in batches and scored against the whole index with
+        one matrix product per block of queries, instead of one pixeltable query and
+        one embedding call each. Returns the top k clips of every query, in order.
+        Indexes without a snapshot run one pixeltable query per query instead, with the
+        query embeddings computed up front in batches and served from the query cache.
+        """
+        if modality not in ("speech", "caption"):
+            raise ValueError(f"Batch search supports speech and caption queries, not '{modality}'")
+        if not queries:
+            return []
+
+        indexed_until = self.get_coverage()["indexed_until_sec"]
+        if self.snapshot is None:
+            model = self.query_embeddings.get(modality)
+            if model is not None:
+                embed_query_texts(model["backend"], model["model"], queries)
+            search = lambda query: self.modality_hits(modality, query, top_k)
+            results = list(get_search_executor().map(search, queries))
+        else:
+            model = self.snapshot.model(modality)
+            embeddings = embed_query_texts(model["backend"], model["model"], queries)
+            results = [
+                _with_windows(self.snapshot, modality, hits)
+                for hits in self.snapshot.search_many(modality, np.stack(embeddings), top_k)
+            ]
+        return [
+            [
+                {
+                    "start_time": hit["start_time"],
+                    "end_time": hit["end_time"],
+                    "similarity": hit["similarity"],
+                    "indexed_until_sec": indexed_until,
+                }
+                for hit in hits
+            ]
+            for hits in results
+        ]
+
+    def modality_hits(self, modality: str, query: Any, top_k: int) -> List[Dict[str, Any]]:
+        """Clip windows most similar to a query in one modality, without the coverage watermark."""
+        if modality == "speech":
+            return self._speech_hits(query, top_k)
+        if modality == "caption":
+            return self._caption_hits(query, top_k)
+        if modality == "image":
+            return self._image_hits(query, top_k)
+        raise ValueError(f"Unknown search modality '{modality}'")
+
+    def _with_coverage(self, hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        indexed_until = self.get_coverage()["indexed_until_sec"]
+        return [{**hit, "indexed_until_sec": indexed_until} for hit in hits]
+
+    @track_search("speech")
+    def _speech_hits(self, query: str, top_k: int) -> List[Dict[str, Any]]:
+        if self.snapshot is not None:
+            return self._snapshot_windows("speech", query, top_k)
+        sims = self.video_index.audio_chunks_view.chunk_text.similarity(self._query_embedding("speech", query))
         results = self.video_index.audio_chunks_view.select(
             self.video_index.audio_chunks_view.pos,
             self.video_index.audio_chunks_view.start_time_sec,
             self.video_index.audio_chunks_view.end_time_sec,
+            self.video_index.audio_chunks_view.segment_start_sec,
             similarity=sims,
         ).order_by(sims, asc=False)
 
         return [
             {
-                "start_time": float(entry["start_time_sec"]),
-                "end_time": float(entry["end_time_sec"]),
+                "start_time": float(entry["segment_start_sec"] + entry["start_time_sec"]),
+                "end_time": float(entry["segment_start_sec"] + entry["end_time_sec"]),
                 "similarity": float(entry["similarity"]),
             }
             for entry in results.limit(top_k).collect()
         ]
 
-    def search_by_image(self, image_base64: str, top_k: int) -> List[Dict[str, Any]]:
-        """Search video clips by image similarity"""
+    @track_search("image")
+    def _image_hits(self, image_base64: str, top_k: int) -> List[Dict[str, Any]]:
         image = decode_image(image_base64)
+        if self.snapshot is not None:
+            return self._snapshot_windows("image", image, top_k)
         sims = self.video_index.frames_view.resized_frame.similarity(image)
         results = self.video_index.frames_view.select(
-            self.video_index.frames_view.pos_msec,
+            *self._frame_time_columns(),
             self.video_index.frames_view.resized_frame,
             similarity=sims,
         ).order_by(sims, asc=False)
 
         return [
-            {
-                "start_time": entry["pos_msec"] / 1000.0 - settings.DELTA_SECONDS_FRAME_INTERVAL,
-                "end_time": entry["pos_msec"] / 1000.0 + settings.DELTA_SECONDS_FRAME_INTERVAL,
-                "similarity": float(entry["similarity"]),
-            }
+            {**self._frame_window(entry), "similarity": float(entry["similarity"])}
             for entry in results.limit(top_k).collect()
         ]
 
-    def search_by_caption(self, query: str, top_k: int) -> List[Dict[str, Any]]:
-        """Search video clips by caption similarity. """
-        sims = self.video_index.frames_view.im_caption.similarity(query)
+    @track_search("caption")
+    def _caption_hits(self, query: str, top_k: int) -> List[Dict[str, Any]]:
+        if self.snapshot is not None:
+            return self._snapshot_windows("caption", query, top_k)
+        sims = self.video_index.frames_view.im_caption.similarity(self._query_embedding("caption", query))
         results = self.video_index.frames_view.select(
-            self.video_index.frames_view.pos_msec,
+            *self._frame_time_columns(),
             self.video_index.frames_view.im_caption,
             similarity=sims,
         ).order_by(sims, asc=False)
 
         return [
-            {
-                "start_time": entry["pos_msec"] / 1000.0 - settings.DELTA_SECONDS_FRAME_INTERVAL,
-                "end_time": entry["pos_msec"] / 1000.0 + settings.DELTA_SECONDS_FRAME_INTERVAL,
-                "similarity": float(entry["similarity"]),
-            }
+            {**self._frame_window(entry), "similarity": float(entry["similarity"])}
             for entry in results.limit(top_k).collect()
         ]
 
+    def _query_embedding(self, modality: str, query: str) -> Union[str, np.ndarray]:
+        """The cached embedding of a text query, so pixeltable does not embed it again on every search.
+
+        Modalities embedded by a custom function hand pixeltable the raw text instead.
+        """
+        model = self.query_embeddings.get(modality)
+        if model is None:
+            return query
+        return embed_query_text(model["backend"], model["model"], query)
+
+    def _snapshot_windows(self, modality: str, query: Any, top_k: int) -> List[Dict[str, Any]]:
+        return [
+            {"start_time": hit["start_time"], "end_time": hit["end_time"], "similarity": hit["similarity"]}
+            for hit in snapshot_hits(self.snapshot, modality, query, top_k)
+        ]
+
+    def _frame_time_columns(self) -> List[Any]:
+        frames_view = self.video_index.frames_view
+        columns = [frames_view.pos_msec, frames_view.segment_start_sec]
+        if self.video_index.scene_aware:
+            columns += [frames_view.scene_start_msec, frames_view.scene_end_msec, frames_view.run_end_msec]
+        return columns
+
+    def _frame_window(self, entry: Dict[str, Any]) -> Dict[str, float]:
+        return frame_window(entry, self.video_index.scene_aware)
+
+    @track_search("speech_info")
     def get_speech_info(self, query: str, top_k: int) -> List[Dict[str, Any]]:
         """Get speech text information based on query similarity. """
-        sims = self.video_index.audio_chunks_view.chunk_text.similarity(query)
+        if self.snapshot is not None:
+            return [
+                {"text": hit["text"], "similarity": hit["similarity"]}
+                for hit in snapshot_hits(self.snapshot, "speech", query, top_k)
+            ]
+        sims = self.video_index.audio_chunks_view.chunk_text.similarity(self._query_embedding("speech", query))
         results = self.video_index.audio_chunks_view.select(
             self.video_index.audio_chunks_view.chunk_text,
             similarity=sims,
@@ -91,9 +356,15 @@ class VideoSearchEngine:
             for entry in results.limit(top_k).collect()
         ]
 
+    @track_search("caption_info")
     def get_caption_info(self, query: str, top_k: int) -> List[Dict[str, Any]]:
         """Get caption information based on query similarity."""
-        sims = self.video_index.frames_view.im_caption.similarity(query)
+        if self.snapshot is not None:
+            return [
+                {"caption": hit["caption"], "similarity": hit["similarity"]}
+                for hit in snapshot_hits(self.snapshot, "caption", query, top_k)
+            ]
+        sims = self.video_index.frames_view.im_caption.similarity(self._query_embedding("caption", query))
         results = self.video_index.frames_view.select(
             self.video_index.frames_view.im_caption,
             similarity=sims,
@@ -106,3 +377,74 @@ class VideoSearchEngine:
             }
             for entry in results.limit(top_k).collect()
         ]
+
+
+class SearchEngineCache:
+    """A process-wide, least-recently-used cache of opened video search engines.
+
+    Opening an engine reads the registry and looks up three pixeltable tables, so a
+    repeat query against a hot video is served from here without touching the catalog.
+    Entries are dropped whenever the registry entry of their index, or of an alias
+    sharing its pixeltable cache, is rewritten or removed.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._engines: "OrderedDict[str, VideoSearchEngine]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped on every invalidation, so an engine opened concurrently with one is not cached.
+        self._generation = 0
+
+    def get(self, video_name: str) -> VideoSearchEngine:
+        with self._lock:
+            engine = self._engines.get(video_name)
+            if engine is not None:
+                self._engines.move_to_end(video_name)
+            generation = self._generation
+        SEARCH_ENGINE_CACHE_LOOKUPS.labels(result="hit" if engine else "miss").inc()
+        if engine is not None:
+            return engine
+
+        engine = VideoSearchEngine(video_name)
+        with self._lock:
+            if self.capacity > 0 and generation == self._generation:
+                self._engines[video_name] = engine
+                while len(self._engines) > self.capacity:
+                    self._engines.popitem(last=False)
+        return engine
+
+    def invalidate(self, video_name: str, video_cache: str):
+        """Drop the engine of a video and of every name sharing its pixeltable cache."""
+        with self._lock:
+            self._generation += 1
+            stale = [
+                name
+                for name, engine in self._engines.items()
+                if name == video_name or engine.video_index.video_cache == video_cache
+            ]
+            for name in stale:
+                del self._engines[name]
+        if stale:
+            logger.info(f"Dropped cached search engines of {stale}")
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._engines.clear()
+
+
+@lru_cache(maxsize=1)
+def get_search_engine_cache() -> SearchEngineCache:
+    """
+    Get the process-wide search engine cache, invalidated by registry changes
+    """
+    cache = SearchEngineCache(settings.SEARCH_ENGINE_CACHE_SIZE)
+    registry.on_index_changed(cache.invalidate)
+    return cache
+
+
+def get_search_engine(video_name: str) -> VideoSearchEngine:
+    """
+    Get a search engine for a registered video, reusing an already opened one
+    """
+    return get_search_engine_cache().get(video_name)
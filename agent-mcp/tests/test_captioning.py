@@ -0,0 +1,181 @@
+import base64
+import io
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Tuple
+
+import PIL.Image
+import pytest
+
+from agent_mcp.video.ingestion.captioning import CaptioningClient, CaptionRequestError
+
+# Frames are told apart by their width, which survives JPEG encoding.
+FRAME_WIDTH_STEP = 8
+
+StubResponse = Tuple[int, Dict[str, str], object]
+
+
+def make_frame(idx: int) -> PIL.Image.Image:
+    return PIL.Image.new("RGB", (FRAME_WIDTH_STEP * (idx + 1), 8), color=(40, 80, 120))
+
+
+def frame_indices(body: dict) -> List[int]:
+    """Indices of the frames sent in a generateContent request body"""
+    indices = []
+    for part in body["contents"][0]["parts"]:
+        if "inline_data" in part:
+            image = PIL.Image.open(io.BytesIO(base64.b64decode(part["inline_data"]["data"])))
+            indices.append(image.width // FRAME_WIDTH_STEP - 1)
+    return indices
+
+
+def candidate(text: str) -> dict:
+    return {"candidates": [{"content": {"parts": [{"text": text}]}}]}
+
+
+def describe(body: dict) -> StubResponse:
+    """Caption every frame of a request, as a JSON array when several were sent"""
+    captions = [f"frame {idx}" for idx in frame_indices(body)]
+    return 200, {}, candidate(captions[0] if len(captions) == 1 else json.dumps(captions))
+
+
+class StubGemini:
+    """A local generateContent endpoint answering every request with `respond`."""
+
+    def __init__(self, respond: Callable[[dict], StubResponse]):
+        self.respond = respond
+        self.requests: List[dict] = []
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with stub._lock:
+                    stub.requests.append(body)
+                    status, headers, payload = stub.respond(body)
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}/v1beta"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def gemini():
+    stubs = []
+
+    def start(respond: Callable[[dict], StubResponse]) -> StubGemini:
+        stub = StubGemini(respond)
+        stubs.append(stub)
+        return stub
+
+    yield start
+    for stub in stubs:
+        stub.close()
+
+
+def make_client(stub: StubGemini, images_per_request: int = 1, max_retries: int = 3) -> CaptioningClient:
+    return CaptioningClient(
+        api_key="test-key",
+        base_url=stub.base_url,
+        max_in_flight=2,
+        rate_limit_per_second=1000.0,
+        rate_limit_burst=100,
+        max_retries=max_retries,
+        retry_base_delay=0.01,
+        retry_max_delay=0.05,
+        images_per_request=images_per_request,
+        timeout=5.0,
+    )
+
+
+def test_frames_are_batched_into_multi_image_requests(gemini):
+    stub = gemini(describe)
+    client = make_client(stub, images_per_request=2)
+
+    captions = client.caption([make_frame(idx) for idx in range(5)], prompt="Describe", model="gemini-test")
+
+    assert captions == [f"frame {idx}" for idx in range(5)]
+    assert sorted(len(frame_indices(body)) for body in stub.requests) == [1, 2, 2]
+    multi_image = [body for body in stub.requests if len(frame_indices(body)) > 1]
+    assert all(body["generationConfig"]["responseMimeType"] == "application/json" for body in multi_image)
+    assert client.requests_sent == 3
+    assert client.frames_captioned == 5
+
+
+def test_rate_limited_requests_back_off_and_retry(gemini):
+    rate_limited = {"remaining": 2}
+
+    def respond(body: dict) -> StubResponse:
+        if rate_limited["remaining"]:
+            rate_limited["remaining"] -= 1
+            return 429, {"Retry-After": "0.05"}, {"error": {"code": 429}}
+        return describe(body)
+
+    stub = gemini(respond)
+    client = make_client(stub)
+
+    assert client.caption([make_frame(0)], prompt="Describe", model="gemini-test") == ["frame 0"]
+    assert client.retries == 2
+    assert len(stub.requests) == 3
+
+
+def test_retries_are_bounded(gemini):
+    stub = gemini(lambda body: (429, {}, {"error": {"code": 429}}))
+    client = make_client(stub, max_retries=2)
+
+    with pytest.raises(CaptionRequestError):
+        client.caption([make_frame(0)], prompt="Describe", model="gemini-test")
+    assert len(stub.requests) == 3
+
+
+def test_mismatched_multi_image_response_falls_back_to_one_by_one(gemini):
+    def respond(body: dict) -> StubResponse:
+        indices = frame_indices(body)
+        if len(indices) > 1:
+            return 200, {}, candidate(json.dumps(["only one caption"]))
+        return describe(body)
+
+    stub = gemini(respond)
+    client = make_client(stub, images_per_request=3)
+
+    captions = client.caption([make_frame(idx) for idx in range(3)], prompt="Describe", model="gemini-test")
+
+    assert captions == ["frame 0", "frame 1", "frame 2"]
+    assert [len(frame_indices(body)) for body in stub.requests] == [3, 1, 1, 1]
+
+
+def test_response_without_candidates_leaves_only_that_caption_empty(gemini):
+    def respond(body: dict) -> StubResponse:
+        if frame_indices(body) == [1]:
+            return 200, {}, {"candidates": [], "promptFeedback": {"blockReason": "SAFETY"}}
+        if frame_indices(body) == [2]:
+            return 200, {}, {"candidates": [{"content": {"parts": []}, "finishReason": "SAFETY"}]}
+        return describe(body)
+
+    stub = gemini(respond)
+    client = make_client(stub)
+
+    captions = client.caption([make_frame(idx) for idx in range(4)], prompt="Describe", model="gemini-test")
+
+    assert captions == ["frame 0", "", "", "frame 3"]
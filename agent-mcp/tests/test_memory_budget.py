@@ -0,0 +1,111 @@
+from fractions import Fraction
+from pathlib import Path
+from typing import Dict
+
+import av
+import numpy as np
+import pytest
+
+from agent_mcp.video.ingestion.demux import AudioChunker, demux_video
+from agent_mcp.video.ingestion.frame_sampling import FrameSampler
+from agent_mcp.video.ingestion.memory import (
+    MemoryBudget,
+    MemoryBudgetExceededError,
+    current_rss_bytes,
+    release_memory,
+)
+
+WIDTH, HEIGHT, FPS = 1280, 720, 15
+DURATION_SEC = 30
+AUDIO_SAMPLE_RATE = 44100
+# Room for the decoder's buffers above the RSS before the demux. The clip is a single
+# scene, so holding its samples in memory until the scene closes would take ~150 MB more.
+HEADROOM_MB = 128
+
+
+def render_video(path: Path) -> str:
+    """
+    A short H.264/AAC clip of scrolling block noise with a sine tone. The noise is
+    redrawn every second, but its small signatures stay alike, so it is one scene.
+    """
+    rng = np.random.default_rng(0)
+    with av.open(str(path), "w") as container:
+        video = container.add_stream("libx264", rate=FPS)
+        video.width, video.height, video.pix_fmt = WIDTH, HEIGHT, "yuv420p"
+        audio = container.add_stream("aac", rate=AUDIO_SAMPLE_RATE)
+        audio.layout = "mono"
+
+        for second in range(DURATION_SEC):
+            picture = rng.integers(0, 256, (HEIGHT // 8, WIDTH // 8, 3), dtype=np.uint8).repeat(8, 0).repeat(8, 1)
+            for idx in range(FPS):
+                frame = av.VideoFrame.from_ndarray(np.roll(picture, idx * 4, axis=1), format="rgb24")
+                frame.pts = second * FPS + idx
+                container.mux(video.encode(frame))
+
+            t = np.arange(AUDIO_SAMPLE_RATE) / AUDIO_SAMPLE_RATE + second
+            samples = (0.3 * np.sin(2 * np.pi * 440 * t)).astype(np.float32).reshape(1, -1)
+            frame = av.AudioFrame.from_ndarray(samples, format="fltp", layout="mono")
+            frame.sample_rate = AUDIO_SAMPLE_RATE
+            frame.pts = second * AUDIO_SAMPLE_RATE
+            frame.time_base = Fraction(1, AUDIO_SAMPLE_RATE)
+            container.mux(audio.encode(frame))
+
+        container.mux(video.encode())
+        container.mux(audio.encode())
+    return str(path)
+
+
+@pytest.fixture(scope="module")
+def video_path(tmp_path_factory) -> str:
+    return render_video(tmp_path_factory.mktemp("video") / "synthetic.mp4")
+
+
+def demux(video_path: str, work_dir: Path, memory_budget: MemoryBudget) -> Dict[str, int]:
+    """Demux a video with full-resolution frame sampling, spilling frames and audio to `work_dir`"""
+    sampler = FrameSampler(scene_threshold=0.3, min_fps=2.0, max_fps=4.0, frames_per_minute=240, probe_fps=4.0)
+    chunker = AudioChunker(str(work_dir / "audio_chunks"), chunk_duration=10.0, overlap=1.0, min_chunk_duration=1.0)
+    counts = {"frames": 0, "audio_chunks": 0}
+    batches = demux_video(
+        video_path, sampler, chunker, window_seconds=5.0, frame_dir=str(work_dir / "frames"), memory_budget=memory_budget
+    )
+    for batch in batches:
+        counts["frames"] += len(batch.frames)
+        counts["audio_chunks"] += len(batch.audio_chunks)
+    return counts
+
+
+def reset_peak_rss() -> bool:
+    """Reset the kernel's resident memory high-water mark of this process, where supported"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_bytes() -> int:
+    with open("/proc/self/status") as f:
+        line = next(line for line in f if line.startswith("VmHWM:"))
+    return int(line.split()[1]) * 1024
+
+
+@pytest.mark.skipif(current_rss_bytes() is None, reason="needs /proc to measure resident memory")
+def test_demux_stays_within_memory_budget(video_path, tmp_path):
+    release_memory()
+    limit_bytes = current_rss_bytes() + HEADROOM_MB * 2**20
+    if not reset_peak_rss():
+        pytest.skip("cannot reset the peak RSS of this process")
+
+    counts = demux(video_path, tmp_path, MemoryBudget(limit_bytes))
+
+    assert counts["frames"] >= DURATION_SEC
+    assert counts["audio_chunks"] >= DURATION_SEC // 10
+    peak = peak_rss_bytes()
+    assert peak <= limit_bytes, f"peak RSS {peak / 2**20:.0f} MB over the {limit_bytes / 2**20:.0f} MB budget"
+
+
+@pytest.mark.skipif(current_rss_bytes() is None, reason="needs /proc to measure resident memory")
+def test_demux_fails_when_nothing_is_left_to_release(video_path, tmp_path):
+    with pytest.raises(MemoryBudgetExceededError):
+        demux(video_path, tmp_path, MemoryBudget(current_rss_bytes() // 2))